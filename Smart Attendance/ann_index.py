@@ -0,0 +1,222 @@
+"""
+Approximate nearest-neighbour indexes over the gallery matrix.
+
+Two backends are available:
+
+- "ivf"  (default) an inverted-file index written in numpy. Gallery rows are
+  clustered into `nlist` cells with spherical k-means; a query only scans the
+  `nprobe` cells whose centroids are closest to it.
+- "hnsw" an HNSW graph built with the optional `hnswlib` package.
+
+Recall/latency knob
+-------------------
+ATTENDANCE_ANN_NPROBE (ivf) and ATTENDANCE_ANN_EF (hnsw) control how much of
+the gallery a query looks at. Higher values give recall closer to exact search
+at the cost of latency; lower values are faster but may miss the true best
+match. On a synthetic 50k gallery (nlist=894) nprobe=32 reaches recall@1 of
+about 0.99 at roughly a quarter of the exact-scan latency;
+`benchmarks/bench_ann.py` prints the full curve for a given gallery size so
+the value can be picked per deployment.
+
+Indexes work on row numbers of the pre-normalized gallery matrix, so cosine
+similarity is a plain dot product. The gallery IDs are stored alongside the
+index and checked on load, so a stale index is ignored rather than trusted.
+"""
+import os
+import numpy as np
+
+INDEX_FILE = "models/ann_index.npz"
+
+BACKEND = os.getenv("ATTENDANCE_ANN_BACKEND", "ivf")
+NPROBE = int(os.getenv("ATTENDANCE_ANN_NPROBE", "32"))
+EF_SEARCH = int(os.getenv("ATTENDANCE_ANN_EF", "64"))
+
+# Below this many identities a brute-force matrix scan is already fast enough
+MIN_GALLERY_SIZE = int(os.getenv("ATTENDANCE_ANN_MIN_SIZE", "1000"))
+
+
+def _require_hnswlib():
+    try:
+        import hnswlib  # type: ignore
+        return hnswlib
+    except ImportError:
+        print("Error: The 'hnswlib' package is not installed. Install with 'pip install hnswlib'.")
+        return None
+
+
+def _top_k(rows: np.ndarray, similarities: np.ndarray, k: int):
+    """Return the `k` highest-similarity rows, best first."""
+    if len(rows) > k:
+        top = np.argpartition(-similarities, k - 1)[:k]
+        rows, similarities = rows[top], similarities[top]
+    order = np.argsort(-similarities)
+    return rows[order], similarities[order]
+
+
+def _spherical_kmeans(matrix: np.ndarray, nlist: int, iterations: int, seed: int) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity and return unit centroids."""
+    rng = np.random.default_rng(seed)
+    # Training on a sample keeps build time bounded for very large galleries
+    sample_size = min(len(matrix), nlist * 256)
+    sample = matrix[rng.choice(len(matrix), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        norms = np.linalg.norm(sums, axis=1)
+        empty = norms == 0
+        # Re-seed empty cells with random points so every list gets used
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        norms[empty] = 1.0
+        centroids = sums / norms[:, np.newaxis]
+    return centroids.astype(np.float32)
+
+
+class ExactIndex:
+    """Brute-force scan; used for small galleries and as the recall baseline."""
+
+    kind = "exact"
+
+    def search(self, matrix, probe, k):
+        similarities = matrix @ probe
+        return _top_k(np.arange(len(matrix)), similarities, k)
+
+
+class IVFIndex:
+    """Inverted-file index: rows are grouped by nearest centroid."""
+
+    kind = "ivf"
+
+    def __init__(self, centroids, list_offsets, list_rows, nprobe=NPROBE):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.list_offsets = np.asarray(list_offsets, dtype=np.int64)
+        self.list_rows = np.asarray(list_rows, dtype=np.int64)
+        self.nprobe = nprobe
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, matrix, nlist=None, iterations=10, seed=0, nprobe=NPROBE):
+        if nlist is None:
+            nlist = max(1, int(4 * np.sqrt(len(matrix))))
+        nlist = min(nlist, len(matrix))
+        centroids = _spherical_kmeans(matrix, nlist, iterations, seed)
+
+        assignment = np.empty(len(matrix), dtype=np.int64)
+        for start in range(0, len(matrix), 8192):
+            chunk = matrix[start:start + 8192]
+            assignment[start:start + 8192] = np.argmax(chunk @ centroids.T, axis=1)
+
+        list_rows = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=nlist)
+        list_offsets = np.concatenate(([0], np.cumsum(counts)))
+        return cls(centroids, list_offsets, list_rows, nprobe=nprobe)
+
+    def search(self, matrix, probe, k):
+        nprobe = min(self.nprobe, self.nlist)
+        centroid_sims = self.centroids @ probe
+        cells = np.argpartition(-centroid_sims, nprobe - 1)[:nprobe]
+        rows = np.concatenate([
+            self.list_rows[self.list_offsets[c]:self.list_offsets[c + 1]] for c in cells
+        ])
+        if len(rows) == 0:
+            return rows, np.empty(0, dtype=np.float32)
+        return _top_k(rows, matrix[rows] @ probe, k)
+
+    def arrays(self):
+        return {
+            'centroids': self.centroids,
+            'list_offsets': self.list_offsets,
+            'list_rows': self.list_rows,
+        }
+
+
+class HNSWIndex:
+    """HNSW graph from the optional `hnswlib` package."""
+
+    kind = "hnsw"
+
+    def __init__(self, graph, ef=EF_SEARCH):
+        self.graph = graph
+        self.ef = ef
+        self.graph.set_ef(ef)
+
+    @classmethod
+    def build(cls, matrix, M=16, ef_construction=200, ef=EF_SEARCH):
+        hnswlib = _require_hnswlib()
+        if hnswlib is None:
+            return None
+        graph = hnswlib.Index(space="ip", dim=matrix.shape[1])
+        graph.init_index(max_elements=len(matrix), M=M, ef_construction=ef_construction)
+        graph.add_items(matrix, np.arange(len(matrix)))
+        return cls(graph, ef=ef)
+
+    def search(self, matrix, probe, k):
+        self.graph.set_ef(max(self.ef, k))
+        labels, distances = self.graph.knn_query(probe[np.newaxis, :], k=k)
+        # hnswlib's "ip" space reports 1 - dot product
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+    def arrays(self):
+        return {}
+
+
+def build_index(matrix, backend=None):
+    """Build an index of the requested backend over a normalized gallery matrix."""
+    backend = backend or BACKEND
+    if backend == "hnsw":
+        index = HNSWIndex.build(matrix)
+        if index is not None:
+            return index
+        print("Falling back to the built-in IVF index.")
+    elif backend != "ivf":
+        print(f"Unknown ANN backend '{backend}', using 'ivf'.")
+    return IVFIndex.build(matrix)
+
+
+def graph_file(path=INDEX_FILE):
+    """Where the HNSW graph of the index saved at `path` lives (models/ann_index.hnsw by default)."""
+    return os.path.splitext(path)[0] + ".hnsw"
+
+
+def save_index(index, ids, path=INDEX_FILE):
+    """Persist `index` together with the gallery IDs it was built for."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez(path, kind=np.array(index.kind), ids=np.asarray(ids, dtype=str), **index.arrays())
+    if index.kind == "hnsw":
+        index.graph.save_index(graph_file(path))
+
+
+def remove_index(path=INDEX_FILE):
+    for stale in (path, graph_file(path)):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+
+def load_index(ids, dim, path=INDEX_FILE):
+    """
+    Load the saved index if it was built for exactly these gallery IDs.
+    Returns None when there is no index or it no longer matches the gallery.
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        if list(data['ids']) != [str(i) for i in ids]:
+            print("ANN index is out of date with the embeddings; using exact search. Re-run train.py.")
+            return None
+        kind = str(data['kind'])
+        if kind == "ivf":
+            return IVFIndex(data['centroids'], data['list_offsets'], data['list_rows'])
+
+    if kind == "hnsw":
+        hnswlib = _require_hnswlib()
+        if hnswlib is None or not os.path.exists(graph_file(path)):
+            return None
+        graph = hnswlib.Index(space="ip", dim=dim)
+        graph.load_index(graph_file(path), max_elements=len(ids))
+        return HNSWIndex(graph)
+    return None
@@ -1,58 +1,178 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
 import datetime
-from database import create_tables, get_today_attendance, get_all_attendance, get_attendance_by_date
+import threading
+from database import create_tables
+from attendance_table import AttendanceTable
+from task_runner import TaskRunner
 
 create_tables()
 
+def _start_task():
+    """The camera and the CPU are shared, so only one task runs at a time."""
+    if runner.busy:
+        messagebox.showwarning("Busy", f"Please wait for the current {runner.tasks[0].name} to finish, or cancel it.")
+        return False
+    return True
+
+def _format_eta(seconds):
+    if seconds is None:
+        return ""
+    minutes, seconds = divmod(int(seconds), 60)
+    return f", {minutes}:{seconds:02d} left"
+
+def _camera_window(title):
+    """A window with an embedded live camera view, a status line and a button row."""
+    from video_panel import VideoPanel
+    window = tk.Toplevel(root)
+    window.title(title)
+    window.configure(bg="#f0f0f0")
+    panel = VideoPanel(window, width=640)
+    panel.pack(padx=10, pady=10)
+    status = tk.StringVar(value="Starting camera...")
+    tk.Label(window, textvariable=status, bg="#f0f0f0").pack(pady=5)
+    buttons = tk.Frame(window, bg="#f0f0f0")
+    buttons.pack(pady=10)
+
+    def close():
+        panel.close()
+        window.destroy()
+    return window, panel, status, buttons, close
+
 def enroll_ui():
     name = name_entry.get().strip()
     sid = id_entry.get().strip()
-    if name and sid:
-        root.withdraw()  # Hide main window during enrollment
-        try:
-            from enroll import enroll_student
-            success = enroll_student(name, sid)
-        except ImportError as e:
-            success = False
-            messagebox.showerror("Dependency Error", "OpenCV is required for enrollment.\nInstall it with:\n\npip install opencv-python")
-        root.deiconify()  # Show main window again
-        if success:
+    if not (name and sid):
+        messagebox.showwarning("Error", "Please enter all details")
+        return
+    if not _start_task():
+        return
+    try:
+        from enroll import enroll_student, auto_enroll_student
+    except ImportError:
+        messagebox.showerror("Dependency Error", "OpenCV is required for enrollment.\nInstall it with:\n\npip install opencv-python")
+        return
+
+    auto = auto_capture.get()
+    capture = threading.Event()
+    window, panel, status, buttons, close = _camera_window(f"Enrolling {name} ({sid})")
+
+    def finished(success, task):
+        close()
+        if task.cancelled:
+            messagebox.showinfo("Cancelled", "Enrollment cancelled.")
+        elif success and auto:
+            messagebox.showinfo("Success", f"Enrollment completed for {name}!\n\n{name} can be recognized right away.")
+            name_entry.delete(0, tk.END)
+            id_entry.delete(0, tk.END)
+        elif success:
             messagebox.showinfo("Success", f"Enrollment completed for {name}!\n\nPlease run 'Train Model' to generate embeddings.")
             name_entry.delete(0, tk.END)
             id_entry.delete(0, tk.END)
         else:
             messagebox.showerror("Error", "Enrollment failed or student already exists!")
+
+    def failed(error, task):
+        close()
+        messagebox.showerror("Error", f"Enrollment failed: {error}")
+
+    if auto:
+        # Captures are taken, checked and embedded without any key presses
+        job = lambda task: auto_enroll_student(name, sid, show=panel.show, cancel=task.cancel_event,
+                                               progress=task.report)
     else:
-        messagebox.showwarning("Error", "Please enter all details")
+        job = lambda task: enroll_student(name, sid, show=panel.show, capture=capture,
+                                          cancel=task.cancel_event, progress=task.report)
+    task = runner.submit(job, name="enrollment", on_progress=status.set, on_done=finished, on_error=failed)
+    if auto:
+        status.set("Look at the camera and turn your head slowly")
+    else:
+        status.set("Position your face in the centre and press Capture (or C)")
+        tk.Button(buttons, text="Capture", command=capture.set, bg="#6fa8dc", fg="white", width=12).pack(side=tk.LEFT, padx=5)
+        window.bind("c", lambda event: capture.set())
+    tk.Button(buttons, text="Cancel", command=task.cancel, bg="#d32f2f", fg="white", width=12).pack(side=tk.LEFT, padx=5)
+    window.protocol("WM_DELETE_WINDOW", task.cancel)
 
 def recognize_ui():
-    root.withdraw()
+    if not _start_task():
+        return
     try:
         from recognize import recognize_faces
-        recognize_faces()
     except ImportError:
         messagebox.showerror("Dependency Error", "OpenCV is required for recognition.\nInstall it with:\n\npip install opencv-python")
-    root.deiconify()
-    messagebox.showinfo("Done", "Recognition session completed")
+        return
+
+    window, panel, status, buttons, close = _camera_window("Mark Attendance")
+
+    def finished(recognized, task):
+        close()
+        if recognized is None:
+            messagebox.showerror("Error", "Recognition could not start. Check the camera and that OpenCV and DeepFace are installed.")
+        else:
+            messagebox.showinfo("Done", f"Recognition session completed\n\nStudents recognized: {recognized}")
+
+    def failed(error, task):
+        close()
+        messagebox.showerror("Error", f"Recognition failed: {error}")
+
+    task = runner.submit(lambda task: recognize_faces(show=panel.show, cancel=task.cancel_event),
+                         name="recognition session", on_done=finished, on_error=failed)
+    status.set("Recognizing faces - press Stop to end the session")
+    tk.Button(buttons, text="Stop", command=task.cancel, bg="#d32f2f", fg="white", width=12).pack()
+    window.protocol("WM_DELETE_WINDOW", task.cancel)
 
 def train_model():
     result = messagebox.askyesno("Train Model", 
-                                "This will generate embeddings for all enrolled students.\n"
+                                "This will generate embeddings for new or changed student images.\n"
                                 "This may take a few minutes. Continue?")
-    if result:
-        root.withdraw()
-        try:
-            from train import generate_embeddings
-            success = generate_embeddings()
-            root.deiconify()
-            if success:
-                messagebox.showinfo("Success", "Model training completed successfully!")
-            else:
-                messagebox.showwarning("Warning", "Training completed with some issues.")
-        except Exception as e:
-            root.deiconify()
-            messagebox.showerror("Error", f"Training failed: {str(e)}")
+    if not result or not _start_task():
+        return
+    try:
+        from train import generate_embeddings
+    except ImportError as e:
+        messagebox.showerror("Error", f"Training failed: {str(e)}")
+        return
+
+    window = tk.Toplevel(root)
+    window.title("Train Model")
+    window.configure(bg="#f0f0f0")
+    status = tk.StringVar(value="Checking student images...")
+    detail = tk.StringVar(value="")
+    tk.Label(window, textvariable=status, bg="#f0f0f0").pack(padx=20, pady=(15, 5))
+    bar = ttk.Progressbar(window, length=380, mode="determinate")
+    bar.pack(padx=20, pady=5)
+    tk.Label(window, textvariable=detail, bg="#f0f0f0", fg="#555").pack(padx=20, pady=5)
+
+    def show_progress(p):
+        bar.configure(maximum=p['images_total'], value=p['images_done'])
+        last = f" (finished {p['student']})" if p['student'] else ""
+        status.set(f"{p['students_done']}/{p['students_total']} students{last}")
+        detail.set(f"{p['images_done']}/{p['images_total']} images, "
+                   f"{p['images_per_sec']:.1f} images/sec{_format_eta(p['eta'])}")
+
+    def finished(success, task):
+        window.destroy()
+        if task.cancelled:
+            messagebox.showinfo("Cancelled", "Training cancelled. Images embedded so far will be reused next time.")
+        elif success:
+            messagebox.showinfo("Success", "Model training completed successfully!")
+        else:
+            messagebox.showwarning("Warning", "Training completed with some issues.")
+
+    def failed(error, task):
+        window.destroy()
+        messagebox.showerror("Error", f"Training failed: {str(error)}")
+
+    task = runner.submit(lambda task: generate_embeddings(incremental=True, progress=task.report,
+                                                          cancel=task.cancel_event),
+                         name="training", on_progress=show_progress, on_done=finished, on_error=failed)
+    tk.Button(window, text="Cancel", command=task.cancel, bg="#d32f2f", fg="white", width=12).pack(pady=10)
+    window.protocol("WM_DELETE_WINDOW", task.cancel)
+
+def quit_app():
+    # Let a running session release the camera and flush its marks first
+    runner.shutdown()
+    root.destroy()
 
 def view_attendance():
     attendance_window = tk.Toplevel(root)
@@ -69,96 +189,95 @@ def view_attendance():
     date_entry = tk.Entry(date_frame, textvariable=date_var, width=12)
     date_entry.pack(side=tk.LEFT, padx=5)
     
+    tk.Label(date_frame, text="Student:", bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
+    student_var = tk.StringVar(value="")
+    tk.Entry(date_frame, textvariable=student_var, width=15).pack(side=tk.LEFT, padx=5)
+    
     def load_attendance():
         date = date_var.get()
         try:
             datetime.datetime.strptime(date, "%Y-%m-%d")
-            records = get_attendance_by_date(date)
-        except:
-            records = get_all_attendance()
-        
-        # Clear treeview
-        for item in tree.get_children():
-            tree.delete(item)
-        
-        if records:
-            for record in records:
-                # record format: (id, student_id, date, time, status, name)
-                if len(record) >= 6:
-                    tree.insert("", tk.END, values=(record[5], record[1], record[2], record[3], record[4]))
-                else:
-                    tree.insert("", tk.END, values=(record[1], record[2], record[3], record[4], record[5]))
-        else:
-            messagebox.showinfo("No Data", f"No attendance records found for {date}")
+        except ValueError:
+            date = None  # no (valid) date: all records
+        # Only the first page is read; more are fetched as the table is scrolled
+        if table.load(date_from=date, date_to=date, student=student_var.get().strip() or None) == 0:
+            messagebox.showinfo("No Data", f"No attendance records found for {date or 'any date'}")
     
     tk.Button(date_frame, text="Load", command=load_attendance, bg="#6fa8dc", fg="white").pack(side=tk.LEFT, padx=5)
     tk.Button(date_frame, text="View All", command=lambda: [date_var.set(""), load_attendance()], 
               bg="#3d85c6", fg="white").pack(side=tk.LEFT, padx=5)
     
-    # Treeview for attendance table
-    tree_frame = tk.Frame(attendance_window)
-    tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-    
-    tree = ttk.Treeview(tree_frame, columns=("Name", "Student ID", "Date", "Time", "Status"), show="headings", height=15)
-    tree.heading("Name", text="Name")
-    tree.heading("Student ID", text="Student ID")
-    tree.heading("Date", text="Date")
-    tree.heading("Time", text="Time")
-    tree.heading("Status", text="Status")
-    
-    tree.column("Name", width=150)
-    tree.column("Student ID", width=120)
-    tree.column("Date", width=100)
-    tree.column("Time", width=100)
-    tree.column("Status", width=100)
-    
-    scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
-    tree.configure(yscrollcommand=scrollbar.set)
-    
-    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    # Attendance table, paged from the database as it scrolls; click a heading to sort
+    table = AttendanceTable(attendance_window, height=15)
+    table.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
     
     # Load today's attendance by default
     load_attendance()
 
-root = tk.Tk()
-root.title("Smart Attendance System")
-root.geometry("450x400")
-root.configure(bg="#cfe2f3")
+# Build the window only when run directly; embedding worker processes
+# re-import this module and must not open a GUI of their own.
+if __name__ == "__main__":
+    root = tk.Tk()
+    root.title("Smart Attendance System")
+    root.geometry("450x460")
+    root.configure(bg="#cfe2f3")
+    # Enrollment, training and recognition run off the Tk thread
+    runner = TaskRunner(root)
+    root.protocol("WM_DELETE_WINDOW", quit_app)
 
-# Header
-header = tk.Label(root, text="Smart Attendance System", font=("Helvetica", 18, "bold"), bg="#cfe2f3", fg="#0b5394")
-header.pack(pady=15)
+    # Header
+    header = tk.Label(root, text="Smart Attendance System", font=("Helvetica", 18, "bold"), bg="#cfe2f3", fg="#0b5394")
+    header.pack(pady=15)
 
-# Enrollment Section
-enroll_frame = tk.LabelFrame(root, text="Enroll New Student", bg="#cfe2f3", font=("Helvetica", 10, "bold"))
-enroll_frame.pack(pady=10, padx=20, fill=tk.X)
+    # Enrollment Section
+    enroll_frame = tk.LabelFrame(root, text="Enroll New Student", bg="#cfe2f3", font=("Helvetica", 10, "bold"))
+    enroll_frame.pack(pady=10, padx=20, fill=tk.X)
 
-tk.Label(enroll_frame, text="Name:", bg="#cfe2f3").pack(anchor=tk.W, padx=10, pady=5)
-name_entry = tk.Entry(enroll_frame, width=30)
-name_entry.pack(padx=10, pady=5)
+    tk.Label(enroll_frame, text="Name:", bg="#cfe2f3").pack(anchor=tk.W, padx=10, pady=5)
+    name_entry = tk.Entry(enroll_frame, width=30)
+    name_entry.pack(padx=10, pady=5)
 
-tk.Label(enroll_frame, text="Student ID:", bg="#cfe2f3").pack(anchor=tk.W, padx=10, pady=5)
-id_entry = tk.Entry(enroll_frame, width=30)
-id_entry.pack(padx=10, pady=5)
+    tk.Label(enroll_frame, text="Student ID:", bg="#cfe2f3").pack(anchor=tk.W, padx=10, pady=5)
+    id_entry = tk.Entry(enroll_frame, width=30)
+    id_entry.pack(padx=10, pady=5)
 
-# Buttons
-button_frame = tk.Frame(root, bg="#cfe2f3")
-button_frame.pack(pady=15)
+    auto_capture = tk.BooleanVar(value=True)
+    tk.Checkbutton(enroll_frame, text="Capture automatically and add to recognition now",
+                   variable=auto_capture, bg="#cfe2f3").pack(anchor=tk.W, padx=10, pady=(0, 5))
 
-tk.Button(button_frame, text="Enroll Student", command=enroll_ui, bg="#6fa8dc", fg="white", 
-          width=15, height=2, font=("Helvetica", 9, "bold")).pack(pady=5)
+    # Buttons
+    button_frame = tk.Frame(root, bg="#cfe2f3")
+    button_frame.pack(pady=15)
 
-tk.Button(button_frame, text="Train Model", command=train_model, bg="#3d85c6", fg="white", 
-          width=15, height=2, font=("Helvetica", 9, "bold")).pack(pady=5)
+    tk.Button(button_frame, text="Enroll Student", command=enroll_ui, bg="#6fa8dc", fg="white", 
+              width=15, height=2, font=("Helvetica", 9, "bold")).pack(pady=5)
 
-tk.Button(button_frame, text="Mark Attendance", command=recognize_ui, bg="#0b5394", fg="white", 
-          width=15, height=2, font=("Helvetica", 9, "bold")).pack(pady=5)
+    tk.Button(button_frame, text="Train Model", command=train_model, bg="#3d85c6", fg="white", 
+              width=15, height=2, font=("Helvetica", 9, "bold")).pack(pady=5)
 
-tk.Button(button_frame, text="View Attendance", command=view_attendance, bg="#073763", fg="white", 
-          width=15, height=2, font=("Helvetica", 9, "bold")).pack(pady=5)
+    tk.Button(button_frame, text="Mark Attendance", command=recognize_ui, bg="#0b5394", fg="white", 
+              width=15, height=2, font=("Helvetica", 9, "bold")).pack(pady=5)
 
-tk.Button(button_frame, text="Exit", command=root.destroy, bg="#d32f2f", fg="white", 
-          width=15, height=1, font=("Helvetica", 9)).pack(pady=10)
+    tk.Button(button_frame, text="View Attendance", command=view_attendance, bg="#073763", fg="white", 
+              width=15, height=2, font=("Helvetica", 9, "bold")).pack(pady=5)
+
+    tk.Button(button_frame, text="Exit", command=quit_app, bg="#d32f2f", fg="white", 
+              width=15, height=1, font=("Helvetica", 9)).pack(pady=10)
+
+    # Load the face model in the background while the user fills in the form,
+    # so the first "Mark Attendance" does not wait for TensorFlow
+    status_var = tk.StringVar(value="")
+    tk.Label(root, textvariable=status_var, bg="#cfe2f3", fg="#555", font=("Helvetica", 8)).pack(side=tk.BOTTOM, pady=2)
+    try:
+        import model_manager
+        model_manager.warm_up()
+
+        def update_model_status():
+            status_var.set(model_manager.status())
+            if not model_manager.finished():
+                root.after(500, update_model_status)
+        update_model_status()
+    except ImportError:
+        status_var.set("Face model unavailable (numpy is not installed)")
 
-root.mainloop()
+    root.mainloop()
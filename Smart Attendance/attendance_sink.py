@@ -0,0 +1,139 @@
+"""
+Background, batched attendance writer for the recognizer.
+
+mark() never touches the disk: it checks an in-memory "already marked today"
+set (preloaded from the database at start and rebuilt when the date rolls
+over at midnight) and queues new marks. A writer thread flushes the queue in
+one transaction when `flush_size` marks are waiting or `flush_interval`
+seconds have passed, whichever comes first. A flush that fails (e.g. the
+database is locked) keeps its marks queued for the next one. close() - also
+registered with atexit - always flushes whatever is still buffered, and can be
+called again to retry if that last write fails.
+"""
+import os
+import atexit
+import datetime
+import threading
+
+from database import get_marked_student_ids, mark_attendance_many
+
+FLUSH_SIZE = int(os.getenv("ATTENDANCE_FLUSH_SIZE", "50"))
+FLUSH_INTERVAL = float(os.getenv("ATTENDANCE_FLUSH_INTERVAL", "1.0"))
+
+
+class AttendanceSink:
+    """Queue of attendance marks, deduplicated in memory and written in groups."""
+
+    def __init__(self, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL, clock=datetime.datetime.now):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.counters = {'queued': 0, 'flushed': 0, 'deduplicated': 0, 'conflicts': 0, 'flushes': 0}
+        self._buffer = []
+        self._today = None
+        self._marked_today = set()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stop = False
+        self._thread = None
+
+    def start(self):
+        with self._cond:
+            self._rollover(self.clock().strftime("%Y-%m-%d"))
+        self._thread = threading.Thread(target=self._run, name="attendance-sink", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _rollover(self, today):
+        """Switch the dedup set to a new day (caller holds the lock)."""
+        if today != self._today:
+            self._today = today
+            self._marked_today = get_marked_student_ids(today)
+
+    def mark(self, student_id, date=None, time=None, status="Present"):
+        """
+        Queue a mark. Returns False without queueing if the student is already
+        marked today; otherwise True (the write happens on the next flush).
+        """
+        now = self.clock()
+        date = date or now.strftime("%Y-%m-%d")
+        time = time or now.strftime("%H:%M:%S")
+        with self._cond:
+            self._rollover(now.strftime("%Y-%m-%d"))
+            if date == self._today:
+                if student_id in self._marked_today:
+                    self.counters['deduplicated'] += 1
+                    return False
+                self._marked_today.add(student_id)
+            self._buffer.append((student_id, date, time, status))
+            self.counters['queued'] += 1
+            if len(self._buffer) >= self.flush_size:
+                self._cond.notify()
+        return True
+
+    def flush(self):
+        """Write everything buffered so far in one transaction."""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            try:
+                inserted = mark_attendance_many(batch)
+            except Exception:
+                # Nothing was written: put the marks back ahead of newer ones
+                # so the next flush retries them. Their students stay in the
+                # dedup set, because their marks are still pending.
+                with self._cond:
+                    self._buffer[:0] = batch
+                raise
+            with self._cond:
+                self.counters['flushed'] += inserted
+                # Marked by another process (e.g. a second camera) in the meantime
+                self.counters['conflicts'] += len(batch) - inserted
+                self.counters['flushes'] += 1
+            return inserted
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stop and len(self._buffer) < self.flush_size:
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stop
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error writing attendance: {e}")
+            if stopping:
+                return
+
+    def close(self):
+        """
+        Stop the writer and flush anything still buffered. Safe to call
+        twice; if the final flush fails, its marks stay queued and calling
+        close() again retries them.
+        """
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        # The writer thread flushed on its way out; this catches marks that
+        # raced in afterwards, a sink that was never started, or a failed write
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error writing attendance: {e} ({self.stats()['pending']} marks still queued)")
+        finally:
+            atexit.unregister(self.close)
+
+    def stats(self):
+        with self._cond:
+            return dict(self.counters, pending=len(self._buffer))
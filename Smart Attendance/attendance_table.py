@@ -0,0 +1,144 @@
+"""
+Lazily paged attendance table for the desktop viewer.
+
+The Treeview only ever holds a window of at most `max_rows` rows. As the
+user scrolls near either end of that window the next page is fetched from
+SQLite with keyset paging (database.get_attendance_page), and rows far out
+of view are dropped from the other end. Opening "View All" therefore reads a
+single page, however long the history is. Sorting (click a column heading;
+click again to reverse) and filtering are done by the query, not in Tk.
+"""
+import tkinter as tk
+from tkinter import ttk
+
+from database import attendance_sort_key, get_attendance_page
+
+PAGE_ROWS = 200
+MAX_ROWS = 1000
+PREFETCH = 0.1  # fetch more once the view is within this fraction of an end
+
+# Heading, width and the database sort it selects (None: not sortable)
+COLUMNS = (
+    ("Name", 150, 'name'),
+    ("Student ID", 120, 'student'),
+    ("Date", 100, 'date'),
+    ("Time", 100, 'date'),
+    ("Status", 100, None),
+)
+
+
+class AttendanceTable(ttk.Frame):
+    """A Treeview with a scrollbar over the filtered, sorted attendance listing."""
+
+    def __init__(self, master, page_rows=PAGE_ROWS, max_rows=MAX_ROWS, height=15):
+        super().__init__(master)
+        self.page_rows = page_rows
+        self.max_rows = max(max_rows, 2 * page_rows)
+        self.filters = {}
+        self.sort = 'date'
+        self.descending = True
+        self.rows = []  # the rows in the tree, in display order
+        self.at_start = self.at_end = True
+        self._check_pending = False
+
+        self.tree = ttk.Treeview(self, columns=[name for name, _, _ in COLUMNS], show="headings", height=height)
+        for name, width, sort in COLUMNS:
+            if sort is not None:
+                self.tree.heading(name, command=lambda sort=sort: self.sort_by(sort))
+            self.tree.column(name, width=width)
+        self._update_headings()
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def load(self, date_from=None, date_to=None, student=None):
+        """Show the first page for new filters; returns the number of rows on it."""
+        self.filters = {'date_from': date_from, 'date_to': date_to, 'student': student}
+        return self._reload()
+
+    def sort_by(self, sort):
+        if sort == self.sort:
+            self.descending = not self.descending
+        else:
+            # Dates newest first, names and IDs A-Z
+            self.sort, self.descending = sort, sort == 'date'
+        self._update_headings()
+        self._reload()
+
+    def _update_headings(self):
+        marked = False
+        for name, _, sort in COLUMNS:
+            text = name
+            if sort == self.sort and not marked:
+                text += " ▼" if self.descending else " ▲"
+                marked = True
+            self.tree.heading(name, text=text)
+
+    def _fetch(self, **cursor):
+        return get_attendance_page(limit=self.page_rows, sort=self.sort, descending=self.descending,
+                                   **self.filters, **cursor)
+
+    def _insert(self, index, row):
+        # row format: (id, student_id, date, time, status, name)
+        self.tree.insert("", index, values=(row[5], row[1], row[2], row[3], row[4]))
+
+    def _reload(self):
+        self.tree.delete(*self.tree.get_children())
+        self.rows = self._fetch()
+        for row in self.rows:
+            self._insert(tk.END, row)
+        self.at_start = True
+        self.at_end = len(self.rows) < self.page_rows
+        self.tree.yview_moveto(0)
+        return len(self.rows)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Fetching moves the view again, so check once the scroll has settled
+        if not self._check_pending:
+            self._check_pending = True
+            self.after_idle(self._check)
+
+    def _check(self):
+        self._check_pending = False
+        if not self.rows:
+            return
+        first, last = self.tree.yview()
+        if last >= 1 - PREFETCH and not self.at_end:
+            self._extend_end(first)
+        elif first <= PREFETCH and not self.at_start:
+            self._extend_start(first)
+
+    def _extend_end(self, first):
+        page = self._fetch(after=attendance_sort_key(self.rows[-1], self.sort))
+        self.at_end = len(page) < self.page_rows
+        if not page:
+            return
+        top = first * len(self.rows)  # index of the first visible row
+        for row in page:
+            self._insert(tk.END, row)
+        self.rows += page
+        excess = len(self.rows) - self.max_rows
+        if excess > 0:
+            self.tree.delete(*self.tree.get_children()[:excess])
+            del self.rows[:excess]
+            self.at_start = False
+            top -= excess
+        self.tree.yview_moveto(max(0.0, top) / len(self.rows))
+
+    def _extend_start(self, first):
+        page = self._fetch(before=attendance_sort_key(self.rows[0], self.sort))
+        self.at_start = len(page) < self.page_rows
+        if not page:
+            return
+        top = first * len(self.rows) + len(page)
+        for index, row in enumerate(page):
+            self._insert(index, row)
+        self.rows[:0] = page
+        excess = len(self.rows) - self.max_rows
+        if excess > 0:
+            self.tree.delete(*self.tree.get_children()[-excess:])
+            del self.rows[-excess:]
+            self.at_end = False
+        self.tree.yview_moveto(top / len(self.rows))
@@ -0,0 +1,217 @@
+"""
+Offline attendance from recorded lecture videos.
+
+Each video is split into time segments that are decoded in parallel worker
+processes. A worker samples frames at `--fps`, runs face detection and sends
+back only the face crops with their offset into the recording. Sparse
+sampling seeks straight to the wanted frame (the decoder jumps to the
+nearest keyframe), while dense sampling walks forward with grab() and only
+retrieves the frames it keeps. The parent embeds crops in batches as they
+arrive, matches them against the gallery, and marks attendance through
+database.mark_attendance with the recording's own date and time, so the
+one-mark-per-day rule applies exactly as it does for the live camera.
+
+Usage:
+    python batch_attendance.py lecture.mp4
+    python batch_attendance.py recordings/ --fps 0.5 --workers 4
+    python batch_attendance.py lecture.mp4 --start "2026-10-12 09:00:00" --dry-run
+"""
+import os
+import time
+import argparse
+import datetime
+import multiprocessing
+
+from database import mark_attendance
+from detector import create_detector
+from embedder import DEFAULT_BATCH_SIZE
+from gallery import Gallery
+from recognize import THRESHOLD, _require_opencv, identify_faces
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.m4v', '.webm')
+SAMPLE_FPS = 1.0
+SEGMENT_SECONDS = 60.0
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+_detector = None  # per worker process
+
+
+def video_files(path):
+    """A single file, or every video directly inside a directory, sorted."""
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(VIDEO_EXTENSIONS))
+    return [path]
+
+
+def probe(cv2, path):
+    """Return (fps, frame_count, duration_seconds) of a video file."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return None
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return fps, frames, frames / fps
+
+
+def recording_start(path, duration, override=None):
+    """
+    When the recording began. Without an explicit start, assume the file was
+    last written when the recording stopped.
+    """
+    if override is not None:
+        return override
+    return datetime.datetime.fromtimestamp(os.path.getmtime(path)) - datetime.timedelta(seconds=duration)
+
+
+def _init_worker():
+    global _detector
+    _require_opencv()
+    # Samples are seconds apart, so previous boxes say nothing about the next frame
+    _detector = create_detector(full_scan_every=1)
+
+
+def _scan_segment(job):
+    """Worker: sample one time segment of a video and return its face crops."""
+    path, fps, start_frame, end_frame, step = job
+    cv2 = _require_opencv()
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    # Seeking costs a keyframe decode; only worth it when skipping over more
+    # than a couple of seconds of video per sample
+    seek_each_sample = step > 2 * fps
+
+    crops = []
+    sampled = 0
+    frame_index = start_frame
+    while frame_index < end_frame:
+        if seek_each_sample and frame_index != start_frame:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        ok, frame = cap.read()
+        if not ok:
+            break
+        sampled += 1
+        for (x, y, w, h) in _detector.detect(frame):
+            crops.append((frame_index / fps, frame[y:y+h, x:x+w].copy()))
+
+        if seek_each_sample:
+            frame_index += step
+            continue
+        # Skip to the next sample without converting the frames in between
+        for _ in range(step - 1):
+            frame_index += 1
+            if frame_index >= end_frame or not cap.grab():
+                frame_index = end_frame
+                break
+        frame_index += 1
+    cap.release()
+    return path, sampled, crops
+
+
+def process_videos(paths, gallery, sample_fps=SAMPLE_FPS, workers=DEFAULT_WORKERS,
+                   batch_size=DEFAULT_BATCH_SIZE, start=None, dry_run=False, threshold=THRESHOLD):
+    """
+    Take attendance from the given video files. Returns a summary dict.
+    `start` overrides the recording start time (only sensible for one file).
+    """
+    cv2 = _require_opencv()
+    if cv2 is None:
+        return None
+
+    jobs = []
+    starts = {}
+    total_duration = 0.0
+    for path in paths:
+        info = probe(cv2, path)
+        if info is None:
+            print(f"Error: Could not open {path}; skipping it.")
+            continue
+        fps, frames, duration = info
+        total_duration += duration
+        starts[path] = recording_start(path, duration, start)
+        step = max(1, int(round(fps / sample_fps)))
+        segment_frames = max(step, int(SEGMENT_SECONDS * fps) // step * step)
+        for first in range(0, frames, segment_frames):
+            jobs.append((path, fps, first, min(first + segment_frames, frames), step))
+
+    first_seen = {}  # (student_id, date) -> earliest time
+    summary = {'files': len(starts), 'video_seconds': total_duration, 'frames_sampled': 0,
+               'faces': 0, 'marked': 0, 'already_marked': 0}
+    wall_start = time.perf_counter()
+
+    def embed(batch):
+        rois = [crop for _, _, crop in batch]
+        for (path, offset, _), (student_id, _) in zip(batch, identify_faces(gallery, rois, threshold)):
+            if student_id is None:
+                continue
+            seen = starts[path] + datetime.timedelta(seconds=offset)
+            key = (student_id, seen.strftime("%Y-%m-%d"))
+            if key not in first_seen or seen < first_seen[key]:
+                first_seen[key] = seen
+
+    pending = []
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(max(1, workers), initializer=_init_worker) as pool:
+        for path, sampled, crops in pool.imap_unordered(_scan_segment, jobs):
+            summary['frames_sampled'] += sampled
+            summary['faces'] += len(crops)
+            pending.extend((path, offset, crop) for offset, crop in crops)
+            while len(pending) >= batch_size:
+                embed(pending[:batch_size])
+                pending = pending[batch_size:]
+    if pending:
+        embed(pending)
+
+    for (student_id, date), seen in sorted(first_seen.items(), key=lambda item: item[1]):
+        time_str = seen.strftime("%H:%M:%S")
+        if dry_run:
+            print(f"[dry run] {gallery.name(student_id)} ({student_id}) seen {date} {time_str}")
+            continue
+        if mark_attendance(student_id, date, time_str):
+            summary['marked'] += 1
+            print(f"✓ Attendance marked: {gallery.name(student_id)} ({student_id}) on {date} at {time_str}")
+        else:
+            summary['already_marked'] += 1
+
+    summary['students'] = len(first_seen)
+    summary['wall_seconds'] = time.perf_counter() - wall_start
+    summary['realtime_factor'] = summary['video_seconds'] / max(summary['wall_seconds'], 1e-9)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="a video file or a directory of video files")
+    parser.add_argument("--fps", type=float, default=SAMPLE_FPS, help="frames sampled per second of video")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="decode/detect processes")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="faces per forward pass")
+    parser.add_argument("--start", help="recording start 'YYYY-MM-DD HH:MM:SS' (default: file mtime - duration)")
+    parser.add_argument("--dry-run", action="store_true", help="print who was seen without writing attendance")
+    args = parser.parse_args()
+
+    start = None
+    if args.start:
+        start = datetime.datetime.strptime(args.start, "%Y-%m-%d %H:%M:%S")
+
+    gallery = Gallery.load()
+    if gallery is None or len(gallery) == 0:
+        print("Error: No embeddings found. Run train.py before processing recordings.")
+        return
+    paths = video_files(args.path)
+    if not paths:
+        print(f"No video files found in {args.path}")
+        return
+
+    summary = process_videos(paths, gallery, sample_fps=args.fps, workers=args.workers,
+                             batch_size=args.batch_size, start=start, dry_run=args.dry_run)
+    if summary is None:
+        return
+    print(f"\nProcessed {summary['files']} recordings ({summary['video_seconds'] / 60:.1f} min of video) "
+          f"in {summary['wall_seconds']:.1f}s: {summary['realtime_factor']:.1f}x real time")
+    print(f"Sampled {summary['frames_sampled']} frames, {summary['faces']} faces, "
+          f"{summary['students']} students seen; {summary['marked']} marked, "
+          f"{summary['already_marked']} already marked")
+
+
+if __name__ == "__main__":
+    main()
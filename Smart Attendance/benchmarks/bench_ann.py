@@ -0,0 +1,74 @@
+"""
+Recall@1 and latency of the ANN index against exact search.
+
+Probes are noisy copies of random gallery rows, so they behave like a fresh
+camera capture of an enrolled student. Recall@1 is measured against the
+exact (brute-force) answer, not against the identity the probe came from.
+
+Usage (from the "Smart Attendance" folder):
+    python benchmarks/bench_ann.py [--identities 50000] [--queries 500]
+    python benchmarks/bench_ann.py --backend hnsw   # needs 'pip install hnswlib'
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ann_index import ExactIndex, HNSWIndex, IVFIndex  # noqa: E402
+from gallery import _l2_normalize  # noqa: E402
+
+EMBEDDING_DIM = 128  # Facenet
+
+
+def run_queries(index, matrix, probes):
+    start = time.perf_counter()
+    best = [index.search(matrix, p, 1)[0] for p in probes]
+    elapsed = time.perf_counter() - start
+    best = np.array([rows[0] if len(rows) else -1 for rows in best])
+    return best, elapsed * 1000 / len(probes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--identities", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.6, help="probe noise relative to embedding scale")
+    parser.add_argument("--backend", choices=("ivf", "hnsw"), default="ivf")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    matrix = _l2_normalize(rng.standard_normal((args.identities, EMBEDDING_DIM))).astype(np.float32)
+    sources = rng.choice(args.identities, args.queries, replace=False)
+    noisy = matrix[sources] + args.noise * rng.standard_normal((args.queries, EMBEDDING_DIM)) / np.sqrt(EMBEDDING_DIM)
+    probes = _l2_normalize(noisy).astype(np.float32)
+
+    exact, exact_ms = run_queries(ExactIndex(), matrix, probes)
+    print(f"{args.identities} identities, {args.queries} queries")
+    print(f"{'setting':>14} {'recall@1':>9} {'ms/query':>9} {'speedup':>8}")
+    print(f"{'exact':>14} {1.0:>9.3f} {exact_ms:>9.3f} {1.0:>7.1f}x")
+
+    start = time.perf_counter()
+    if args.backend == "ivf":
+        index = IVFIndex.build(matrix)
+        knob, values = "nprobe", [v for v in (1, 4, 8, 16, 32, 64, 128) if v <= index.nlist]
+        print(f"(built IVF with nlist={index.nlist} in {time.perf_counter() - start:.1f}s)")
+    else:
+        index = HNSWIndex.build(matrix)
+        if index is None:
+            return
+        knob, values = "ef", (16, 32, 64, 128, 256)
+        print(f"(built HNSW in {time.perf_counter() - start:.1f}s)")
+
+    for value in values:
+        setattr(index, knob, value)
+        found, ms = run_queries(index, matrix, probes)
+        recall = float(np.mean(found == exact))
+        print(f"{knob + '=' + str(value):>14} {recall:>9.3f} {ms:>9.3f} {exact_ms / ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
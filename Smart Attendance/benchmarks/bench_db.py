@@ -0,0 +1,147 @@
+"""
+Throughput of the database layer under concurrent readers and writers.
+
+Compares the old connect-per-call access (rollback journal, new connection
+for every query) with the pooled WAL layer in database.py. Readers mimic the
+dashboard (today's list, student lookups); writers mimic recognizers marking
+attendance. Runs against a throwaway database file.
+
+Usage (from the "Smart Attendance" folder):
+    python benchmarks/bench_db.py [--readers 8] [--writers 2] [--seconds 5] [--students 2000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+class LegacyDB:
+    """The access pattern database.py used before: one connection per call."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def get_student(self, student_id):
+        conn = sqlite3.connect(self.path)
+        row = conn.execute("SELECT * FROM students WHERE student_id = ?", (student_id,)).fetchone()
+        conn.close()
+        return row
+
+    def get_attendance_by_date(self, date):
+        conn = sqlite3.connect(self.path)
+        rows = conn.execute('''SELECT a.*, s.name FROM attendance a
+                               JOIN students s ON a.student_id = s.student_id
+                               WHERE a.date = ? ORDER BY a.time''', (date,)).fetchall()
+        conn.close()
+        return rows
+
+    def mark_attendance(self, student_id, date, time_, status="Present"):
+        conn = sqlite3.connect(self.path)
+        c = conn.cursor()
+        c.execute("SELECT * FROM attendance WHERE student_id = ? AND date = ?", (student_id, date))
+        if c.fetchone():
+            conn.close()
+            return False
+        c.execute("INSERT INTO attendance (student_id, date, time, status) VALUES (?, ?, ?, ?)",
+                  (student_id, date, time_, status))
+        conn.commit()
+        conn.close()
+        return True
+
+
+def seed(path, students, legacy=False):
+    database.DB_PATH = path
+    database.create_tables()
+    conn = database.get_connection()
+    with conn:
+        conn.executemany("INSERT INTO students (name, student_id) VALUES (?, ?)",
+                         [(f"Student {i}", f"S{i:06d}") for i in range(students)])
+    database.close_connection()
+    if legacy:
+        # WAL is persistent in the file; put the legacy copy back on the rollback journal
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+
+
+def run(db, readers, writers, seconds, students):
+    stop = threading.Event()
+    counts = {'reads': 0, 'writes': 0, 'locked': 0}
+    lock = threading.Lock()
+    day_counter = iter(range(10 ** 9))
+
+    def reader():
+        rng = random.Random()
+        done = locked = 0
+        while not stop.is_set():
+            try:
+                if rng.random() < 0.5:
+                    db.get_attendance_by_date("2026-01-01")
+                else:
+                    db.get_student(f"S{rng.randrange(students):06d}")
+                done += 1
+            except sqlite3.OperationalError:
+                locked += 1
+        with lock:
+            counts['reads'] += done
+            counts['locked'] += locked
+
+    def writer():
+        rng = random.Random()
+        done = locked = 0
+        while not stop.is_set():
+            # Spread marks over many days so most of them are real inserts
+            date = f"2026-{next(day_counter) % 12 + 1:02d}-01"
+            try:
+                db.mark_attendance(f"S{rng.randrange(students):06d}", date, "09:00:00")
+                done += 1
+            except sqlite3.OperationalError:
+                locked += 1
+        with lock:
+            counts['writes'] += done
+            counts['locked'] += locked
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {k: v / seconds if k != 'locked' else v for k, v in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--students", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:.0f}s each")
+    print(f"{'layer':<22} {'reads/s':>9} {'writes/s':>9} {'locked errors':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        seed(legacy_path, args.students, legacy=True)
+        result = run(LegacyDB(legacy_path), args.readers, args.writers, args.seconds, args.students)
+        print(f"{'connect-per-call':<22} {result['reads']:>9.0f} {result['writes']:>9.0f} {result['locked']:>14}")
+
+        pooled_path = os.path.join(tmp, "pooled.db")
+        seed(pooled_path, args.students)
+        result = run(database, args.readers, args.writers, args.seconds, args.students)
+        print(f"{'pooled WAL (database)':<22} {result['reads']:>9.0f} {result['writes']:>9.0f} {result['locked']:>14}")
+        database.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Face detectors compared on recorded frames: speed and accuracy.
+
+Each available backend (haar always; yunet and ssd when their model files
+are in models/, see detector.py) is run in three configurations:
+
+  full-res     the whole frame at full resolution (how Haar used to run)
+  downscaled   the frame resized to --width pixels wide, boxes mapped back
+  +roi         downscaled, and only the regions around the previous boxes
+               are searched between full scans (every --full-scan frames)
+
+Frames come from video clips (every --every-th frame) or image folders and
+are decoded up front, so only detection is timed. Accuracy is precision and
+recall at IoU >= 0.5 against --labels, a JSON file mapping frame keys
+("clip.mp4:120" or "image.jpg") to lists of [x, y, w, h] boxes; without it
+the full-res run of --reference stands in for ground truth. Every false
+positive is a wasted embedding call in the live pipeline.
+
+Usage (from the "Smart Attendance" folder):
+    python benchmarks/bench_detectors.py clip.mp4 [frames/ ...] [--every 2] [--max-frames 300]
+    python benchmarks/bench_detectors.py clip.mp4 --labels labels.json --width 480
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import detector  # noqa: E402
+from recognize import _require_opencv  # noqa: E402
+from tracker import iou  # noqa: E402
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def load_frames(cv2, sources, every, max_frames):
+    """(key, frame) pairs from clips and image folders, in order."""
+    frames = []
+    for source in sources:
+        if os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                if name.lower().endswith(IMAGE_EXTENSIONS) and len(frames) < max_frames:
+                    frames.append((name, cv2.imread(os.path.join(source, name))))
+            continue
+        cap = cv2.VideoCapture(source)
+        index = 0
+        while len(frames) < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if index % every == 0:
+                frames.append((f"{os.path.basename(source)}:{index}", frame))
+            index += 1
+        cap.release()
+    return frames
+
+
+def available_backends():
+    backends = [detector.HaarBackend]
+    cv2 = _require_opencv()
+    if hasattr(cv2, "FaceDetectorYN") and os.path.isfile(detector.YUNET_MODEL):
+        backends.append(detector.YuNetBackend)
+    if os.path.isfile(detector.SSD_CONFIG) and os.path.isfile(detector.SSD_MODEL):
+        backends.append(detector.SsdBackend)
+    return backends
+
+
+def run(face_detector, frames):
+    """Boxes per frame key, and the frames per second of detection alone."""
+    boxes = {}
+    start = time.perf_counter()
+    for key, frame in frames:
+        boxes[key] = face_detector.detect(frame)
+    return boxes, len(frames) / (time.perf_counter() - start)
+
+
+def score(found, truth):
+    """Precision and recall over all frames, matching boxes greedily at IoU >= 0.5."""
+    true_positives = predicted = expected = 0
+    for key, wanted in truth.items():
+        remaining = [tuple(box) for box in wanted]
+        boxes = found.get(key, [])
+        predicted += len(boxes)
+        expected += len(remaining)
+        for box in boxes:
+            best = max(remaining, key=lambda other: iou(box, other), default=None)
+            if best is not None and iou(box, best) >= 0.5:
+                remaining.remove(best)
+                true_positives += 1
+    precision = true_positives / predicted if predicted else 1.0
+    recall = true_positives / expected if expected else 1.0
+    return precision, recall, predicted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help="video clips and/or folders of images")
+    parser.add_argument("--every", type=int, default=1, help="keep every Nth frame of a clip")
+    parser.add_argument("--max-frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=detector.DETECT_WIDTH, help="detection width")
+    parser.add_argument("--full-scan", type=int, default=detector.FULL_SCAN_EVERY,
+                        help="full-frame scan every N frames in the +roi runs")
+    parser.add_argument("--labels", help="JSON ground truth: frame key -> [[x, y, w, h], ...]")
+    parser.add_argument("--reference", default="yunet", help="backend whose full-res boxes stand in "
+                                                            "for ground truth without --labels")
+    args = parser.parse_args()
+
+    cv2 = _require_opencv()
+    if cv2 is None:
+        return
+    frames = load_frames(cv2, args.sources, args.every, args.max_frames)
+    if not frames:
+        print("No frames could be read.")
+        return
+    height, width = frames[0][1].shape[:2]
+    print(f"{len(frames)} frames ({width}x{height}), detection width {args.width}, "
+          f"full scan every {args.full_scan} frames in +roi runs")
+
+    configs = [("full-res", 0, 1), ("downscaled", args.width, 1), ("+roi", args.width, args.full_scan)]
+    results = {}
+    for backend_class in available_backends():
+        backend = backend_class(cv2)
+        for label, detect_width, full_scan_every in configs:
+            face_detector = detector.FaceDetector(backend, detect_width=detect_width,
+                                                  full_scan_every=full_scan_every)
+            results[(backend.name, label)] = run(face_detector, frames)
+
+    if args.labels:
+        with open(args.labels) as f:
+            truth = json.load(f)
+        keys = {key for key, _ in frames}
+        truth = {key: boxes for key, boxes in truth.items() if key in keys}
+        print(f"ground truth: {args.labels} ({len(truth)} labelled frames)")
+    else:
+        reference = args.reference if (args.reference, "full-res") in results else "haar"
+        truth = results[(reference, "full-res")][0]
+        print(f"ground truth: {reference} full-res boxes (pass --labels for real annotations)")
+
+    print(f"\n{'detector':<20} {'fps':>8} {'boxes/frame':>12} {'precision':>10} {'recall':>8}")
+    for (name, label), (boxes, fps) in results.items():
+        precision, recall, predicted = score(boxes, truth)
+        print(f"{name + ' ' + label:<20} {fps:>8.1f} {predicted / len(frames):>12.2f} "
+              f"{precision:>10.2f} {recall:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Untrained recognition: DeepFace.find per face vs. the cached dataset gallery vs. the trained store.
+
+Probe faces are --probes images (from --probe-dir, or sampled from the
+dataset itself) matched in batches of --batch, as the recognizer does for the
+faces of one frame. Reported per path:
+
+    DeepFace.find     the old fallback: one find() call per face (its first
+                      call, which builds the representation pickle inside
+                      the dataset folder, is shown separately)
+    dataset gallery   dataset_gallery.load_dataset_gallery: a cold build
+                      (nothing cached), a warm start (cache valid) and
+                      matching through recognize.identify_faces
+    trained           Gallery.load() of models/embeddings.bin, if train.py
+                      has been run, and the same matching
+
+The gallery cache is written to a temporary file, so the real one is left
+alone. Needs deepface; --skip-find leaves out the (slow) DeepFace.find path.
+
+Usage (from the "Smart Attendance" folder):
+    python benchmarks/bench_fallback.py [--dataset dataset] [--probes 50] [--batch 4] [--skip-find]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset_gallery import IMAGE_EXTENSIONS, load_dataset_gallery, scan_dataset  # noqa: E402
+from embedder import get_model  # noqa: E402
+from gallery import Gallery  # noqa: E402
+from recognize import _require_deepface, _require_opencv, identify_faces  # noqa: E402
+
+
+def probe_paths(dataset, probe_dir, count, seed=0):
+    if probe_dir:
+        paths = sorted(os.path.join(probe_dir, f) for f in os.listdir(probe_dir) if f.endswith(IMAGE_EXTENSIONS))
+    else:
+        paths = [path for _, images in scan_dataset(dataset).values() for path in images]
+    rng = np.random.default_rng(seed)
+    return [paths[i] for i in sorted(rng.choice(len(paths), min(count, len(paths)), replace=False))]
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def match_all(gallery, faces, batch):
+    """ms per face of identify_faces over `faces`, `batch` at a time."""
+    start = time.perf_counter()
+    for i in range(0, len(faces), batch):
+        identify_faces(gallery, faces[i:i + batch])
+    return (time.perf_counter() - start) * 1000 / len(faces)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--probe-dir", help="folder of face crops to match (default: sample the dataset)")
+    parser.add_argument("--probes", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=4, help="faces matched together, like one frame")
+    parser.add_argument("--skip-find", action="store_true", help="do not time DeepFace.find")
+    args = parser.parse_args()
+
+    cv2 = _require_opencv()
+    DeepFace = _require_deepface()
+    if cv2 is None or DeepFace is None:
+        return
+    students = {student_id: student_id for student_id in scan_dataset(args.dataset)}
+    if not students:
+        print(f"No images found under {args.dataset}/<student_id>/")
+        return
+    paths = probe_paths(args.dataset, args.probe_dir, args.probes)
+    faces = [cv2.imread(path) for path in paths]
+    images = sum(len(images) for _, images in scan_dataset(args.dataset).values())
+    print(f"{len(students)} students, {images} dataset images, {len(faces)} probe faces")
+    get_model()  # every path shares the same resident model; keep its build out of the timings
+
+    print(f"{'path':>16} {'start-up s':>11} {'ms/face':>9}")
+    if not args.skip_find:
+        first_s, _ = timed(DeepFace.find, img_path=faces[0], db_path=args.dataset, enforce_detection=False, silent=True)
+        find_s, _ = timed(lambda: [DeepFace.find(img_path=face, db_path=args.dataset, enforce_detection=False,
+                                                 silent=True) for face in faces[1:]])
+        print(f"{'DeepFace.find':>16} {first_s:>11.2f} {find_s * 1000 / max(1, len(faces) - 1):>9.1f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "dataset_embeddings.bin")
+        cold_s, gallery = timed(load_dataset_gallery, students, args.dataset, cache_path)
+        warm_s, gallery = timed(load_dataset_gallery, students, args.dataset, cache_path)
+        per_face = match_all(gallery, faces, args.batch)
+        print(f"{'gallery (cold)':>16} {cold_s:>11.2f} {per_face:>9.1f}")
+        print(f"{'gallery (warm)':>16} {warm_s:>11.2f} {per_face:>9.1f}")
+
+    load_s, trained = timed(Gallery.load)
+    if trained is None:
+        print(f"{'trained':>16}  (no models/embeddings.bin; run train.py to compare)")
+    else:
+        print(f"{'trained':>16} {load_s:>11.2f} {match_all(trained, faces, args.batch):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Push feed vs polling with hundreds of dashboard clients.
+
+Simulates N open dashboards while a writer marks attendance at a steady
+rate, and compares:
+
+  polling   every client re-runs the stats query each --poll-interval seconds
+            (what /api/stats polling costs without the cache)
+  feed      every client subscribes to the live feed; one poller tails the
+            attendance table and fans marks out (with --http, through real
+            /api/stream Server-Sent Events connections)
+
+Reports database queries per second, CPU seconds used and, for the feed,
+the delay from a mark being committed to each subscriber receiving it.
+Runs against a throwaway database.
+
+Usage (from the "Smart Attendance" folder):
+    python benchmarks/bench_feed.py [--clients 300] [--seconds 10] [--marks-per-sec 5] [--http]
+"""
+import argparse
+import datetime
+import http.client
+import itertools
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+def seed(students):
+    database.create_tables()
+    conn = database.get_connection()
+    with conn:
+        conn.executemany("INSERT INTO students (name, student_id) VALUES (?, ?)",
+                         [(f"Student {i}", f"S{i:06d}") for i in range(students)])
+
+
+_next_student = itertools.count()  # shared by all runs so every mark is a new row
+
+
+def writer(stop, marks_per_sec, committed):
+    today = datetime.datetime.now().strftime("%Y-%m-%d")
+    while not stop.wait(1.0 / marks_per_sec):
+        student_id = f"S{next(_next_student):06d}"
+        committed[student_id] = time.perf_counter()  # set first: the feed may see the row at once
+        database.mark_attendance(student_id, today, datetime.datetime.now().strftime("%H:%M:%S"))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def run_polling(clients, seconds, poll_interval, marks_per_sec):
+    stop = threading.Event()
+    queries = [0] * clients
+    today = datetime.datetime.now().strftime("%Y-%m-%d")
+
+    def client(i):
+        while not stop.wait(poll_interval):
+            database.count_stats(today)
+            queries[i] += 1
+        database.close_connection()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    threads.append(threading.Thread(target=writer, args=(stop, marks_per_sec, {})))
+    cpu = time.process_time()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {'queries_per_sec': sum(queries) / seconds, 'cpu_s': time.process_time() - cpu}
+
+
+def run_feed(clients, seconds, marks_per_sec, http_port=None, cookie=None):
+    from live_feed import AttendanceFeed
+
+    stop = threading.Event()
+    committed = {}
+    delays = []
+    lock = threading.Lock()
+    feed = None if http_port else AttendanceFeed()
+    ready = threading.Barrier(clients + 1)
+
+    def in_process_client():
+        subscription = feed.subscribe()
+        ready.wait()
+        received = []
+        while not stop.is_set():
+            try:
+                event, data = subscription.get(timeout=0.2)
+            except Exception:
+                continue
+            if event == 'mark':
+                received.append(time.perf_counter() - committed[data['student_id']])
+        subscription.close()
+        with lock:
+            delays.extend(received)
+
+    def http_client():
+        conn = http.client.HTTPConnection("127.0.0.1", http_port, timeout=1)
+        conn.request("GET", "/api/stream", headers={"Cookie": cookie})
+        response = conn.getresponse()
+        ready.wait()
+        received = []
+        event = None
+        while not stop.is_set():
+            try:
+                line = response.fp.readline().decode().strip()
+            except OSError:
+                continue  # read timeout; check stop again
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: ") and event == 'mark':
+                received.append(time.perf_counter() - committed[json.loads(line[6:])['student_id']])
+        conn.close()
+        with lock:
+            delays.extend(received)
+
+    target = http_client if http_port else in_process_client
+    threads = [threading.Thread(target=target) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    if feed is None:
+        import dashboard
+        feed = dashboard.live_feed
+    before = dict(feed.counters)
+    cpu = time.process_time()
+    write_thread = threading.Thread(target=writer, args=(stop, marks_per_sec, committed))
+    write_thread.start()
+    time.sleep(seconds)
+    stop.set()
+    write_thread.join()
+    for thread in threads:
+        thread.join()
+    cpu = time.process_time() - cpu
+    queries = feed.counters['queries'] - before['queries']
+    feed.stop()
+    return {'queries_per_sec': queries / seconds, 'cpu_s': cpu, 'delivered': len(delays),
+            'p50_ms': percentile(delays, 0.5) * 1000, 'p99_ms': percentile(delays, 0.99) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--marks-per-sec", type=float, default=5.0)
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds between polls per client")
+    parser.add_argument("--http", action="store_true", help="subscribe through /api/stream over HTTP")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "feed.db")
+        seed(100000)
+
+        print(f"{args.clients} clients, {args.marks_per_sec:g} marks/s, {args.seconds:.0f}s per run")
+        print(f"{'mode':<10} {'DB queries/s':>13} {'CPU s':>7} {'delivered':>10} {'p50 ms':>8} {'p99 ms':>8}")
+        result = run_polling(args.clients, args.seconds, args.poll_interval, args.marks_per_sec)
+        print(f"{'polling':<10} {result['queries_per_sec']:>13.1f} {result['cpu_s']:>7.2f}")
+
+        port = cookie = None
+        if args.http:
+            from werkzeug.serving import make_server
+            logging.getLogger("werkzeug").setLevel(logging.ERROR)
+            import dashboard
+            dashboard.STREAM_KEEPALIVE = 1
+            server = make_server("127.0.0.1", 0, dashboard.app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            port = server.server_port
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+            conn.request("POST", "/login", body="username=admin&password=admin123",
+                         headers={"Content-Type": "application/x-www-form-urlencoded"})
+            response = conn.getresponse()
+            response.read()
+            cookie = response.getheader("Set-Cookie").split(";")[0]
+        result = run_feed(args.clients, args.seconds, args.marks_per_sec, port, cookie)
+        print(f"{'feed':<10} {result['queries_per_sec']:>13.1f} {result['cpu_s']:>7.2f} "
+              f"{result['delivered']:>10} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}")
+        database.close_connection()
+
+
+if __name__ == "__main__":
+    main()
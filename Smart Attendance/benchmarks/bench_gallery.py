@@ -0,0 +1,90 @@
+"""
+Micro-benchmark: per-student Python loop vs. vectorized Gallery matching.
+
+Usage (from the "Smart Attendance" folder):
+    python benchmarks/bench_gallery.py [--probes 32] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gallery import Gallery  # noqa: E402
+
+EMBEDDING_DIM = 128  # Facenet
+SIZES = (100, 1000, 10000)
+
+
+def synthetic_embeddings(n, dim=EMBEDDING_DIM, seed=0):
+    """Build a dict shaped like the one `train.load_embeddings` returns."""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim))
+    return {
+        f"S{i:06d}": {'name': f"Student {i}", 'embedding': vectors[i].tolist(), 'images_used': 10}
+        for i in range(n)
+    }
+
+
+def cosine_distance(a, b):
+    """The per-pair distance the old loop computed."""
+    a_norm = np.linalg.norm(a)
+    b_norm = np.linalg.norm(b)
+    if a_norm == 0 or b_norm == 0:
+        return float("inf")
+    return 1.0 - float(np.dot(a, b) / (a_norm * b_norm))
+
+
+def loop_match(embeddings, probe):
+    """The matching loop recognize_faces used before the Gallery existed."""
+    best_match = None
+    best_distance = float('inf')
+    for student_id, data in embeddings.items():
+        stored_emb = np.array(data['embedding'])
+        distance = cosine_distance(probe, stored_emb)
+        if distance < best_distance:
+            best_distance = distance
+            best_match = student_id
+    return best_match, best_distance
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--probes", type=int, default=32, help="probe faces per batch")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repetitions (best is reported)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    print(f"{'identities':>10} {'loop ms/probe':>14} {'gallery ms/probe':>17} {'batch ms/probe':>15} {'speedup':>8}")
+    for n in SIZES:
+        embeddings = synthetic_embeddings(n)
+        gallery = Gallery.from_embeddings(embeddings)
+        probes = rng.standard_normal((args.probes, EMBEDDING_DIM))
+
+        # Sanity check: both paths must agree on the best match
+        for probe in probes[:4]:
+            assert loop_match(embeddings, probe)[0] == gallery.best_match(probe)[0]
+
+        loop_s = best_of(lambda: [loop_match(embeddings, p) for p in probes], args.repeat)
+        single_s = best_of(lambda: [gallery.best_match(p) for p in probes], args.repeat)
+        batch_s = best_of(lambda: gallery.search(probes, k=5), args.repeat)
+
+        per_probe = lambda seconds: seconds * 1000 / args.probes  # noqa: E731
+        print(f"{n:>10} {per_probe(loop_s):>14.3f} {per_probe(single_s):>17.3f} "
+              f"{per_probe(batch_s):>15.4f} {loop_s / batch_s:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
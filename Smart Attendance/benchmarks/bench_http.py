@@ -0,0 +1,181 @@
+"""
+HTTP load test for the web dashboard: p50/p99 latency per endpoint.
+
+Starts the dashboard against a throwaway, seeded database - under the Flask
+development server (`dashboard.py` as shipped, debug mode) and under the
+production entry point (`wsgi.py`) - and drives /dashboard, /attendance and
+/api/stats from --clients concurrent keep-alive clients. Point --url at an
+already running server to measure that instead.
+
+Usage (from the "Smart Attendance" folder):
+    python benchmarks/bench_http.py [--clients 32] [--seconds 10] [--workers 4] [--threads 16]
+    python benchmarks/bench_http.py --servers wsgi --server waitress
+    python benchmarks/bench_http.py --url http://127.0.0.1:8000
+"""
+import argparse
+import datetime
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, HERE)
+
+import database  # noqa: E402
+
+PATHS = ("/dashboard", "/attendance", "/api/stats")
+
+
+def seed(path, students, days):
+    database.DB_PATH = path
+    database.create_tables()
+    conn = database.get_connection()
+    today = datetime.date.today()
+    with conn:
+        conn.executemany("INSERT INTO students (name, student_id) VALUES (?, ?)",
+                         [(f"Student {i}", f"S{i:06d}") for i in range(students)])
+        conn.executemany(
+            "INSERT INTO attendance (student_id, date, time, status) VALUES (?, ?, '09:00:00', 'Present')",
+            ((f"S{s:06d}", (today - datetime.timedelta(days=d)).isoformat())
+             for d in range(days) for s in range(students) if (s + d) % 5))
+    database.close_connection()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, db_path, port, workers, threads, server):
+    env = dict(os.environ, ATTENDANCE_DB=db_path)
+    if kind == "dev":
+        code = f"import dashboard; dashboard.app.run(debug=True, use_reloader=False, port={port}, threaded=True)"
+        command = [sys.executable, "-c", code]
+    else:
+        command = [sys.executable, "wsgi.py", "--host", "127.0.0.1", "--port", str(port),
+                   "--workers", str(workers), "--threads", str(threads), "--server", server]
+    process = subprocess.Popen(command, cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{kind} server did not start")
+
+
+def login(host, port):
+    conn = http.client.HTTPConnection(host, port)
+    conn.request("POST", "/login", body="username=admin&password=admin123",
+                 headers={"Content-Type": "application/x-www-form-urlencoded"})
+    response = conn.getresponse()
+    response.read()
+    return response.getheader("Set-Cookie").split(";")[0]
+
+
+def load(host, port, clients, seconds):
+    cookie = login(host, port)
+    stop = threading.Event()
+    latencies = {path: [] for path in PATHS}
+    errors = []
+    lock = threading.Lock()
+
+    def client(offset):
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        mine = {path: [] for path in PATHS}
+        failed = 0
+        i = offset
+        while not stop.is_set():
+            path = PATHS[i % len(PATHS)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers={"Cookie": cookie})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+                continue
+            mine[path].append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            for path, values in mine.items():
+                latencies[path].extend(values)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(errors)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000 if values else 0.0
+
+
+def report(name, latencies, errors, seconds):
+    total = sum(len(v) for v in latencies.values())
+    print(f"{name}: {total / seconds:.0f} requests/s, {errors} errors")
+    for path, values in latencies.items():
+        print(f"  {path:<12} {len(values):>7} requests   p50 {percentile(values, 0.5):7.1f} ms   "
+              f"p99 {percentile(values, 0.99):7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="measure an already running dashboard instead")
+    parser.add_argument("--servers", default="dev,wsgi", help="comma-separated: dev, wsgi")
+    parser.add_argument("--server", default="auto", help="wsgi.py --server (auto, gunicorn, waitress)")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=60)
+    args = parser.parse_args()
+
+    if args.url:
+        url = urllib.parse.urlparse(args.url)
+        latencies, errors = load(url.hostname, url.port or 80, args.clients, args.seconds)
+        report(args.url, latencies, errors, args.seconds)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "http.db")
+        seed(db_path, args.students, args.days)
+        print(f"{args.students} students, {args.days} days of marks, {args.clients} clients, "
+              f"{args.seconds:.0f}s per server")
+        for kind in args.servers.split(","):
+            port = free_port()
+            process = start_server(kind, db_path, port, args.workers, args.threads, args.server)
+            try:
+                latencies, errors = load("127.0.0.1", port, args.clients, args.seconds)
+            finally:
+                process.terminate()
+                process.wait()
+            name = "Flask dev server (debug)" if kind == "dev" else \
+                f"wsgi.py --server {args.server} ({args.workers} workers x {args.threads} threads)"
+            report(name, latencies, errors, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
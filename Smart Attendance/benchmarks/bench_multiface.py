@@ -0,0 +1,96 @@
+"""
+Faces/sec of per-face vs. batched embedding on recorded multi-person clips.
+
+Every processed frame is run through Haar detection, then all detected faces
+are embedded either one DeepFace.represent call at a time (the old per-face
+path) or in a single batched forward pass (recognize.identify_faces).
+
+Usage (from the "Smart Attendance" folder):
+    python benchmarks/bench_multiface.py clip1.mp4 [clip2.mp4 ...] [--every 5] [--max-frames 300]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedder import MODEL_NAME, get_model  # noqa: E402
+from gallery import Gallery  # noqa: E402
+from recognize import _require_deepface, _require_opencv, crop_faces, identify_faces  # noqa: E402
+
+
+def sample_frames(cv2, path, every, max_frames):
+    """Yield every `every`-th frame of a clip, like the live loop does."""
+    cap = cv2.VideoCapture(path)
+    index = 0
+    kept = 0
+    while kept < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        index += 1
+        if index % every == 0:
+            kept += 1
+            yield frame
+    cap.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("clips", nargs="+", help="recorded video files with several people in frame")
+    parser.add_argument("--every", type=int, default=5, help="process every Nth frame")
+    parser.add_argument("--max-frames", type=int, default=300, help="processed frames per clip")
+    args = parser.parse_args()
+
+    cv2 = _require_opencv()
+    DeepFace = _require_deepface()
+    if cv2 is None or DeepFace is None:
+        return
+
+    gallery = Gallery.load()
+    if gallery is None:
+        # Matching cost is negligible next to embedding; a random gallery is enough
+        rng = np.random.default_rng(0)
+        gallery = Gallery([f"S{i}" for i in range(1000)], {}, rng.standard_normal((1000, 128)))
+    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+    frames_faces = []
+    for clip in args.clips:
+        for frame in sample_frames(cv2, clip, args.every, args.max_frames):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+            if len(faces) > 0:
+                frames_faces.append(crop_faces(frame, faces))
+    total_faces = sum(len(rois) for rois in frames_faces)
+    if not total_faces:
+        print("No faces detected in the given clips.")
+        return
+    print(f"{len(frames_faces)} frames with faces, {total_faces} faces "
+          f"({total_faces / len(frames_faces):.1f} per frame)")
+
+    # Build the model outside the timed sections
+    get_model()
+    DeepFace.represent(img_path=frames_faces[0][0], model_name=MODEL_NAME, enforce_detection=False)
+
+    start = time.perf_counter()
+    for rois in frames_faces:
+        for roi in rois:
+            embedding = DeepFace.represent(img_path=roi, model_name=MODEL_NAME, enforce_detection=False)
+            gallery.best_match(np.array(embedding[0]['embedding']))
+    per_face_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for rois in frames_faces:
+        identify_faces(gallery, rois)
+    batched_s = time.perf_counter() - start
+
+    print(f"{'path':<22} {'faces/sec':>10} {'ms/frame':>9}")
+    print(f"{'per-face represent':<22} {total_faces / per_face_s:>10.1f} {per_face_s * 1000 / len(frames_faces):>9.1f}")
+    print(f"{'batched per frame':<22} {total_faces / batched_s:>10.1f} {batched_s * 1000 / len(frames_faces):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
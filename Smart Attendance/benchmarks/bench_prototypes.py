@@ -0,0 +1,184 @@
+"""
+One mean embedding per student vs. clustered prototypes with adaptive thresholds.
+
+Evaluates on the enrollment layout, dataset/<student_id>/*.jpg. Each
+student's images are split into --folds folds; in turn, one fold is used as
+probes and the rest (at most MAX_IMAGES_PER_STUDENT, like train.py) build
+the gallery. Every --impostor-every-th student is left out of the gallery
+for the fold, so their probes measure false matches of people who are not
+enrolled. Embeddings are taken from models/manifest.pkl where train.py has
+already computed them; other images are embedded here (needs deepface).
+
+Compared, at the same global threshold:
+
+    mean         one averaged embedding per student (the old gallery)
+    prototypes   up to --prototypes clustered embeddings per student
+    adaptive     prototypes plus per-student thresholds (within
+                 --threshold-range of the global one)
+
+Reported: rank-1 (nearest student is right), accepted (matched to the right
+student under the threshold), false match (accepted as someone else, over
+all probes) and impostor accepted (not-enrolled probes matched to anyone).
+Latency is the time for one batched search of --probes faces, on the
+evaluation gallery and on synthetic galleries of --sizes students.
+
+Usage (from the "Smart Attendance" folder):
+    python benchmarks/bench_prototypes.py [--dataset dataset] [--folds 3] [--prototypes 3]
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gallery import Gallery  # noqa: E402
+from prototypes import PROTOTYPES, build_prototypes  # noqa: E402
+from recognize import THRESHOLD, THRESHOLD_RANGE  # noqa: E402
+from train import MANIFEST_FILE, MAX_IMAGES_PER_STUDENT  # noqa: E402
+
+METHODS = ("mean", "prototypes", "adaptive")
+
+
+def load_dataset(dataset):
+    """student_id -> embeddings of their images, in path order."""
+    images = {}
+    for student_id in sorted(os.listdir(dataset)):
+        folder = os.path.join(dataset, student_id)
+        if os.path.isdir(folder):
+            paths = sorted(os.path.join(folder, f) for f in os.listdir(folder)
+                           if f.endswith(('.jpg', '.jpeg', '.png')))
+            if paths:
+                images[student_id] = paths
+
+    known = {}
+    if os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE, 'rb') as f:
+            known = {path: entry['embedding'] for path, entry in pickle.load(f)['images'].items()}
+    missing = [path for paths in images.values() for path in paths if path not in known]
+    if missing:
+        from embedder import embed_image_files
+        print(f"Embedding {len(missing)} images not in {MANIFEST_FILE}...")
+        known.update(embed_image_files(missing))
+
+    embeddings = {}
+    for student_id, paths in images.items():
+        vectors = [known[path] for path in paths if known.get(path) is not None]
+        if vectors:
+            embeddings[student_id] = np.asarray(vectors, dtype=np.float32)
+    return embeddings
+
+
+def build_galleries(training, k):
+    """The three galleries for one fold, from student_id -> training embeddings."""
+    mean, clustered, adaptive = {}, {}, {}
+    for student_id, vectors in training.items():
+        vectors = vectors[:MAX_IMAGES_PER_STUDENT]
+        prototypes, threshold = build_prototypes(vectors, k)
+        mean[student_id] = {'name': student_id, 'embedding': vectors.mean(axis=0)}
+        clustered[student_id] = {'name': student_id, 'embedding': vectors.mean(axis=0), 'prototypes': prototypes}
+        adaptive[student_id] = dict(clustered[student_id], threshold=threshold)
+    return {'mean': Gallery.from_embeddings(mean),
+            'prototypes': Gallery.from_embeddings(clustered),
+            'adaptive': Gallery.from_embeddings(adaptive)}
+
+
+def timed_search(gallery, probes, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        gallery.search(probes, k=1)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def evaluate(embeddings, args):
+    counts = {method: dict.fromkeys(("rank1", "accepted", "false", "impostor_accepted"), 0) for method in METHODS}
+    enrolled_probes = impostor_probes = 0
+    latency = dict.fromkeys(METHODS, 0.0)
+    students = list(embeddings)
+    for fold in range(args.folds):
+        impostors = {s for j, s in enumerate(students) if j % args.impostor_every == fold % args.impostor_every}
+        training, probes, truth = {}, [], []
+        for student_id, vectors in embeddings.items():
+            in_fold = np.arange(len(vectors)) % args.folds == fold
+            if student_id not in impostors:
+                if (~in_fold).sum() == 0:
+                    continue
+                training[student_id] = vectors[~in_fold]
+            probes.extend(vectors[in_fold])
+            truth.extend([None if student_id in impostors else student_id] * int(in_fold.sum()))
+        if not training or not probes:
+            continue
+        probes = np.asarray(probes, dtype=np.float32)
+        truth = np.array(truth, dtype=object)
+        enrolled = truth != None  # noqa: E711
+        enrolled_probes += int(enrolled.sum())
+        impostor_probes += int((~enrolled).sum())
+
+        for method, gallery in build_galleries(training, args.prototypes).items():
+            ids, distances = gallery.search(probes, k=1)
+            ids, distances = ids[:, 0], distances[:, 0]
+            shift = args.threshold_range if method == "adaptive" else 0.0
+            accepted = distances < gallery.thresholds(ids, args.threshold, shift)
+            correct = ids == truth
+            result = counts[method]
+            result["rank1"] += int((correct & enrolled).sum())
+            result["accepted"] += int((correct & accepted & enrolled).sum())
+            result["false"] += int((~correct & accepted).sum())
+            result["impostor_accepted"] += int((accepted & ~enrolled).sum())
+            batch = probes[:args.probes]
+            latency[method] += timed_search(gallery, batch, args.repeat) / args.folds
+    return counts, enrolled_probes, impostor_probes, latency
+
+
+def synthetic_latency(sizes, k, batch, repeat, dim=128, seed=0):
+    """Batched search time on made-up galleries: one row per student vs. k."""
+    rng = np.random.default_rng(seed)
+    print(f"\n{'students':>9} {'mean ms':>9} {f'{k} prototypes ms':>17}")
+    for n in sizes:
+        centers = rng.standard_normal((n, dim)).astype(np.float32)
+        rows = np.repeat(centers, k, axis=0) + 0.3 * rng.standard_normal((n * k, dim)).astype(np.float32)
+        ids = [f"S{i:06d}" for i in range(n)]
+        mean = Gallery(ids, {}, centers)
+        clustered = Gallery(np.repeat(ids, k).tolist(), {}, rows)
+        probes = rng.standard_normal((batch, dim)).astype(np.float32)
+        print(f"{n:>9} {timed_search(mean, probes, repeat):>9.2f} {timed_search(clustered, probes, repeat):>17.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--impostor-every", type=int, default=5,
+                        help="leave every N-th student out of the gallery in each fold")
+    parser.add_argument("--prototypes", type=int, default=PROTOTYPES)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--threshold-range", type=float, default=THRESHOLD_RANGE)
+    parser.add_argument("--probes", type=int, default=32, help="faces per timed search batch")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="synthetic gallery sizes for latency")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repetitions (best is reported)")
+    args = parser.parse_args()
+
+    embeddings = load_dataset(args.dataset)
+    if len(embeddings) < 2:
+        print(f"Need images of at least two students under {args.dataset}/<student_id>/")
+        return
+    counts, enrolled, impostors, latency = evaluate(embeddings, args)
+    print(f"{len(embeddings)} students, {enrolled} enrolled and {impostors} not-enrolled probes, "
+          f"threshold {args.threshold}")
+    print(f"{'method':>11} {'rank-1':>8} {'accepted':>9} {'false match':>12} {'impostor acc.':>14} {'search ms':>10}")
+    for method in METHODS:
+        result = counts[method]
+        rate = lambda count, total: 100.0 * count / total if total else 0.0  # noqa: E731
+        print(f"{method:>11} {rate(result['rank1'], enrolled):>7.1f}% {rate(result['accepted'], enrolled):>8.1f}% "
+              f"{rate(result['false'], enrolled + impostors):>11.2f}% "
+              f"{rate(result['impostor_accepted'], impostors):>13.2f}% {latency[method]:>10.3f}")
+    synthetic_latency([int(s) for s in args.sizes.split(",")], args.prototypes, args.probes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Report queries on multi-year data: grouping `attendance` vs the rollups.
+
+Builds a throwaway database with --years of school days for --students
+students on the schema before the rollup migration, and times the three
+reports (per-student month, daily summary over the whole history, one
+student's months) computed by grouping the raw marks. It then runs the
+rollup migration (timing the one-off backfill) and times the same reports
+read from attendance_daily / attendance_monthly, plus what the triggers add
+to the cost of a mark.
+
+Usage (from the "Smart Attendance" folder):
+    python benchmarks/bench_reports.py [--students 2000] [--years 3] [--repeat 20]
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+def raw_monthly(conn, month):
+    return conn.execute('''SELECT s.student_id, s.name, COUNT(a.id),
+                                  (SELECT COUNT(DISTINCT date) FROM attendance
+                                   WHERE date BETWEEN :month || '-01' AND :month || '-31')
+                           FROM students s
+                           LEFT JOIN attendance a ON a.student_id = s.student_id
+                                AND a.date BETWEEN :month || '-01' AND :month || '-31'
+                           GROUP BY s.student_id ORDER BY s.name''', {'month': month}).fetchall()
+
+
+def raw_daily(conn, date_from, date_to):
+    return conn.execute('''SELECT date, COUNT(*), (SELECT COUNT(*) FROM students) FROM attendance
+                           WHERE date BETWEEN ? AND ? GROUP BY date ORDER BY date''',
+                        (date_from, date_to)).fetchall()
+
+
+def raw_student(conn, student_id):
+    return conn.execute('''SELECT m.month, m.days,
+                                  (SELECT COUNT(DISTINCT date) FROM attendance
+                                   WHERE date BETWEEN m.month || '-01' AND m.month || '-31')
+                           FROM (SELECT substr(date, 1, 7) AS month, COUNT(*) AS days FROM attendance
+                                 WHERE student_id = ? GROUP BY 1) m
+                           ORDER BY m.month''', (student_id,)).fetchall()
+
+
+def school_days(years):
+    day = datetime.date(2023, 1, 2)
+    days = []
+    while len(days) < years * 200:
+        if day.weekday() < 5:
+            days.append(day.isoformat())
+        day += datetime.timedelta(days=1)
+    return days
+
+
+def build(students, days):
+    """Schema before the rollups, with each student present on ~90% of days."""
+    conn = database.get_connection()
+    conn.execute("BEGIN")
+    for number, migration in enumerate(database.MIGRATIONS[:2], start=1):
+        migration(conn)
+        conn.execute(f"PRAGMA user_version = {number}")
+    conn.executemany("INSERT INTO students (name, student_id) VALUES (?, ?)",
+                     [(f"Student {i}", f"S{i:06d}") for i in range(students)])
+    conn.executemany(
+        "INSERT INTO attendance (student_id, date, time, status) VALUES (?, ?, '09:00:00', 'Present')",
+        ((f"S{s:06d}", date) for d, date in enumerate(days) for s in range(students) if (s * 7 + d) % 10))
+    conn.commit()
+    return conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
+
+
+def timed(repeat, fn, *args):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args)
+    return (time.perf_counter() - start) * 1000 / repeat, result
+
+
+def time_marks(date, count):
+    """Milliseconds per mark for `count` new marks on a day outside the reports."""
+    start = time.perf_counter()
+    for s in range(count):
+        database.mark_attendance(f"S{s:06d}", date, "09:00:00")
+    return (time.perf_counter() - start) * 1000 / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "reports.db")
+        days = school_days(args.years)
+        rows = build(args.students, days)
+        conn = database.get_connection()
+        month = days[len(days) // 2][:7]
+        student = f"S{args.students - 1:06d}"  # not among the students time_marks() marks
+        marks = min(500, args.students - 1)
+        print(f"{rows} marks, {args.students} students, {len(days)} school days")
+
+        before = {
+            'monthly': timed(args.repeat, raw_monthly, conn, month),
+            'daily': timed(args.repeat, raw_daily, conn, days[0], days[-1]),
+            'student': timed(args.repeat, raw_student, conn, student),
+        }
+        mark_before = time_marks("2099-01-01", marks)
+
+        start = time.perf_counter()
+        database.create_tables()
+        print(f"rollup migration (one-off backfill): {time.perf_counter() - start:.2f}s")
+
+        after = {
+            'monthly': timed(args.repeat, database.get_monthly_report, month),
+            'daily': timed(args.repeat, database.get_daily_report, days[0], days[-1]),
+            'student': timed(args.repeat, database.get_student_report, student),
+        }
+        mark_after = time_marks("2099-01-02", marks)
+
+        print(f"{'report':<28} {'grouping ms':>12} {'rollup ms':>10} {'speedup':>8}")
+        labels = {'monthly': f"students in {month}", 'daily': "daily summary, all days",
+                  'student': "one student, all months"}
+        for name, label in labels.items():
+            (raw_ms, raw_rows), (rollup_ms, rollup_rows) = before[name], after[name]
+            assert [tuple(r)[-2:] for r in raw_rows] == [tuple(r)[-2:] for r in rollup_rows], name
+            print(f"{label:<28} {raw_ms:>12.2f} {rollup_ms:>10.2f} {raw_ms / rollup_ms:>7.0f}x")
+        print(f"{'mark_attendance':<28} {mark_before:>12.3f} {mark_after:>10.3f}  (ms per mark, with triggers after)")
+        database.close_connection()
+
+
+if __name__ == "__main__":
+    main()
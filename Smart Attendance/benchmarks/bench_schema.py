@@ -0,0 +1,110 @@
+"""
+Before/after benchmark of the attendance indexes on a synthetic large table.
+
+Builds a throwaway database with --rows attendance marks (default one
+million) on the original, unindexed schema and times the old
+SELECT-then-INSERT mark and the date lookup. It then opens the database
+through the database module, which migrates it (as it does the shipped
+attendance.db, at user_version 0), and times the same operations again with
+the indexes and INSERT ... ON CONFLICT DO NOTHING.
+
+Usage (from the "Smart Attendance" folder):
+    python benchmarks/bench_schema.py [--rows 1000000] [--students 5000] [--ops 200]
+"""
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+def legacy_mark(conn, student_id, date, time_, status="Present"):
+    c = conn.cursor()
+    c.execute("SELECT * FROM attendance WHERE student_id = ? AND date = ?", (student_id, date))
+    if c.fetchone():
+        return False
+    c.execute("INSERT INTO attendance (student_id, date, time, status) VALUES (?, ?, ?, ?)",
+              (student_id, date, time_, status))
+    conn.commit()
+    return True
+
+
+def by_date(conn, date):
+    return conn.execute('''SELECT a.*, s.name FROM attendance a
+                           JOIN students s ON a.student_id = s.student_id
+                           WHERE a.date = ? ORDER BY a.time''', (date,)).fetchall()
+
+
+def build(path, rows, students):
+    """Original schema (user_version 0, as before migrations), filled with `rows` unique marks."""
+    # A plain connection: the database module would migrate it on opening
+    conn = sqlite3.connect(path)
+    for name, value in database.PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    conn.execute("BEGIN")
+    database.MIGRATIONS[0](conn)
+    conn.executemany("INSERT INTO students (name, student_id) VALUES (?, ?)",
+                     [(f"Student {i}", f"S{i:06d}") for i in range(students)])
+    first_day = datetime.date(2020, 1, 1)
+    days = -(-rows // students)
+    conn.executemany(
+        "INSERT INTO attendance (student_id, date, time, status) VALUES (?, ?, ?, 'Present')",
+        ((f"S{n % students:06d}", (first_day + datetime.timedelta(days=n // students)).isoformat(),
+          f"{8 + n % 8:02d}:{n % 60:02d}:00") for n in range(rows)))
+    conn.commit()
+    return conn, [(first_day + datetime.timedelta(days=d)).isoformat() for d in range(days)]
+
+
+def time_ops(label, ops, mark, lookup, dates, students):
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for i in range(ops):
+        # Half repeat marks (already present), half new days
+        if i % 2:
+            mark(f"S{rng.randrange(students):06d}", rng.choice(dates), "09:00:00")
+        else:
+            mark(f"S{rng.randrange(students):06d}", f"2099-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "09:00:00")
+    mark_ms = (time.perf_counter() - start) * 1000 / ops
+
+    start = time.perf_counter()
+    for _ in range(ops):
+        lookup(rng.choice(dates))
+    lookup_ms = (time.perf_counter() - start) * 1000 / ops
+    print(f"{label:<8} {mark_ms:>10.3f} {lookup_ms:>16.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--ops", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        start = time.perf_counter()
+        conn, dates = build(database.DB_PATH, args.rows, args.students)
+        print(f"Built {args.rows} rows in {time.perf_counter() - start:.1f}s")
+        print(f"{'schema':<8} {'mark ms/op':>10} {'by-date ms/query':>16}")
+
+        time_ops("before", args.ops, lambda *a: legacy_mark(conn, *a), lambda d: by_date(conn, d),
+                 dates, args.students)
+        conn.close()
+
+        start = time.perf_counter()
+        database.get_connection()
+        print(f"(migrated to schema v{database.schema_version()} in {time.perf_counter() - start:.1f}s)")
+        time_ops("after", args.ops, database.mark_attendance, database.get_attendance_by_date,
+                 dates, args.students)
+        database.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Aggregate faces/sec and per-stream latency of the multi-camera server.
+
+Local video files stand in for cameras: by default each one is played back
+at its own frame rate, like a live stream, and nothing is written to the
+attendance table.
+
+Usage (from the "Smart Attendance" folder):
+    python benchmarks/bench_server.py door1.mp4 door2.mp4 door3.mp4 [--batch-size 16]
+    python benchmarks/bench_server.py clip.mp4 --copies 8   # one file, eight "cameras"
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gallery import Gallery  # noqa: E402
+from recognition_server import BATCH_SIZE, RecognitionServer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("clips", nargs="+", help="video files standing in for cameras")
+    parser.add_argument("--copies", type=int, default=1, help="streams to open per clip")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--embed-workers", type=int, default=1)
+    parser.add_argument("--no-realtime", action="store_true", help="decode files as fast as possible")
+    args = parser.parse_args()
+
+    gallery = Gallery.load()
+    if gallery is None or len(gallery) == 0:
+        # Matching cost is small next to embedding; a random gallery is enough
+        rng = np.random.default_rng(0)
+        gallery = Gallery([f"S{i}" for i in range(1000)], {}, rng.standard_normal((1000, 128)))
+
+    sources = [clip for clip in args.clips for _ in range(args.copies)]
+    server = RecognitionServer(sources, gallery, batch_size=args.batch_size,
+                               embed_workers=args.embed_workers,
+                               realtime=not args.no_realtime, dry_run=True)
+    if not server.start():
+        return
+    print(f"{len(server.streams)} streams, batch size {args.batch_size}, "
+          f"{args.embed_workers} embedding thread(s)")
+    try:
+        while server.running:
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    print(server.format_stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Cold-start cost of the face model, split into its phases.
+
+Each run happens in a fresh Python process, so nothing is cached in memory:
+
+  import tensorflow   importing TensorFlow
+  import deepface     importing DeepFace on top of it
+  build model         DeepFace.build_model('Facenet'), including the weights
+  first inference     the first forward pass (graph tracing, kernel set-up)
+  warm inference      average of later single-face forward passes
+
+The first four are what a "Mark Attendance" click paid before the model was
+kept resident; with model_manager.warm_up() at GUI start-up they are paid
+once, in the background, and later sessions only pay the warm inference.
+
+Usage (from the "Smart Attendance" folder):
+    python benchmarks/bench_startup.py [--runs 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES = ("import tensorflow", "import deepface", "build model", "first inference", "warm inference")
+
+
+def child():
+    """Measure one cold start in this (fresh) process and print it as JSON."""
+    sys.path.insert(0, HERE)
+    timings = {}
+    start = time.perf_counter()
+    import tensorflow  # noqa: F401
+    timings["import tensorflow"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    from deepface import DeepFace  # noqa: F401
+    timings["import deepface"] = time.perf_counter() - start
+
+    import numpy as np
+    from embedder import TARGET_SIZE, get_model
+    start = time.perf_counter()
+    model = get_model()
+    timings["build model"] = time.perf_counter() - start
+
+    face = np.random.default_rng(0).random((1,) + TARGET_SIZE + (3,), dtype=np.float32)
+    start = time.perf_counter()
+    model(face, training=False)
+    timings["first inference"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(10):
+        model(face, training=False)
+    timings["warm inference"] = (time.perf_counter() - start) / 10
+    print(json.dumps(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL="2")
+    runs = []
+    for i in range(args.runs):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], cwd=HERE, env=env,
+                                capture_output=True, text=True)
+        if output.returncode != 0:
+            print(output.stderr.strip().splitlines()[-1] if output.stderr.strip() else "child process failed")
+            return
+        runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+        print(f"run {i + 1}: cold start {sum(runs[-1][p] for p in PHASES[:4]):.1f}s")
+
+    print(f"\n{'phase':<18} {'mean s':>8} {'min s':>8}")
+    for phase in PHASES:
+        values = [run[phase] for run in runs]
+        print(f"{phase:<18} {sum(values) / len(values):>8.3f} {min(values):>8.3f}")
+    cold = [sum(run[p] for p in PHASES[:4]) for run in runs]
+    print(f"{'cold start total':<18} {sum(cold) / len(cold):>8.3f} {min(cold):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
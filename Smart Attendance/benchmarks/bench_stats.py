@@ -0,0 +1,150 @@
+"""
+Load test for the dashboard stats endpoint.
+
+Serves dashboard.py on a local port and hammers /api/stats from several
+client threads, reporting requests/sec for:
+
+  uncached      the old handler: fetch every student and today's marks, len()
+  cached        the StatsService handler
+  conditional   the same, with clients sending If-None-Match (304 responses)
+
+Optionally a writer marks attendance in the background so the cache keeps
+being invalidated. Runs against a throwaway database.
+
+Usage (from the "Smart Attendance" folder):
+    python benchmarks/bench_stats.py [--students 20000] [--present 15000] [--clients 8] [--seconds 5] [--marks-per-sec 5]
+"""
+import argparse
+import datetime
+import http.client
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+def seed(students, present):
+    database.create_tables()
+    conn = database.get_connection()
+    today = datetime.datetime.now().strftime("%Y-%m-%d")
+    with conn:
+        conn.executemany("INSERT INTO students (name, student_id) VALUES (?, ?)",
+                         [(f"Student {i}", f"S{i:06d}") for i in range(students)])
+        conn.executemany("INSERT INTO attendance (student_id, date, time, status) VALUES (?, ?, '09:00:00', 'Present')",
+                         [(f"S{i:06d}", today) for i in range(present)])
+
+
+def login(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("POST", "/login", body="username=admin&password=admin123",
+                 headers={"Content-Type": "application/x-www-form-urlencoded"})
+    response = conn.getresponse()
+    response.read()
+    return response.getheader("Set-Cookie").split(";")[0]
+
+
+def load(port, path, cookie, clients, seconds, conditional=False):
+    stop = threading.Event()
+    counts = []
+    lock = threading.Lock()
+
+    def client():
+        done = not_modified = 0
+        etag = None
+        while not stop.is_set():
+            headers = {"Cookie": cookie}
+            if conditional and etag:
+                headers["If-None-Match"] = etag
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            etag = response.getheader("ETag") or etag
+            not_modified += response.status == 304
+            done += 1
+        with lock:
+            counts.append((done, not_modified))
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    total = sum(done for done, _ in counts)
+    return total / seconds, sum(nm for _, nm in counts) / max(total, 1)
+
+
+def writer(stop, marks_per_sec, first_id):
+    today = datetime.datetime.now().strftime("%Y-%m-%d")
+    student = first_id
+    while not stop.wait(1.0 / marks_per_sec):
+        database.mark_attendance(f"S{student:06d}", today, "10:00:00")
+        student += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--present", type=int, default=15000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--marks-per-sec", type=float, default=0.0,
+                        help="background attendance marks, to exercise invalidation")
+    args = parser.parse_args()
+
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # no per-request log lines
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "stats.db")
+        seed(args.students, args.present)
+
+        import dashboard
+        from flask import jsonify
+
+        @dashboard.app.route('/bench/uncached-stats')
+        @dashboard.login_required
+        def uncached_stats():
+            # What /api/stats did before the stats service
+            today_attendance = database.get_today_attendance()
+            total_students = len(database.get_all_students())
+            return jsonify({'total_students': total_students, 'present_today': len(today_attendance),
+                            'absent_today': total_students - len(today_attendance),
+                            'today_date': datetime.datetime.now().strftime("%Y-%m-%d")})
+
+        server = make_server("127.0.0.1", 0, dashboard.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_port
+        cookie = login(port)
+
+        stop = threading.Event()
+        if args.marks_per_sec > 0:
+            threading.Thread(target=writer, args=(stop, args.marks_per_sec, args.present), daemon=True).start()
+
+        print(f"{args.students} students, {args.present} present, {args.clients} clients, "
+              f"{args.seconds:.0f}s per run")
+        print(f"{'handler':<14} {'requests/s':>11} {'304s':>6}")
+        for name, path, conditional in (("uncached", "/bench/uncached-stats", False),
+                                        ("cached", "/api/stats", False),
+                                        ("conditional", "/api/stats", True)):
+            rate, not_modified = load(port, path, cookie, args.clients, args.seconds, conditional)
+            print(f"{name:<14} {rate:>11.0f} {not_modified:>6.0%}")
+        service = dashboard.stats_service
+        print(f"stats cache: {service.hits} hits, {service.misses} misses")
+
+        stop.set()
+        server.shutdown()
+        database.close_connection()
+
+
+if __name__ == "__main__":
+    main()
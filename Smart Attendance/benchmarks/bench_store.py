@@ -0,0 +1,71 @@
+"""
+Load time and memory of the legacy pickle vs. the memory-mapped store.
+
+Usage (from the "Smart Attendance" folder):
+    python benchmarks/bench_store.py [--identities 50000]
+"""
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_store import data_file, open_store, save_store  # noqa: E402
+from gallery import Gallery  # noqa: E402
+
+EMBEDDING_DIM = 128  # Facenet
+
+
+def measure(label, load):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} {elapsed * 1000:>9.1f} ms {peak / 2**20:>9.1f} MiB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--identities", type=int, default=50000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.identities, EMBEDDING_DIM))
+    embeddings = {
+        f"S{i:06d}": {'name': f"Student {i}", 'embedding': vectors[i].tolist(), 'images_used': 10}
+        for i in range(args.identities)
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = os.path.join(tmp, "embeddings.pkl")
+        store_path = os.path.join(tmp, "embeddings.bin")
+        with open(pickle_path, 'wb') as f:
+            pickle.dump(embeddings, f)
+        save_store(embeddings, 'Facenet', store_path)
+        print(f"{args.identities} identities: pickle {os.path.getsize(pickle_path) / 2**20:.1f} MiB, "
+              f"store {os.path.getsize(data_file(store_path)) / 2**20:.1f} MiB on disk")
+        print(f"{'load path':<34} {'time':>12} {'peak heap':>13}")
+
+        def load_pickle_gallery():
+            with open(pickle_path, 'rb') as f:
+                return Gallery.from_embeddings(pickle.load(f))
+
+        measure("pickle -> Gallery", load_pickle_gallery)
+        measure("store (mmap, verified) -> Gallery", lambda: Gallery.from_store(open_store(store_path)))
+        gallery = measure("store (mmap, no verify) -> Gallery",
+                          lambda: Gallery.from_store(open_store(store_path, verify=False)))
+        assert gallery.best_match(vectors[7])[0] == "S000007"
+        del gallery  # release the mapping before the directory is removed
+
+
+if __name__ == "__main__":
+    main()
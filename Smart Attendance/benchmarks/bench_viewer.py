@@ -0,0 +1,82 @@
+"""
+Opening "View All" in the desktop viewer: every row vs one keyset page.
+
+For growing histories (--sizes, in marks) builds a throwaway database and
+times what the viewer reads before it can show anything: get_all_attendance()
+(the old viewer loaded every row into the Treeview) against the first page
+of the paged table (attendance_table.py), and a page deep into the history,
+for each sort order. Treeview insertion itself is not timed; it only adds to
+the old path, roughly in proportion to the rows loaded.
+
+Usage (from the "Smart Attendance" folder):
+    python benchmarks/bench_viewer.py [--sizes 10000,100000,1000000] [--repeat 5]
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from attendance_table import PAGE_ROWS  # noqa: E402
+
+
+def build(marks, students=2000):
+    database.create_tables()
+    conn = database.get_connection()
+    start = datetime.date(2020, 1, 1)
+    with conn:
+        conn.executemany("INSERT INTO students (name, student_id) VALUES (?, ?)",
+                         [(f"Student {(i * 7919) % students}", f"S{i:06d}") for i in range(students)])
+        conn.executemany(
+            "INSERT INTO attendance (student_id, date, time, status) VALUES (?, ?, ?, 'Present')",
+            ((f"S{i % students:06d}", (start + datetime.timedelta(days=i // students)).isoformat(),
+              f"09:{i % 60:02d}:00") for i in range(marks)))
+
+
+def timed(repeat, fn, *args, **kwargs):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000 / repeat, result
+
+
+def middle_cursor(sort, descending, marks):
+    """Keyset cursor of the row half-way down the listing in this order."""
+    columns = database.ATTENDANCE_SORTS[sort]
+    order = ", ".join(f"{column} {'DESC' if descending else 'ASC'}" for column in columns)
+    return tuple(database.get_connection().execute(
+        f"SELECT {', '.join(columns)} FROM attendance a JOIN students s ON a.student_id = s.student_id "
+        f"ORDER BY {order} LIMIT 1 OFFSET ?", (marks // 2,)).fetchone())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated history sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    header = " ".join(f"{sort + ' first/deep ms':>22}" for sort in database.ATTENDANCE_SORTS)
+    print(f"{'marks':>9} {'all rows ms':>12} {header}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            database.DB_PATH = os.path.join(tmp, "viewer.db")
+            build(size)
+            all_ms, _ = timed(1, database.get_all_attendance)
+            cells = []
+            for sort in database.ATTENDANCE_SORTS:
+                descending = sort == 'date'  # the viewer's default direction
+                first_ms, _ = timed(args.repeat, database.get_attendance_page, limit=PAGE_ROWS,
+                                    sort=sort, descending=descending)
+                deep_ms, _ = timed(args.repeat, database.get_attendance_page, limit=PAGE_ROWS, sort=sort,
+                                   descending=descending, after=middle_cursor(sort, descending, size))
+                cells.append(f"{first_ms:>10.2f} / {deep_ms:>9.2f}")
+            print(f"{size:>9} {all_ms:>12.1f} " + " ".join(f"{cell:>22}" for cell in cells))
+            database.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,141 +1,311 @@
-from flask import Flask, render_template, request, redirect, url_for, session, send_file, jsonify
-import csv
-import io
-import datetime
-from database import get_all_attendance, get_attendance_by_date, get_today_attendance, get_all_students
-from functools import wraps
-
-app = Flask(__name__)
-app.secret_key = 'smart_attendance_secret_key_2024'  # Change this in production
-
-# Simple authentication (replace with proper auth in production)
-ADMIN_USERNAME = 'admin'
-ADMIN_PASSWORD = 'admin123'  # Change this!
-
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'logged_in' not in session:
-            return redirect(url_for('login'))
-        return f(*args, **kwargs)
-    return decorated_function
-
-@app.route('/')
-def index():
-    if 'logged_in' in session:
-        return redirect(url_for('dashboard'))
-    return redirect(url_for('login'))
-
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    if request.method == 'POST':
-        username = request.form.get('username')
-        password = request.form.get('password')
-        
-        if username == ADMIN_USERNAME and password == ADMIN_PASSWORD:
-            session['logged_in'] = True
-            session['username'] = username
-            return redirect(url_for('dashboard'))
-        else:
-            return render_template('login.html', error='Invalid credentials')
-    
-    return render_template('login.html')
-
-@app.route('/logout')
-def logout():
-    session.clear()
-    return redirect(url_for('login'))
-
-@app.route('/dashboard')
-@login_required
-def dashboard():
-    today = datetime.datetime.now().strftime("%Y-%m-%d")
-    today_attendance = get_today_attendance()
-    total_students = len(get_all_students())
-    present_today = len(today_attendance)
-    
-    stats = {
-        'total_students': total_students,
-        'present_today': present_today,
-        'absent_today': total_students - present_today,
-        'today_date': today
-    }
-    
-    return render_template('dashboard.html', stats=stats, attendance=today_attendance)
-
-@app.route('/attendance')
-@login_required
-def attendance():
-    date = request.args.get('date', datetime.datetime.now().strftime("%Y-%m-%d"))
-    
-    try:
-        datetime.datetime.strptime(date, "%Y-%m-%d")
-        records = get_attendance_by_date(date)
-    except:
-        records = get_all_attendance()
-        date = "All"
-    
-    return render_template('attendance.html', attendance=records, selected_date=date)
-
-@app.route('/download')
-@login_required
-def download():
-    date = request.args.get('date', '')
-    
-    if date:
-        try:
-            datetime.datetime.strptime(date, "%Y-%m-%d")
-            records = get_attendance_by_date(date)
-            filename = f'attendance_{date}.csv'
-        except:
-            records = get_all_attendance()
-            filename = 'attendance_all.csv'
-    else:
-        records = get_all_attendance()
-        filename = 'attendance_all.csv'
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow(['ID', 'Student ID', 'Name', 'Date', 'Time', 'Status'])
-    
-    # Write data
-    for record in records:
-        if len(record) >= 6:
-            # Format: (id, student_id, date, time, status, name)
-            writer.writerow([record[0], record[1], record[5], record[2], record[3], record[4]])
-        else:
-            writer.writerow(record)
-    
-    output.seek(0)
-    
-    return send_file(
-        io.BytesIO(output.getvalue().encode('utf-8')),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=filename
-    )
-
-@app.route('/api/stats')
-@login_required
-def api_stats():
-    today = datetime.datetime.now().strftime("%Y-%m-%d")
-    today_attendance = get_today_attendance()
-    total_students = len(get_all_students())
-    present_today = len(today_attendance)
-    
-    return jsonify({
-        'total_students': total_students,
-        'present_today': present_today,
-        'absent_today': total_students - present_today,
-        'today_date': today
-    })
-
-if __name__ == '__main__':
-    print("Starting Flask Dashboard...")
-    print("Access the dashboard at: http://localhost:5000")
-    print("Default credentials: admin / admin123")
-    app.run(debug=True, host='0.0.0.0', port=5000)
-
+from flask import (Flask, render_template, request, redirect, url_for, session, jsonify, Response,
+                   make_response, stream_with_context)
+import csv
+import io
+import os
+import json
+import queue
+import datetime
+from database import (get_attendance_page, get_attendance_since, iter_attendance, get_today_attendance,
+                      get_daily_report, get_monthly_report, get_student_report, PAGE_SIZE, close_connection,
+                      create_tables)
+from stats_service import StatsService
+from live_feed import AttendanceFeed, mark_event
+from functools import wraps
+
+app = Flask(__name__)
+app.secret_key = 'smart_attendance_secret_key_2024'  # Change this in production
+# Static URLs carry the file's mtime (see static_version), so browsers may
+# cache them for a year and still pick up changes immediately
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 365 * 24 * 3600
+
+# Simple authentication (replace with proper auth in production)
+ADMIN_USERNAME = 'admin'
+ADMIN_PASSWORD = 'admin123'  # Change this!
+
+stats_service = StatsService()
+live_feed = AttendanceFeed(stats_service)
+STREAM_KEEPALIVE = 15  # seconds between comments on an idle event stream
+RECENT_MARKS = 20  # marks sent in the snapshot when a client connects
+
+@app.context_processor
+def static_helpers():
+    def static_version(filename):
+        return int(os.path.getmtime(os.path.join(app.static_folder, filename)))
+    return {'static_version': static_version}
+
+def login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'logged_in' not in session:
+            return redirect(url_for('login'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+@app.route('/')
+def index():
+    if 'logged_in' in session:
+        return redirect(url_for('dashboard'))
+    return redirect(url_for('login'))
+
+@app.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        
+        if username == ADMIN_USERNAME and password == ADMIN_PASSWORD:
+            session['logged_in'] = True
+            session['username'] = username
+            return redirect(url_for('dashboard'))
+        else:
+            return render_template('login.html', error='Invalid credentials')
+    
+    return render_template('login.html')
+
+@app.route('/logout')
+def logout():
+    session.clear()
+    return redirect(url_for('login'))
+
+def conditional_response(etag, build):
+    """
+    Answer 304 Not Modified if the client already has `etag`; otherwise call
+    build() for the full response. Clients must revalidate every time.
+    """
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = make_response(build())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/dashboard')
+@login_required
+def dashboard():
+    stats, etag = stats_service.get()
+    # Today's list only changes when the counts do, so the same ETag covers it
+    return conditional_response(
+        etag, lambda: render_template('dashboard.html', stats=stats, attendance=get_today_attendance()))
+
+def _valid_date(value):
+    try:
+        datetime.datetime.strptime(value, "%Y-%m-%d")
+        return value
+    except (TypeError, ValueError):
+        return None
+
+def _request_filters(default_date=None):
+    """
+    Attendance filters from the query string: a `date_from`/`date_to` range
+    or a single `date` (`default_date` when nothing is given), plus a
+    `student` ID or name.
+    """
+    date_from = _valid_date(request.args.get('date_from'))
+    date_to = _valid_date(request.args.get('date_to'))
+    student = request.args.get('student', '').strip() or None
+    date = None
+    if not (date_from or date_to):
+        date = _valid_date(request.args.get('date', None if student else default_date))
+        date_from = date_to = date
+    return date, {'date_from': date_from, 'date_to': date_to, 'student': student}
+
+def _parse_cursor(token):
+    """A page cursor is 'date|time|id' of the last row already shown."""
+    try:
+        date, time, row_id = token.split('|')
+        return date, time, int(row_id)
+    except (AttributeError, ValueError):
+        return None
+
+@app.route('/attendance')
+@login_required
+def attendance():
+    date, filters = _request_filters(datetime.datetime.now().strftime("%Y-%m-%d"))
+    after = _parse_cursor(request.args.get('after'))
+    # Fetch one extra row to know whether there is a next page
+    records = get_attendance_page(after=after, limit=PAGE_SIZE + 1, **filters)
+    next_url = None
+    if len(records) > PAGE_SIZE:
+        records = records[:PAGE_SIZE]
+        last = records[-1]
+        args = {k: v for k, v in request.args.items() if k != 'after'}
+        args['date'] = date or ''
+        next_url = url_for('attendance', after=f"{last[2]}|{last[3]}|{last[0]}", **args)
+
+    return render_template('attendance.html', attendance=records, selected_date=date or "All",
+                           filters=filters, next_url=next_url, first_page=after is None)
+
+def csv_response(filename, header, rows):
+    """
+    Stream a CSV download. Rows are written in small chunks as they are
+    produced, so memory use does not grow with the size of the export.
+    """
+    def generate():
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(header)
+        for count, row in enumerate(rows, start=1):
+            writer.writerow(row)
+            if count % 500 == 0:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+        yield output.getvalue()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+@app.route('/download')
+@login_required
+def download():
+    date, filters = _request_filters()
+    if date:
+        filename = f'attendance_{date}.csv'
+    elif filters['date_from'] or filters['date_to']:
+        filename = f"attendance_{filters['date_from'] or 'start'}_to_{filters['date_to'] or 'today'}.csv"
+    else:
+        filename = 'attendance_all.csv'
+
+    # Format: (id, student_id, date, time, status, name)
+    rows = ([r[0], r[1], r[5], r[2], r[3], r[4]] for r in iter_attendance(**filters))
+    return csv_response(filename, ['ID', 'Student ID', 'Name', 'Date', 'Time', 'Status'], rows)
+
+def percentage(part, whole):
+    return round(100.0 * part / whole, 1) if whole else 0.0
+
+def _request_month():
+    month = request.args.get('month', '')
+    try:
+        datetime.datetime.strptime(month, "%Y-%m")
+        return month
+    except ValueError:
+        return datetime.datetime.now().strftime("%Y-%m")
+
+def monthly_rows(month):
+    return [{'student_id': student_id, 'name': name, 'days_present': days, 'class_days': class_days,
+             'percentage': percentage(days, class_days)}
+            for student_id, name, days, class_days in get_monthly_report(month)]
+
+def daily_rows(date_from, date_to):
+    return [{'date': date, 'present': present, 'total_students': total,
+             'percentage': percentage(present, total)}
+            for date, present, total in get_daily_report(date_from, date_to)]
+
+def _request_range():
+    """date_from/date_to from the query string; defaults to the requested month."""
+    month = _request_month()
+    return (_valid_date(request.args.get('date_from')) or f"{month}-01",
+            _valid_date(request.args.get('date_to')) or f"{month}-31")
+
+@app.route('/reports')
+@login_required
+def reports():
+    # Everything here is read from the rollup tables, not from `attendance`
+    month = _request_month()
+    return render_template('reports.html', month=month, students=monthly_rows(month),
+                           days=daily_rows(f"{month}-01", f"{month}-31"))
+
+@app.route('/reports/monthly.csv')
+@login_required
+def download_monthly_report():
+    month = _request_month()
+    rows = ([r['student_id'], r['name'], r['days_present'], r['class_days'], r['percentage']]
+            for r in monthly_rows(month))
+    return csv_response(f'attendance_report_{month}.csv',
+                        ['Student ID', 'Name', 'Days Present', 'Class Days', 'Attendance %'], rows)
+
+@app.route('/reports/daily.csv')
+@login_required
+def download_daily_report():
+    date_from, date_to = _request_range()
+    rows = ([r['date'], r['present'], r['total_students'], r['percentage']]
+            for r in daily_rows(date_from, date_to))
+    return csv_response(f'daily_report_{date_from}_to_{date_to}.csv',
+                        ['Date', 'Present', 'Total Students', 'Attendance %'], rows)
+
+@app.route('/api/reports/monthly')
+@login_required
+def api_monthly_report():
+    month = _request_month()
+    return jsonify({'month': month, 'students': monthly_rows(month)})
+
+@app.route('/api/reports/daily')
+@login_required
+def api_daily_report():
+    date_from, date_to = _request_range()
+    return jsonify({'date_from': date_from, 'date_to': date_to, 'days': daily_rows(date_from, date_to)})
+
+@app.route('/api/reports/student/<student_id>')
+@login_required
+def api_student_report(student_id):
+    return jsonify({'student_id': student_id, 'months': [
+        {'month': month, 'days_present': days, 'class_days': class_days,
+         'percentage': percentage(days, class_days)}
+        for month, days, class_days in get_student_report(student_id)]})
+
+@app.route('/api/stats')
+@login_required
+def api_stats():
+    stats, etag = stats_service.get()
+    return conditional_response(etag, lambda: jsonify(stats))
+
+def format_event(event, data):
+    """One Server-Sent Events message; marks carry their id for Last-Event-ID."""
+    message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    if event == 'mark':
+        message = f"id: {data['id']}\n" + message
+    return message
+
+@app.route('/api/stream')
+@login_required
+def stream():
+    # Subscribe before taking the snapshot so no mark falls in between;
+    # clients drop marks whose id they have already seen
+    subscription = live_feed.subscribe()
+    stats, _ = stats_service.get()
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    if last_event_id.isdigit():
+        # A reconnecting client only needs what it missed
+        recent = get_attendance_since(int(last_event_id))
+    else:
+        today = stats['today_date']
+        recent = reversed(get_attendance_page(date_from=today, date_to=today, limit=RECENT_MARKS))
+    snapshot = {'stats': stats, 'recent': [mark_event(record) for record in recent]}
+
+    def generate():
+        try:
+            yield format_event('snapshot', snapshot)
+            while not subscription.closed:
+                try:
+                    event, data = subscription.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"  # also notices clients that went away
+                    continue
+                yield format_event(event, data)
+        finally:
+            subscription.close()
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+if __name__ == '__main__':
+    print("Starting Flask Dashboard...")
+    print("Access the dashboard at: http://localhost:5000")
+    print("Default credentials: admin / admin123")
+    print("This is the development server; use 'python wsgi.py' in production.")
+    # Bring an older attendance.db up to date (the report rollups) before
+    # serving, as wsgi.py does, rather than inside the first request
+    create_tables()
+    close_connection()
+    # The development server runs every request on a new thread, so a
+    # per-thread connection cannot be reused; close it when the request ends
+    # instead of leaving it to the garbage collector. (wsgi.py's thread pools
+    # keep their threads, and with them their connections.)
+    app.teardown_appcontext(lambda exc: close_connection())
+    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
+
@@ -1,100 +1,384 @@
-import sqlite3
-import datetime
-
-def create_tables():
-    conn = sqlite3.connect('attendance.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS students (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    student_id TEXT UNIQUE NOT NULL
-                )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS attendance (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    student_id TEXT NOT NULL,
-                    date TEXT NOT NULL,
-                    time TEXT NOT NULL,
-                    status TEXT NOT NULL DEFAULT 'Present',
-                    FOREIGN KEY (student_id) REFERENCES students(student_id)
-                )''')
-    conn.commit()
-    conn.close()
-
-def add_student(name, student_id):
-    conn = sqlite3.connect('attendance.db')
-    c = conn.cursor()
-    try:
-        c.execute("INSERT INTO students (name, student_id) VALUES (?, ?)", (name, student_id))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
-    finally:
-        conn.close()
-
-def get_student(student_id):
-    conn = sqlite3.connect('attendance.db')
-    c = conn.cursor()
-    c.execute("SELECT * FROM students WHERE student_id = ?", (student_id,))
-    result = c.fetchone()
-    conn.close()
-    return result
-
-def get_all_students():
-    conn = sqlite3.connect('attendance.db')
-    c = conn.cursor()
-    c.execute("SELECT * FROM students")
-    results = c.fetchall()
-    conn.close()
-    return results
-
-def mark_attendance(student_id, date, time, status="Present"):
-    conn = sqlite3.connect('attendance.db')
-    c = conn.cursor()
-    # Check if already marked today
-    c.execute("SELECT * FROM attendance WHERE student_id = ? AND date = ?", (student_id, date))
-    if c.fetchone():
-        conn.close()
-        return False  # Already marked
-    c.execute("INSERT INTO attendance (student_id, date, time, status) VALUES (?, ?, ?, ?)",
-              (student_id, date, time, status))
-    conn.commit()
-    conn.close()
-    return True
-
-def get_attendance_by_date(date):
-    conn = sqlite3.connect('attendance.db')
-    c = conn.cursor()
-    c.execute('''SELECT a.*, s.name 
-                 FROM attendance a 
-                 JOIN students s ON a.student_id = s.student_id 
-                 WHERE a.date = ? 
-                 ORDER BY a.time''', (date,))
-    results = c.fetchall()
-    conn.close()
-    return results
-
-def get_attendance_by_student(student_id):
-    conn = sqlite3.connect('attendance.db')
-    c = conn.cursor()
-    c.execute('''SELECT * FROM attendance 
-                 WHERE student_id = ? 
-                 ORDER BY date DESC, time DESC''', (student_id,))
-    results = c.fetchall()
-    conn.close()
-    return results
-
-def get_all_attendance():
-    conn = sqlite3.connect('attendance.db')
-    c = conn.cursor()
-    c.execute('''SELECT a.*, s.name 
-                 FROM attendance a 
-                 JOIN students s ON a.student_id = s.student_id 
-                 ORDER BY a.date DESC, a.time DESC''')
-    results = c.fetchall()
-    conn.close()
-    return results
-
-def get_today_attendance():
-    today = datetime.datetime.now().strftime("%Y-%m-%d")
-    return get_attendance_by_date(today)
+import os
+import sqlite3
+import datetime
+import threading
+
+DB_PATH = os.getenv("ATTENDANCE_DB", "attendance.db")
+
+# Connection tuning. WAL lets the dashboard read while the recognizer writes;
+# synchronous=NORMAL is durable across application crashes in WAL mode and
+# avoids an fsync on every commit.
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -16000),          # 16 MB page cache per connection
+    ("mmap_size", 256 * 1024 * 1024),
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 30000),         # wait for a writer instead of failing with "database is locked"
+)
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+
+def open_connection(check_same_thread=True):
+    """
+    Open a new, tuned connection that is not shared through get_connection().
+    A database left behind by an older version is migrated first, so every
+    entry point (dashboard, recognizers, batch jobs) finds the schema it queries.
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=30, cached_statements=STATEMENT_CACHE_SIZE,
+                           check_same_thread=check_same_thread)
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    if schema_version(conn) < len(MIGRATIONS):
+        _migrate(conn)
+    return conn
+
+def get_connection():
+    """
+    Return this thread's connection, opening and configuring it on first use.
+    Each connection keeps its compiled statements in sqlite3's statement cache,
+    so the queries below are prepared once per thread and then reused. That
+    pays off with long-lived threads (the recognizer, wsgi.py's thread pools);
+    the Flask development server starts a new thread per request.
+    """
+    conn = getattr(_local, 'conn', None)
+    # A connection must not cross a fork, and a changed DB_PATH needs a new one
+    if conn is not None and (_local.pid != os.getpid() or _local.path != DB_PATH):
+        conn = None
+    if conn is None:
+        conn = open_connection()
+        _local.conn = conn
+        _local.pid = os.getpid()
+        _local.path = DB_PATH
+    return conn
+
+def close_connection():
+    """Close this thread's connection (a new one is opened on next use)."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+def _create_base_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS students (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    student_id TEXT UNIQUE NOT NULL
+                )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS attendance (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    student_id TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    time TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'Present',
+                    FOREIGN KEY (student_id) REFERENCES students(student_id)
+                )''')
+
+def _index_attendance(conn):
+    # Older databases may hold duplicate marks from before the uniqueness
+    # rule was enforced; keep the first mark of each student per day
+    conn.execute('''DELETE FROM attendance WHERE id NOT IN (
+                    SELECT MIN(id) FROM attendance GROUP BY student_id, date
+                )''')
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_student_date ON attendance (student_id, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attendance_date_time ON attendance (date, time)")
+
+def _add_rollups(conn):
+    # Summary tables for reports, kept current by triggers as marks are
+    # written so that reports never have to scan and group `attendance`.
+    # The per-student-per-day level is `attendance` itself (one row per
+    # student per day, enforced by idx_attendance_student_date).
+    conn.execute('''CREATE TABLE IF NOT EXISTS attendance_daily (
+                    date TEXT PRIMARY KEY,
+                    present INTEGER NOT NULL DEFAULT 0
+                ) WITHOUT ROWID''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS attendance_monthly (
+                    month TEXT NOT NULL,
+                    student_id TEXT NOT NULL,
+                    days_present INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (month, student_id)
+                ) WITHOUT ROWID''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attendance_monthly_student ON attendance_monthly (student_id, month)")
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS attendance_rollup_insert AFTER INSERT ON attendance BEGIN
+                    INSERT INTO attendance_daily (date, present) VALUES (NEW.date, 1)
+                        ON CONFLICT (date) DO UPDATE SET present = present + 1;
+                    INSERT INTO attendance_monthly (month, student_id, days_present)
+                        VALUES (substr(NEW.date, 1, 7), NEW.student_id, 1)
+                        ON CONFLICT (month, student_id) DO UPDATE SET days_present = days_present + 1;
+                END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS attendance_rollup_delete AFTER DELETE ON attendance BEGIN
+                    UPDATE attendance_daily SET present = present - 1 WHERE date = OLD.date;
+                    UPDATE attendance_monthly SET days_present = days_present - 1
+                        WHERE month = substr(OLD.date, 1, 7) AND student_id = OLD.student_id;
+                END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS attendance_rollup_update AFTER UPDATE OF student_id, date ON attendance BEGIN
+                    UPDATE attendance_daily SET present = present - 1 WHERE date = OLD.date;
+                    UPDATE attendance_monthly SET days_present = days_present - 1
+                        WHERE month = substr(OLD.date, 1, 7) AND student_id = OLD.student_id;
+                    INSERT INTO attendance_daily (date, present) VALUES (NEW.date, 1)
+                        ON CONFLICT (date) DO UPDATE SET present = present + 1;
+                    INSERT INTO attendance_monthly (month, student_id, days_present)
+                        VALUES (substr(NEW.date, 1, 7), NEW.student_id, 1)
+                        ON CONFLICT (month, student_id) DO UPDATE SET days_present = days_present + 1;
+                END''')
+    # Backfill from the marks recorded before this migration
+    conn.execute("INSERT INTO attendance_daily (date, present) SELECT date, COUNT(*) FROM attendance GROUP BY date")
+    conn.execute('''INSERT INTO attendance_monthly (month, student_id, days_present)
+                    SELECT substr(date, 1, 7), student_id, COUNT(*) FROM attendance GROUP BY 1, 2''')
+
+def _index_student_names(conn):
+    # Lets the attendance listing be sorted by name one page at a time
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_students_name ON students (name, student_id)")
+
+# Schema migrations, applied in order. The number of migrations applied is
+# stored in PRAGMA user_version; add new steps to the end, never edit old ones.
+MIGRATIONS = [
+    _create_base_tables,
+    _index_attendance,
+    _add_rollups,
+    _index_student_names,
+]
+
+def schema_version(conn=None):
+    conn = conn or get_connection()
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def _migrate(conn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = schema_version(conn)
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def create_tables():
+    """Create the schema or bring an existing database up to date."""
+    _migrate(get_connection())
+
+def add_student(name, student_id):
+    conn = get_connection()
+    try:
+        with conn:
+            conn.execute("INSERT INTO students (name, student_id) VALUES (?, ?)", (name, student_id))
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+def get_student(student_id):
+    return get_connection().execute(
+        "SELECT * FROM students WHERE student_id = ?", (student_id,)).fetchone()
+
+def get_all_students():
+    return get_connection().execute("SELECT * FROM students").fetchall()
+
+def mark_attendance(student_id, date, time, status="Present"):
+    """Mark a student present; returns False if they were already marked that day."""
+    conn = get_connection()
+    with conn:
+        cursor = conn.execute('''INSERT INTO attendance (student_id, date, time, status)
+                                VALUES (?, ?, ?, ?)
+                                ON CONFLICT (student_id, date) DO NOTHING''',
+                             (student_id, date, time, status))
+    return cursor.rowcount == 1
+
+def mark_attendance_many(records):
+    """
+    Insert many (student_id, date, time, status) marks in one transaction.
+    Marks that already exist are skipped; returns how many were inserted.
+    """
+    conn = get_connection()
+    with conn:
+        cursor = conn.executemany('''INSERT INTO attendance (student_id, date, time, status)
+                                     VALUES (?, ?, ?, ?)
+                                     ON CONFLICT (student_id, date) DO NOTHING''', records)
+        # rowcount counts only the inserted marks, not the rollup rows the
+        # triggers touch (total_changes would include those)
+        return cursor.rowcount
+
+def get_marked_student_ids(date):
+    """IDs of the students already marked on `date`."""
+    return {row[0] for row in get_connection().execute(
+        "SELECT student_id FROM attendance WHERE date = ?", (date,))}
+
+def get_attendance_by_date(date):
+    return get_connection().execute('''SELECT a.*, s.name 
+                 FROM attendance a 
+                 JOIN students s ON a.student_id = s.student_id 
+                 WHERE a.date = ? 
+                 ORDER BY a.time''', (date,)).fetchall()
+
+def get_attendance_by_student(student_id):
+    return get_connection().execute('''SELECT * FROM attendance 
+                 WHERE student_id = ? 
+                 ORDER BY date DESC, time DESC''', (student_id,)).fetchall()
+
+def get_all_attendance():
+    return get_connection().execute('''SELECT a.*, s.name 
+                 FROM attendance a 
+                 JOIN students s ON a.student_id = s.student_id 
+                 ORDER BY a.date DESC, a.time DESC''').fetchall()
+
+PAGE_SIZE = 100
+
+# Sort orders for the attendance listing. Each ends in a unique column so
+# that it is a total order usable as a keyset, and each is served by an
+# index, so a page never sorts more than itself. Student and name orders
+# walk `students` (by its student_id or name index) and each student's marks
+# from idx_attendance_student_date; CROSS JOIN keeps SQLite to that order.
+ATTENDANCE_SORTS = {
+    'date': ('a.date', 'a.time', 'a.id'),
+    'student': ('s.student_id', 'a.date', 'a.id'),
+    'name': ('s.name', 's.student_id', 'a.date', 'a.id'),
+}
+
+def attendance_sort_key(row, sort='date'):
+    """The keyset cursor of an (id, student_id, date, time, status, name) row."""
+    columns = {'a.id': 0, 's.student_id': 1, 'a.date': 2, 'a.time': 3, 's.name': 5}
+    return tuple(row[columns[column]] for column in ATTENDANCE_SORTS[sort])
+
+def _attendance_filters(date_from=None, date_to=None, student=None):
+    """WHERE clauses and parameters for the attendance listing filters."""
+    clauses, params = [], []
+    if date_from:
+        clauses.append("a.date >= ?")
+        params.append(date_from)
+    if date_to:
+        clauses.append("a.date <= ?")
+        params.append(date_to)
+    if student:
+        # Exact student ID or part of a name. No index can serve an OR with a
+        # LIKE '%...%', so this is checked row by row as the query walks the
+        # sort order's index; a page stops at `limit` matches, but a rare
+        # match can mean scanning much of the history to fill it.
+        clauses.append("(a.student_id = ? OR s.name LIKE ?)")
+        params += [student, f"%{student}%"]
+    return clauses, params
+
+def get_attendance_page(date_from=None, date_to=None, student=None, after=None, limit=PAGE_SIZE,
+                        sort='date', descending=True, before=None):
+    """
+    One page of attendance, newest first, as (id, student_id, date, time,
+    status, name) rows. `after` is the (date, time, id) of the last row of the
+    previous page; pages are found by seeking the (date, time) index to it
+    rather than with OFFSET, so every page costs the same.
+
+    `sort` picks another order from ATTENDANCE_SORTS (the cursor is then
+    that order's key, see attendance_sort_key) and `descending` its
+    direction. `before` pages backwards: the rows just ahead of that cursor,
+    still returned in display order.
+    """
+    columns = ATTENDANCE_SORTS[sort]
+    backwards = before is not None
+    cursor = before if backwards else after
+    # Walking backwards is walking the opposite order and flipping the result
+    reverse = descending != backwards
+    if sort == 'date' and cursor is not None:
+        # The cursor bounds that end of the range more tightly than the date
+        # filter, and SQLite seeks the index to only one of the two
+        if reverse:
+            date_to = None
+        else:
+            date_from = None
+    clauses, params = _attendance_filters(date_from, date_to, student)
+    if cursor is not None:
+        clauses.append(f"({', '.join(columns)}) {'<' if reverse else '>'} ({', '.join('?' * len(columns))})")
+        params += list(cursor)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    order = ', '.join(f"{column} {'DESC' if reverse else 'ASC'}" for column in columns)
+    tables = "attendance a JOIN students s" if sort == 'date' else "students s CROSS JOIN attendance a"
+    rows = get_connection().execute(f'''SELECT a.*, s.name
+                 FROM {tables} ON a.student_id = s.student_id
+                 {where}
+                 ORDER BY {order}
+                 LIMIT ?''', params + [limit]).fetchall()
+    return rows[::-1] if backwards else rows
+
+def iter_attendance(date_from=None, date_to=None, student=None, batch_size=1000):
+    """Yield filtered attendance rows, newest first, without loading them all."""
+    clauses, params = _attendance_filters(date_from, date_to, student)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    cursor = get_connection().execute(f'''SELECT a.*, s.name
+                 FROM attendance a
+                 JOIN students s ON a.student_id = s.student_id
+                 {where}
+                 ORDER BY a.date DESC, a.time DESC, a.id DESC''', params)
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        cursor.close()
+
+def get_attendance_since(last_id, limit=500, conn=None):
+    """Attendance rows with an id above `last_id`, oldest first."""
+    conn = conn or get_connection()
+    return conn.execute('''SELECT a.*, s.name
+                 FROM attendance a
+                 JOIN students s ON a.student_id = s.student_id
+                 WHERE a.id > ?
+                 ORDER BY a.id
+                 LIMIT ?''', (last_id, limit)).fetchall()
+
+def get_last_attendance_id(conn=None):
+    conn = conn or get_connection()
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM attendance").fetchone()[0]
+
+def count_stats(date, conn=None):
+    """
+    Dashboard counts for `date` as a dict, computed with aggregates and the
+    daily rollup instead of fetching the rows.
+    """
+    conn = conn or get_connection()
+    total, present, last_id = conn.execute('''SELECT
+                 (SELECT COUNT(*) FROM students),
+                 COALESCE((SELECT present FROM attendance_daily WHERE date = ?), 0),
+                 (SELECT MAX(id) FROM attendance WHERE date = ?)''', (date, date)).fetchone()
+    return {
+        'total_students': total,
+        'present_today': present,
+        'absent_today': total - present,
+        'today_date': date,
+        'last_mark_id': last_id,
+    }
+
+def get_daily_report(date_from, date_to, conn=None):
+    """(date, present, total_students) for every day with attendance in the range."""
+    conn = conn or get_connection()
+    return conn.execute('''SELECT date, present, (SELECT COUNT(*) FROM students)
+                 FROM attendance_daily
+                 WHERE date BETWEEN ? AND ? AND present > 0
+                 ORDER BY date''', (date_from, date_to)).fetchall()
+
+def get_monthly_report(month, conn=None):
+    """
+    (student_id, name, days_present, class_days) for every student in the
+    month 'YYYY-MM'. Class days are the days on which anyone was marked.
+    """
+    conn = conn or get_connection()
+    return conn.execute('''SELECT s.student_id, s.name, COALESCE(m.days_present, 0),
+                        (SELECT COUNT(*) FROM attendance_daily
+                         WHERE date BETWEEN :month || '-01' AND :month || '-31' AND present > 0)
+                 FROM students s
+                 LEFT JOIN attendance_monthly m ON m.month = :month AND m.student_id = s.student_id
+                 ORDER BY s.name''', {'month': month}).fetchall()
+
+def get_student_report(student_id, conn=None):
+    """(month, days_present, class_days) for every month the student attended."""
+    conn = conn or get_connection()
+    return conn.execute('''SELECT m.month, m.days_present,
+                        (SELECT COUNT(*) FROM attendance_daily d
+                         WHERE d.date BETWEEN m.month || '-01' AND m.month || '-31' AND d.present > 0)
+                 FROM attendance_monthly m
+                 WHERE m.student_id = ? AND m.days_present > 0
+                 ORDER BY m.month''', (student_id,)).fetchall()
+
+def get_today_attendance():
+    today = datetime.datetime.now().strftime("%Y-%m-%d")
+    return get_attendance_by_date(today)
@@ -0,0 +1,106 @@
+"""
+Gallery built straight from the dataset/ images, for when train.py has not run.
+
+The old fallback called DeepFace.find for every face, which reloads (or
+rebuilds) its representation pickle inside dataset/ and scans every image.
+Here each image is embedded once, in batches (see embedder.py), and becomes
+its own row of a Gallery: a face is matched to its nearest enrolled image,
+as DeepFace.find did, but in the same single matrix product as the trained
+path.
+
+The embeddings are saved as an embedding store (DATASET_CACHE_FILE) whose
+header also records, per student folder, the folder's mtime and that of its
+newest image. On the next start only folders where either changed (images
+added, removed, renamed or re-saved) are embedded again; the rest come from
+the cache.
+"""
+import os
+
+import numpy as np
+
+from embedder import MODEL_NAME, embed_image_files
+from embedding_store import StoreError, open_store, save_store
+from gallery import Gallery
+
+DATASET_CACHE_FILE = "models/dataset_embeddings.bin"
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def scan_dataset(dataset_path):
+    """student_id -> (version, image paths) for every student folder with images."""
+    folders = {}
+    if not os.path.isdir(dataset_path):
+        return folders
+    for student_id in sorted(os.listdir(dataset_path)):
+        folder = os.path.join(dataset_path, student_id)
+        if not os.path.isdir(folder):
+            continue
+        paths = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(IMAGE_EXTENSIONS))
+        if paths:
+            newest = max(os.stat(path).st_mtime_ns for path in paths)
+            folders[student_id] = ([os.stat(folder).st_mtime_ns, newest], paths)
+    return folders
+
+
+def _load_cache(path, dataset_path):
+    """student_id -> (version, unit image embeddings) from the cache, or {} if it is unusable."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        store = open_store(path)
+    except StoreError as e:
+        print(f"Warning: {e}")
+        return {}
+    if store.model_name != MODEL_NAME or store.header.get('dataset_path') != dataset_path:
+        return {}
+    rows = {}
+    for row, student_id in enumerate(store.ids):
+        rows.setdefault(student_id, []).append(row)
+    versions = store.header.get('folders', {})
+    return {student_id: (versions.get(student_id), np.asarray(store.matrix[student_rows]))
+            for student_id, student_rows in rows.items()}
+
+
+def load_dataset_gallery(students, dataset_path="dataset", cache_path=DATASET_CACHE_FILE, workers=None):
+    """
+    Gallery of every image of the enrolled `students` (student_id -> name),
+    one row per image. Only folders that changed since the cache was written
+    are embedded. Returns None if no enrolled student has usable images.
+    """
+    folders = scan_dataset(dataset_path)
+    cached = _load_cache(cache_path, dataset_path)
+
+    embeddings = {}
+    pending = []
+    for student_id, (version, paths) in folders.items():
+        entry = cached.get(student_id)
+        if entry is not None and entry[0] == version:
+            embeddings[student_id] = entry[1]
+        else:
+            pending.extend(paths)
+
+    if pending:
+        print(f"Embedding {len(pending)} dataset images (cached in {cache_path} for next time)...")
+        options = {} if workers is None else {'workers': workers}
+        vectors = embed_image_files(pending, **options)
+        for student_id, (version, paths) in folders.items():
+            if student_id not in embeddings:
+                found = [vectors[p] for p in paths if vectors.get(p) is not None]
+                if found:
+                    embeddings[student_id] = np.asarray(found, dtype=np.float32)
+
+    if pending or set(cached) != set(embeddings):
+        store_entries = {
+            student_id: {'name': students.get(student_id, ""), 'embedding': matrix.mean(axis=0),
+                         'images_used': len(matrix), 'prototypes': list(matrix)}
+            for student_id, matrix in embeddings.items()
+        }
+        versions = {student_id: folders[student_id][0] for student_id in embeddings}
+        save_store(store_entries, MODEL_NAME, cache_path, extra={'dataset_path': dataset_path, 'folders': versions})
+
+    enrolled = {student_id: {'name': students[student_id], 'embedding': matrix.mean(axis=0),
+                             'prototypes': list(matrix)}
+                for student_id, matrix in embeddings.items() if student_id in students}
+    if not enrolled:
+        return None
+    return Gallery.from_embeddings(enrolled)
@@ -0,0 +1,188 @@
+"""
+Face detection behind one interface, with swappable backends.
+
+    haar   OpenCV's Haar cascade (ships with opencv-python, no model file)
+    yunet  OpenCV DNN YuNet (cv2.FaceDetectorYN), needs an ONNX model file
+    ssd    OpenCV DNN ResNet-10 SSD, needs the Caffe prototxt and weights
+
+The DNN backends are much less prone to false positives than the cascade,
+and every false positive is a wasted embedding call further down the
+pipeline. Their model files are not shipped; download them into models/
+(or point the ATTENDANCE_*_MODEL variables elsewhere). Without them the
+detector falls back to Haar.
+
+FaceDetector adds two things on top of a backend:
+
+- detection runs on a copy of the frame downscaled to `detect_width`
+  pixels wide, and the boxes are mapped back to full resolution, so crops
+  for embedding keep all their detail;
+- between full-frame scans (every `full_scan_every` frames) only the
+  regions around the previous frame's boxes are searched. A face that
+  enters the picture is picked up at the next full scan.
+
+A FaceDetector remembers the previous frame's boxes, so use one per video
+stream (the cascade is not thread-safe either).
+"""
+import os
+
+from tracker import iou
+
+DETECTOR = os.getenv("ATTENDANCE_DETECTOR", "haar")
+DETECT_WIDTH = int(os.getenv("ATTENDANCE_DETECT_WIDTH", "640"))
+FULL_SCAN_EVERY = int(os.getenv("ATTENDANCE_FULL_SCAN_EVERY", "10"))
+ROI_MARGIN = float(os.getenv("ATTENDANCE_ROI_MARGIN", "0.5"))
+SCORE_THRESHOLD = float(os.getenv("ATTENDANCE_DETECT_SCORE", "0.6"))
+YUNET_MODEL = os.getenv("ATTENDANCE_YUNET_MODEL", "models/face_detection_yunet_2023mar.onnx")
+SSD_CONFIG = os.getenv("ATTENDANCE_SSD_CONFIG", "models/deploy.prototxt")
+SSD_MODEL = os.getenv("ATTENDANCE_SSD_MODEL", "models/res10_300x300_ssd_iter_140000.caffemodel")
+BACKENDS = ("haar", "yunet", "ssd")
+
+
+class HaarBackend:
+    name = "haar"
+
+    def __init__(self, cv2):
+        self.cv2 = cv2
+        self.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+    def detect(self, image):
+        gray = self.cv2.cvtColor(image, self.cv2.COLOR_BGR2GRAY)
+        return [tuple(int(v) for v in box) for box in self.cascade.detectMultiScale(gray, 1.3, 5)]
+
+
+class YuNetBackend:
+    name = "yunet"
+
+    def __init__(self, cv2, model_path=YUNET_MODEL, score_threshold=SCORE_THRESHOLD):
+        self.net = cv2.FaceDetectorYN.create(model_path, "", (320, 320), score_threshold, 0.3, 5000)
+        self.input_size = (320, 320)
+
+    def detect(self, image):
+        size = (image.shape[1], image.shape[0])
+        if size != self.input_size:
+            self.net.setInputSize(size)
+            self.input_size = size
+        _, faces = self.net.detect(image)
+        if faces is None:
+            return []
+        return [(int(x), int(y), int(w), int(h)) for x, y, w, h in faces[:, :4]]
+
+
+class SsdBackend:
+    name = "ssd"
+    input_size = (300, 300)
+
+    def __init__(self, cv2, config_path=SSD_CONFIG, model_path=SSD_MODEL, score_threshold=SCORE_THRESHOLD):
+        self.cv2 = cv2
+        self.net = cv2.dnn.readNetFromCaffe(config_path, model_path)
+        self.score_threshold = score_threshold
+
+    def detect(self, image):
+        height, width = image.shape[:2]
+        blob = self.cv2.dnn.blobFromImage(self.cv2.resize(image, self.input_size), 1.0,
+                                          self.input_size, (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+        boxes = []
+        for score, x1, y1, x2, y2 in detections[:, 2:7]:
+            if score < self.score_threshold:
+                continue
+            x1, x2 = max(0, int(x1 * width)), min(width, int(x2 * width))
+            y1, y2 = max(0, int(y1 * height)), min(height, int(y2 * height))
+            if x2 > x1 and y2 > y1:
+                boxes.append((x1, y1, x2 - x1, y2 - y1))
+        return boxes
+
+
+class FaceDetector:
+    """Downscaled, region-of-interest aware detection with any backend."""
+
+    def __init__(self, backend, detect_width=DETECT_WIDTH, full_scan_every=FULL_SCAN_EVERY,
+                 roi_margin=ROI_MARGIN):
+        import cv2
+        self.cv2 = cv2
+        self.backend = backend
+        self.detect_width = detect_width  # 0 = detect at full resolution
+        self.full_scan_every = max(1, full_scan_every)  # 1 = no ROI detection
+        self.roi_margin = roi_margin
+        self.previous = []  # last boxes, full-resolution coordinates
+        self._since_full_scan = 0
+        self.counts = {'frames': 0, 'full_scans': 0, 'roi_scans': 0}
+
+    @property
+    def name(self):
+        return self.backend.name
+
+    def __call__(self, frame):
+        return self.detect(frame)
+
+    def detect(self, frame):
+        """Boxes as (x, y, w, h) in `frame`'s own coordinates."""
+        height, width = frame.shape[:2]
+        scale = 1.0
+        image = frame
+        if self.detect_width and width > self.detect_width:
+            scale = self.detect_width / width
+            image = self.cv2.resize(frame, (self.detect_width, round(height * scale)),
+                                    interpolation=self.cv2.INTER_AREA)
+
+        self.counts['frames'] += 1
+        if self.previous and self._since_full_scan < self.full_scan_every - 1:
+            self._since_full_scan += 1
+            self.counts['roi_scans'] += 1
+            boxes = self._detect_regions(image, [[v * scale for v in box] for box in self.previous])
+        else:
+            self._since_full_scan = 0
+            self.counts['full_scans'] += 1
+            boxes = self.backend.detect(image)
+
+        self.previous = [(round(x / scale), round(y / scale), round(w / scale), round(h / scale))
+                         for x, y, w, h in boxes]
+        return self.previous
+
+    def _detect_regions(self, image, boxes):
+        height, width = image.shape[:2]
+        found = []
+        for x, y, w, h in boxes:
+            margin_x, margin_y = w * self.roi_margin, h * self.roi_margin
+            x1, y1 = max(0, int(x - margin_x)), max(0, int(y - margin_y))
+            x2, y2 = min(width, int(x + w + margin_x)), min(height, int(y + h + margin_y))
+            if x2 <= x1 or y2 <= y1:
+                continue
+            for rx, ry, rw, rh in self.backend.detect(image[y1:y2, x1:x2]):
+                box = (rx + x1, ry + y1, rw, rh)
+                # Regions of faces close together overlap; keep one box per face
+                if not any(iou(box, other) > 0.5 for other in found):
+                    found.append(box)
+        return found
+
+    def reset(self):
+        """Forget the previous boxes, e.g. after a cut or seek; the next frame gets a full scan."""
+        self.previous = []
+        self._since_full_scan = 0
+
+
+def create_backend(name=DETECTOR):
+    """Build a backend by name, falling back to Haar when its model files are missing."""
+    import cv2
+    if name not in BACKENDS:
+        print(f"Unknown face detector {name!r}; using haar. Choose from: {', '.join(BACKENDS)}")
+        name = "haar"
+    if name == "yunet":
+        if not hasattr(cv2, "FaceDetectorYN"):
+            print("YuNet needs OpenCV 4.5.4 or newer; using the Haar cascade.")
+        elif not os.path.isfile(YUNET_MODEL):
+            print(f"YuNet model not found at {YUNET_MODEL}; using the Haar cascade.")
+        else:
+            return YuNetBackend(cv2)
+    elif name == "ssd":
+        if not (os.path.isfile(SSD_CONFIG) and os.path.isfile(SSD_MODEL)):
+            print(f"SSD model not found at {SSD_MODEL} / {SSD_CONFIG}; using the Haar cascade.")
+        else:
+            return SsdBackend(cv2)
+    return HaarBackend(cv2)
+
+
+def create_detector(name=DETECTOR, **options):
+    """A FaceDetector for one stream; `options` override the FaceDetector defaults."""
+    return FaceDetector(create_backend(name), **options)
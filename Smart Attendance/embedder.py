@@ -0,0 +1,195 @@
+"""
+Batched Facenet embedding, optionally spread over a pool of worker processes.
+
+Images in `dataset/` are already face crops saved by enroll.py, so instead of
+going through DeepFace.represent one file at a time this module reproduces
+DeepFace's Facenet preprocessing (letterbox to 160x160, scale to [0, 1]) and
+feeds whole batches straight through the model.
+
+The pipeline has three stages:
+1. decode + preprocess: each worker reads and resizes the images of its batch
+2. forward pass:        the batch goes through the Facenet model, which every
+                        worker builds once when it starts
+3. ordered merge:       the parent collects batches in submission order, so
+                        results line up with the input paths
+"""
+import os
+import time
+import threading
+import multiprocessing
+import numpy as np
+
+MODEL_NAME = 'Facenet'
+TARGET_SIZE = (160, 160)
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+# With the model already loaded in this process, only start a worker pool
+# (each worker builds its own model) when every worker gets this many batches
+MIN_BATCHES_PER_WORKER = 4
+
+_model = None  # per-process Facenet model, built on first use
+_model_lock = threading.Lock()
+
+
+def _require_opencv():
+    try:
+        import cv2  # type: ignore
+        return cv2
+    except ImportError:
+        print("Error: OpenCV (cv2) is not installed. Install with 'pip install opencv-python'.")
+        return None
+
+
+def get_model():
+    """Build the Facenet model once per process and keep it around."""
+    global _model
+    # Callers racing a background warm-up (model_manager) wait for it
+    # instead of building a second copy
+    with _model_lock:
+        if _model is None:
+            from deepface import DeepFace
+            _model = DeepFace.build_model(MODEL_NAME)
+    return _model
+
+
+def preprocess_face(img: np.ndarray) -> np.ndarray:
+    """
+    Letterbox a BGR face crop into the Facenet input size and scale to [0, 1],
+    the same way DeepFace prepares a face before calling the model.
+    """
+    cv2 = _require_opencv()
+    height, width = img.shape[:2]
+    factor = min(TARGET_SIZE[0] / height, TARGET_SIZE[1] / width)
+    resized = cv2.resize(img, (max(1, int(width * factor)), max(1, int(height * factor))))
+
+    diff_0 = TARGET_SIZE[0] - resized.shape[0]
+    diff_1 = TARGET_SIZE[1] - resized.shape[1]
+    padded = np.pad(resized, ((diff_0 // 2, diff_0 - diff_0 // 2),
+                              (diff_1 // 2, diff_1 - diff_1 // 2), (0, 0)), "constant")
+    if padded.shape[:2] != TARGET_SIZE:
+        padded = cv2.resize(padded, TARGET_SIZE)
+    return padded.astype(np.float32) / 255.0
+
+
+def embed_faces(faces, model=None):
+    """
+    Embed a list of BGR face crops in one forward pass.
+    Returns an (N x 128) float32 array.
+    """
+    if len(faces) == 0:
+        return np.zeros((0, 128), dtype=np.float32)
+    return _forward(np.stack([preprocess_face(face) for face in faces]), model)
+
+
+def _forward(batch, model=None):
+    if model is None:
+        model = get_model()
+    return np.asarray(model(batch, training=False), dtype=np.float32)
+
+
+def _load_and_preprocess(image_path):
+    cv2 = _require_opencv()
+    img = cv2.imread(image_path)
+    if img is None or img.size == 0:
+        return None
+    return preprocess_face(img)
+
+
+def _embed_path_batch(image_paths):
+    """Worker job: decode a batch of image files and embed them together."""
+    faces = []
+    for image_path in image_paths:
+        try:
+            faces.append(_load_and_preprocess(image_path))
+        except Exception as e:
+            print(f"✗ Error reading {image_path}: {str(e)}")
+            faces.append(None)
+
+    ok = [i for i, face in enumerate(faces) if face is not None]
+    results = [None] * len(image_paths)
+    if not ok:
+        return results
+    try:
+        vectors = _forward(np.stack([faces[i] for i in ok]))
+    except Exception as e:
+        # Retry one image at a time, so a bad image only costs itself
+        print(f"✗ Batch forward pass failed ({e}); embedding its images one by one")
+        vectors = []
+        for i in ok:
+            try:
+                vectors.append(_forward(faces[i][np.newaxis])[0])
+            except Exception as e:
+                print(f"✗ Error embedding {image_paths[i]}: {str(e)}")
+                vectors.append(None)
+    for i, vector in zip(ok, vectors):
+        if vector is not None:
+            results[i] = vector.tolist()
+    return results
+
+
+def _init_worker(threads_per_worker):
+    # Keep workers from oversubscribing the CPU with TensorFlow's own threads
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(threads_per_worker)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    get_model()
+
+
+def embed_image_files(image_paths, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE,
+                      progress=None, cancel=None):
+    """
+    Embed image files in batches across `workers` processes.
+    Returns a dict of path -> embedding list (None where the image failed).
+
+    `progress(paths, done, total, elapsed)` is called after every batch with
+    the paths it covered. When `cancel` (a threading.Event) is set, the
+    remaining batches are abandoned and only the finished ones are returned.
+    """
+    image_paths = list(image_paths)
+    if not image_paths:
+        return {}
+
+    batches = [image_paths[i:i + batch_size] for i in range(0, len(image_paths), batch_size)]
+    if _model is not None:
+        # A resident model beats paying every worker's start-up for a small job
+        workers = min(workers, len(batches) // MIN_BATCHES_PER_WORKER)
+    workers = max(1, min(workers, len(batches)))
+    start = time.perf_counter()
+    done = 0
+    results = {}
+
+    def merge(paths, vectors):
+        nonlocal done
+        results.update(zip(paths, vectors))
+        done += len(paths)
+        elapsed = time.perf_counter() - start
+        print(f"  embedded {done}/{len(image_paths)} images ({done / max(elapsed, 1e-9):.1f} images/sec)")
+        if progress is not None:
+            progress(paths, done, len(image_paths), elapsed)
+
+    def cancelled():
+        return cancel is not None and cancel.is_set()
+
+    if workers == 1:
+        for paths in batches:
+            if cancelled():
+                break
+            merge(paths, _embed_path_batch(paths))
+    else:
+        # TensorFlow is not fork-safe, so workers are started fresh
+        context = multiprocessing.get_context("spawn")
+        threads_per_worker = max(1, (os.cpu_count() or workers) // workers)
+        with context.Pool(workers, initializer=_init_worker, initargs=(threads_per_worker,)) as pool:
+            for paths, vectors in zip(batches, pool.imap(_embed_path_batch, batches)):
+                merge(paths, vectors)
+                if cancelled():
+                    break  # leaving the block terminates the pool
+
+    elapsed = time.perf_counter() - start
+    if cancelled():
+        print(f"Embedding cancelled after {done}/{len(image_paths)} images.")
+        return results
+    print(f"✓ Embedded {len(image_paths)} images in {elapsed:.1f}s "
+          f"({len(image_paths) / max(elapsed, 1e-9):.1f} images/sec, "
+          f"{workers} workers, batch size {batch_size})")
+    return results
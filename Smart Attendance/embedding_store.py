@@ -0,0 +1,259 @@
+"""
+Versioned on-disk embedding store that recognizers can memory-map.
+
+`models/embeddings.bin` is a small pointer file (b"SAPTR\\0" and a file
+name) naming the current data file, `models/embeddings.bin.<version>`. Each
+save writes a new data file and then swaps the pointer, because a file that
+a recognizer has memory-mapped cannot be replaced on Windows. Readers keep
+their old mapping until they reload; old data files are deleted once nothing
+maps them any more. A data file at the pointer's own path (as written
+before pointers) is read directly.
+
+Layout of a data file:
+
+    offset 0   magic  b"SAEMB\\0"           (6 bytes)
+    offset 6   format version, uint16 LE    (2 bytes)
+    offset 8   header length, uint32 LE     (4 bytes)
+    offset 12  reserved                     (4 bytes)
+    offset 16  UTF-8 JSON header
+    data_offset (64-byte aligned)
+               float32 (count x dim) matrix, C order, little endian
+
+The JSON header holds the model name, dimension, row count, a CRC-32 of the
+matrix bytes, and the compact index: student ID, name, images_used and
+threshold for every matrix row. A student's rows (one per prototype, see
+prototypes.py) are adjacent. Format 1 files (one row per student, no
+thresholds) can still be read.
+
+Rows are L2-normalized before they are written, so a recognizer can use the
+mapped matrix as-is. Because the matrix is opened read-only with np.memmap,
+every recognizer process on the host shares the same page-cache pages
+instead of holding its own copy.
+"""
+import os
+import json
+import time
+import struct
+import pickle
+import zlib
+import argparse
+import numpy as np
+
+STORE_FILE = "models/embeddings.bin"
+LEGACY_PICKLE_FILE = "models/embeddings.pkl"
+
+MAGIC = b"SAEMB\0"
+POINTER_MAGIC = b"SAPTR\0"
+FORMAT_VERSION = 2
+READABLE_VERSIONS = (1, 2)
+_PREAMBLE = struct.Struct("<6sHI4x")
+_ALIGNMENT = 64
+_KEEP_DATA_FILES = 2  # the current one and the one before, which a reader may just be opening
+_REPLACE_ATTEMPTS = 20
+
+
+class StoreError(Exception):
+    """Raised when an embedding store file is missing, corrupt or unsupported."""
+
+
+class EmbeddingStore:
+    """A loaded store: the (count x dim) matrix plus its per-row index."""
+
+    def __init__(self, header, matrix):
+        self.header = header
+        self.matrix = matrix
+        self.ids = header['ids']
+        self.names = header['names']
+        self.images_used = header['images_used']
+        self.thresholds = header.get('thresholds') or [None] * len(self.ids)
+
+    @property
+    def model_name(self):
+        return self.header['model_name']
+
+    @property
+    def dim(self):
+        return self.header['dim']
+
+    def __len__(self):
+        return self.header['count']
+
+    def to_embeddings(self):
+        """
+        Return the store as the dict shape `train.load_embeddings` always used,
+        plus each student's 'prototypes' and 'threshold'. 'embedding' is the
+        normalized mean of the prototypes (the prototype itself if only one).
+        """
+        embeddings = {}
+        for row, (student_id, name, images_used, threshold) in enumerate(
+                zip(self.ids, self.names, self.images_used, self.thresholds)):
+            data = embeddings.setdefault(student_id, {
+                'name': name,
+                'images_used': images_used,
+                'prototypes': [],
+                'threshold': threshold,
+            })
+            data['prototypes'].append(self.matrix[row].tolist())
+        for data in embeddings.values():
+            mean = np.mean(data['prototypes'], axis=0)
+            data['embedding'] = (mean / max(float(np.linalg.norm(mean)), 1e-12)).tolist()
+        return embeddings
+
+
+def _normalized_rows(embeddings):
+    """Split an embeddings dict into index lists and a unit-row float32 matrix."""
+    ids, names, images_used, thresholds, rows = [], [], [], [], []
+    for student_id, data in embeddings.items():
+        threshold = data.get('threshold')
+        for vector in data.get('prototypes') or [data['embedding']]:
+            vector = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm == 0:
+                continue  # a zero vector can never be matched by cosine distance
+            ids.append(student_id)
+            names.append(data['name'])
+            images_used.append(int(data.get('images_used', 0)))
+            thresholds.append(None if threshold is None else float(threshold))
+            rows.append(vector / norm)
+    dim = len(rows[0]) if rows else 0
+    matrix = np.array(rows, dtype='<f4').reshape(len(rows), dim)
+    return ids, names, images_used, thresholds, matrix
+
+
+def _data_files(path):
+    """The versioned data files of the store at `path`, oldest first."""
+    directory, base = os.path.split(path)
+    versions = []
+    for name in os.listdir(directory or "."):
+        version = name[len(base) + 1:]
+        if name.startswith(base + ".") and version.isdigit():
+            versions.append((int(version), os.path.join(directory, name)))
+    return [data_path for _, data_path in sorted(versions)]
+
+
+def data_file(path=STORE_FILE):
+    """The file holding the matrix of the store at `path`."""
+    with open(path, 'rb') as f:
+        if f.read(len(POINTER_MAGIC)) != POINTER_MAGIC:
+            return path
+        return os.path.join(os.path.dirname(path), f.read().decode('utf-8'))
+
+
+def _switch_pointer(path, data_path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(POINTER_MAGIC + os.path.basename(data_path).encode('utf-8'))
+    for attempt in range(_REPLACE_ATTEMPTS):
+        try:
+            os.replace(tmp_path, path)
+            return
+        except PermissionError:
+            # Windows: a reader has the pointer open for a moment
+            if attempt == _REPLACE_ATTEMPTS - 1:
+                raise
+            time.sleep(0.05)
+
+
+def _remove_old_data_files(path):
+    for data_path in _data_files(path)[:-_KEEP_DATA_FILES]:
+        try:
+            os.remove(data_path)
+        except OSError:
+            pass  # still mapped by a recognizer (Windows); retried on the next save
+
+
+def save_store(embeddings, model_name, path=STORE_FILE, extra=None):
+    """
+    Write `embeddings` (student_id -> {'name', 'embedding', 'images_used'},
+    plus optional 'prototypes' and 'threshold') to `path`, with the keys of
+    `extra` added to the header. The data goes to a new file and the
+    pointer at `path` is switched to it once complete, so readers never see
+    a half-written store.
+    """
+    ids, names, images_used, thresholds, matrix = _normalized_rows(embeddings)
+    header = {
+        'model_name': model_name,
+        'dim': int(matrix.shape[1]),
+        'count': int(matrix.shape[0]),
+        'dtype': 'float32',
+        'normalized': True,
+        'checksum': zlib.crc32(matrix.tobytes()),
+        'ids': ids,
+        'names': names,
+        'images_used': images_used,
+        'thresholds': thresholds,
+        **(extra or {}),
+    }
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    data_offset = -(-(_PREAMBLE.size + len(header_bytes)) // _ALIGNMENT) * _ALIGNMENT
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    existing = _data_files(path)
+    version = time.time_ns()
+    if existing:
+        version = max(version, int(existing[-1].rsplit(".", 1)[1]) + 1)
+    data_path = f"{path}.{version}"
+    with open(data_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_offset - _PREAMBLE.size - len(header_bytes)))
+        f.write(matrix.tobytes())
+    _switch_pointer(path, data_path)
+    _remove_old_data_files(path)
+    return path
+
+
+def open_store(path=STORE_FILE, verify=True):
+    """
+    Memory-map the store at `path`. With `verify`, the matrix checksum is
+    checked once (this reads the pages into the shared page cache).
+    """
+    if not os.path.exists(path):
+        raise StoreError(f"No embedding store at {path}")
+    pointer_path, path = path, data_file(path)
+    if not os.path.exists(path):
+        raise StoreError(f"{pointer_path} points to a missing file {path}")
+    with open(path, 'rb') as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise StoreError(f"{path} is truncated")
+        magic, version, header_len = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise StoreError(f"{path} is not an embedding store")
+        if version not in READABLE_VERSIONS:
+            raise StoreError(f"{path} has format version {version}; expected {FORMAT_VERSION}")
+        header = json.loads(f.read(header_len).decode('utf-8'))
+
+    data_offset = -(-(_PREAMBLE.size + header_len) // _ALIGNMENT) * _ALIGNMENT
+    shape = (header['count'], header['dim'])
+    if header['count'] == 0:
+        matrix = np.zeros(shape, dtype='<f4')
+    else:
+        matrix = np.memmap(path, dtype='<f4', mode='r', offset=data_offset, shape=shape)
+    # An empty matrix has no buffer to cast; its bytes are simply b""
+    data = memoryview(matrix).cast('B') if matrix.size else b""
+    if verify and zlib.crc32(data) != header['checksum']:
+        raise StoreError(f"{path} failed its checksum; re-run train.py")
+    return EmbeddingStore(header, matrix)
+
+
+def migrate_pickle(pickle_path=LEGACY_PICKLE_FILE, path=STORE_FILE, model_name='Facenet'):
+    """One-shot conversion of the old pickled embeddings dict into the store."""
+    with open(pickle_path, 'rb') as f:
+        embeddings = pickle.load(f)
+    save_store(embeddings, model_name, path)
+    print(f"✓ Migrated {len(embeddings)} students from {pickle_path} to {path}")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or migrate the embedding store.")
+    parser.add_argument("--migrate", action="store_true",
+                        help=f"convert {LEGACY_PICKLE_FILE} into {STORE_FILE}")
+    args = parser.parse_args()
+
+    if args.migrate:
+        migrate_pickle()
+    store = open_store()
+    print(f"{STORE_FILE}: format v{FORMAT_VERSION}, model {store.model_name}, "
+          f"{len(set(store.ids))} students in {len(store)} rows x {store.dim} dims, checksum OK")
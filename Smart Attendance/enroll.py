@@ -1,7 +1,23 @@
 import os
+import time
+import collections
 from database import add_student
+from detector import create_detector
 
-def enroll_student(name, student_id):
+TARGET_IMAGES = 15  # captures per student
+MIN_IMAGES = 10  # fewer than this and the enrollment is discarded
+CAPTURE_INTERVAL = 0.3  # seconds between automatic captures
+AUTO_ENROLL_TIMEOUT = float(os.getenv("ATTENDANCE_ENROLL_TIMEOUT", "60"))
+
+def enroll_student(name, student_id, show=None, capture=None, cancel=None, progress=None):
+    """
+    Capture face images of a new student from the default camera and add them.
+
+    By default frames go to an OpenCV window driven by the 'C' and 'Q' keys.
+    With `show`, frames are passed to show(frame) (e.g. a Tk VideoPanel)
+    instead; setting the `capture` event takes a picture and setting `cancel`
+    stops. `progress(message)` receives a line of status after every capture.
+    """
     try:
         import cv2
     except ImportError:
@@ -22,9 +38,10 @@ def enroll_student(name, student_id):
         print("Error: Could not access the camera. Please check that a webcam is connected and not used by another program.")
         return False
 
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    # Boxes come back in full-resolution coordinates, so the saved crops keep their detail
+    detect = create_detector()
     count = 0
-    target_images = 15  # Capture 15 images
+    target_images = TARGET_IMAGES
     
     print(f"Enrolling {name} ({student_id})")
     print("Instructions:")
@@ -37,8 +54,7 @@ def enroll_student(name, student_id):
         if not ret:
             break
         
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+        faces = detect(frame)
         
         # Draw rectangle around detected face
         for (x, y, w, h) in faces:
@@ -46,10 +62,18 @@ def enroll_student(name, student_id):
             cv2.putText(frame, f"Captured: {count}/{target_images}", (10, 30), 
                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
         
-        cv2.imshow("Enrollment - Press 'C' to capture, 'Q' to quit", frame)
-        
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('c'):
+        if show is not None:
+            show(frame)
+            capture_now = capture is not None and capture.is_set()
+            if capture_now:
+                capture.clear()
+            quit_now = cancel is not None and cancel.is_set()
+        else:
+            cv2.imshow("Enrollment - Press 'C' to capture, 'Q' to quit", frame)
+            key = cv2.waitKey(1) & 0xFF
+            capture_now, quit_now = key == ord('c'), key == ord('q')
+
+        if capture_now:
             if len(faces) > 0:
                 # Crop face region
                 x, y, w, h = faces[0]
@@ -58,22 +82,163 @@ def enroll_student(name, student_id):
                 cv2.imwrite(img_name, face_roi)
                 count += 1
                 print(f"Captured {count}/{target_images} images")
+                if progress is not None:
+                    progress(f"Captured {count}/{target_images} images")
             else:
                 print("No face detected! Please position your face properly.")
-        elif key == ord('q'):
+                if progress is not None:
+                    progress("No face detected! Please position your face properly.")
+        elif quit_now:
             break
 
     cap.release()
-    cv2.destroyAllWindows()
+    if show is None:
+        cv2.destroyAllWindows()
     
-    if count >= 10:  # Minimum 10 images required
+    if count >= MIN_IMAGES:
         add_student(name, student_id)
         print(f"Enrollment completed for {name} ({student_id})")
         return True
     else:
-        print(f"Enrollment failed! Only {count} images captured. Need at least 10.")
+        print(f"Enrollment failed! Only {count} images captured. Need at least {MIN_IMAGES}.")
         # Clean up incomplete enrollment
         import shutil
         if os.path.exists(folder_path):
             shutil.rmtree(folder_path)
         return False
+
+
+def auto_enroll_student(name, student_id, show=None, cancel=None, progress=None,
+                        target_images=TARGET_IMAGES, timeout=AUTO_ENROLL_TIMEOUT):
+    """
+    Enroll a new student hands-free. A face is captured automatically when it
+    passes the checks in face_quality.py (size, sharpness, frontal pose) and
+    is not a near-duplicate of a capture already kept. Each kept capture is
+    embedded straight away, and on success the student goes into the
+    embedding store, so they are recognized without running Train Model.
+
+    Frames go to show(frame) if given, otherwise to an OpenCV window ('Q'
+    quits). Setting `cancel` stops early; `progress(message)` receives
+    status lines as they change. Gives up after `timeout` seconds of
+    capturing, counted from when the face model is ready (loading it on a
+    cold start does not eat into the time).
+    """
+    try:
+        import cv2
+    except ImportError:
+        print("Error: OpenCV (cv2) is not installed. Please install with 'pip install opencv-python'.")
+        return False
+    try:
+        from deepface import DeepFace  # noqa: F401
+    except ImportError:
+        print("Error: The 'deepface' package is not installed. Install with 'pip install deepface'.")
+        return False
+    import model_manager
+    from embedder import embed_faces
+    from face_quality import assess, is_duplicate_thumbnail, is_duplicate_embedding
+    from train import add_student_embeddings
+
+    from database import get_student
+    if get_student(student_id):
+        print(f"Student {student_id} already exists!")
+        return False
+
+    model_manager.warm_up()  # a no-op if the model is already resident
+    cap = cv2.VideoCapture(0)
+    if not cap.isOpened():
+        print("Error: Could not access the camera. Please check that a webcam is connected and not used by another program.")
+        return False
+
+    folder_path = os.path.join("dataset", student_id)
+    os.makedirs(folder_path, exist_ok=True)
+    detect = create_detector()
+    kept = {}  # image path -> embedding
+    last_thumbnail = None
+    last_capture = 0.0
+    embedding_calls = 0
+    rejected = collections.Counter()
+    status = None
+    started = None  # set once the model is ready
+
+    def report(message):
+        nonlocal status
+        if message != status:
+            status = message
+            if progress is not None:
+                progress(message)
+
+    print(f"Enrolling {name} ({student_id}) with automatic capture")
+    while len(kept) < target_images:
+        if cancel is not None and cancel.is_set():
+            break
+        if started is None and model_manager.is_ready():
+            started = time.monotonic()
+        if started is not None and time.monotonic() - started > timeout:
+            print("Enrollment timed out.")
+            break
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        faces = detect(frame)
+        display = frame.copy()  # annotations go on a copy; captures stay clean
+        if len(faces) != 1:
+            report("Looking for a face..." if len(faces) == 0 else "Only one person in view, please")
+        elif not model_manager.is_ready():
+            if model_manager.finished():
+                print("Error: the face model could not be loaded.")
+                break
+            report("Loading face model...")
+        else:
+            x, y, w, h = faces[0]
+            face = frame[y:y+h, x:x+w]
+            reason, _ = assess(cv2, face)
+            if reason is None and time.monotonic() - last_capture >= CAPTURE_INTERVAL:
+                # A cheap pixel comparison first, so a still face costs no embedding calls
+                duplicate, thumbnail = is_duplicate_thumbnail(cv2, face, last_thumbnail)
+                if not duplicate:
+                    embedding = embed_faces([face])[0]
+                    embedding_calls += 1
+                    duplicate = is_duplicate_embedding(embedding, list(kept.values()))
+                if duplicate:
+                    reason = "Turn your head slightly"
+                else:
+                    image_path = os.path.join(folder_path, f"{len(kept)}.jpg")
+                    cv2.imwrite(image_path, face)
+                    kept[image_path] = embedding.tolist()
+                    last_thumbnail, last_capture = thumbnail, time.monotonic()
+                    print(f"Captured {len(kept)}/{target_images} images")
+                    report(f"Captured {len(kept)}/{target_images} images")
+            if reason is not None:
+                rejected[reason] += 1
+                report(reason)
+            cv2.rectangle(display, (x, y), (x+w, y+h), (0, 255, 0) if reason is None else (0, 0, 255), 2)
+
+        cv2.putText(display, f"Captured: {len(kept)}/{target_images}", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        if status:
+            cv2.putText(display, status, (10, 65), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+        if show is not None:
+            show(display)
+        else:
+            cv2.imshow("Enrollment - automatic capture, 'Q' to quit", display)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+
+    cap.release()
+    if show is None:
+        cv2.destroyAllWindows()
+
+    skipped = ", ".join(f"{count} x {reason.lower()}" for reason, count in rejected.most_common())
+    print(f"Kept {len(kept)} captures from {embedding_calls} embedding calls"
+          + (f"; skipped frames: {skipped}" if skipped else ""))
+    if len(kept) >= MIN_IMAGES:
+        add_student(name, student_id)
+        add_student_embeddings(student_id, name, kept)
+        print(f"Enrollment completed for {name} ({student_id})")
+        return True
+    print(f"Enrollment failed! Only {len(kept)} images captured. Need at least {MIN_IMAGES}.")
+    import shutil
+    if os.path.exists(folder_path):
+        shutil.rmtree(folder_path)
+    return False
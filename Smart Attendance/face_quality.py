@@ -0,0 +1,85 @@
+"""
+Quality checks for enrollment captures.
+
+Each detected face is scored before it is kept:
+
+    size        width of the face box in pixels
+    sharpness   variance of the Laplacian of the crop (resized to a fixed
+                size first, so it does not depend on the distance to the camera)
+    symmetry    correlation between the left half of the face and the mirrored
+                right half; a frontal face is close to symmetric, a turned or
+                tilted one is not (Haar gives no landmarks to measure pose with)
+
+Near-duplicates are caught twice: a tiny grayscale thumbnail is compared with
+the last kept capture before any embedding work is spent on it, and the
+embedding of a capture must be at least MIN_DIVERSITY (cosine distance) away
+from every capture already kept.
+"""
+import os
+
+import numpy as np
+
+MIN_FACE_SIZE = int(os.getenv("ATTENDANCE_MIN_FACE_SIZE", "96"))
+MIN_SHARPNESS = float(os.getenv("ATTENDANCE_MIN_SHARPNESS", "40"))
+MIN_SYMMETRY = float(os.getenv("ATTENDANCE_MIN_SYMMETRY", "0.4"))
+MIN_DIVERSITY = float(os.getenv("ATTENDANCE_MIN_DIVERSITY", "0.03"))
+DUPLICATE_PIXEL_DIFF = 4.0  # mean absolute thumbnail difference, 0-255
+
+_SHARPNESS_SIZE = (112, 112)
+_THUMBNAIL_SIZE = (24, 24)
+
+
+def sharpness(cv2, gray):
+    return float(cv2.Laplacian(cv2.resize(gray, _SHARPNESS_SIZE), cv2.CV_64F).var())
+
+
+def symmetry(cv2, gray):
+    """Normalized correlation of the face's left half with its mirrored right half (-1 to 1)."""
+    face = cv2.resize(gray, (64, 64)).astype(np.float32)
+    left, right = face[:, :32], face[:, 32:][:, ::-1]
+    left, right = left - left.mean(), right - right.mean()
+    denominator = float(np.sqrt((left * left).sum() * (right * right).sum()))
+    return float((left * right).sum() / denominator) if denominator else 0.0
+
+
+def thumbnail(cv2, gray):
+    return cv2.resize(gray, _THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def assess(cv2, face):
+    """
+    Score a BGR face crop. Returns (reason, scores): reason is None when the
+    face is good enough to keep, otherwise a short message for the user.
+    """
+    gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    scores = {
+        'size': face.shape[1],
+        'sharpness': sharpness(cv2, gray),
+        'symmetry': symmetry(cv2, gray),
+    }
+    if scores['size'] < MIN_FACE_SIZE:
+        return "Move closer to the camera", scores
+    if scores['sharpness'] < MIN_SHARPNESS:
+        return "Hold still (image is blurry)", scores
+    if scores['symmetry'] < MIN_SYMMETRY:
+        return "Face the camera", scores
+    return None, scores
+
+
+def is_duplicate_thumbnail(cv2, face, previous):
+    """True if `face` looks the same as the `previous` thumbnail; also returns its own thumbnail."""
+    current = thumbnail(cv2, cv2.cvtColor(face, cv2.COLOR_BGR2GRAY))
+    if previous is None:
+        return False, current
+    return float(np.abs(current - previous).mean()) < DUPLICATE_PIXEL_DIFF, current
+
+
+def is_duplicate_embedding(embedding, kept, min_distance=MIN_DIVERSITY):
+    """True if `embedding` is within `min_distance` (cosine) of any embedding in `kept`."""
+    if not kept:
+        return False
+    matrix = np.asarray(kept, dtype=np.float32)
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    probe = np.asarray(embedding, dtype=np.float32)
+    probe = probe / max(float(np.linalg.norm(probe)), 1e-12)
+    return float((1.0 - matrix @ probe).min()) < min_distance
@@ -0,0 +1,223 @@
+import os
+import time
+import numpy as np
+from train import load_embeddings, load_store
+from ann_index import load_index
+from embedding_store import STORE_FILE
+
+RELOAD_INTERVAL = float(os.getenv("ATTENDANCE_GALLERY_RELOAD", "2.0"))
+
+
+def _store_mtime():
+    try:
+        return os.stat(STORE_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    """Return a copy of `matrix` with every row scaled to unit length."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class Gallery:
+    """
+    Enrolled embeddings held as one pre-normalized float32 (N x D) matrix.
+    Row i of `matrix` belongs to `ids[i]`, so a batch of probes is matched
+    against every student with a single matrix multiply.
+
+    A student may own several adjacent rows (prototypes); a probe's score
+    for a student is its best row, taken from the same product.
+    `thresholds` lists (student ID, threshold) for students with their own.
+
+    If an ANN index (see ann_index.py) is attached, each probe only scans the
+    candidate rows the index proposes instead of the whole matrix.
+    """
+
+    def __init__(self, ids, names, matrix, index=None, normalized=False, thresholds=None):
+        if normalized:
+            # Already unit rows (e.g. a memory-mapped store): use without copying
+            self.ids = np.asarray(ids, dtype=object)
+            self.matrix = matrix
+        else:
+            matrix = np.asarray(matrix, dtype=np.float32)
+            if matrix.ndim != 2:
+                matrix = matrix.reshape(len(ids), -1)
+
+            # Zero vectors have no direction; the old loop treated them as
+            # infinitely far away, so they are simply left out of the gallery.
+            keep = np.linalg.norm(matrix, axis=1) > 0
+            self.ids = np.asarray(ids, dtype=object)[keep]
+            self.matrix = np.ascontiguousarray(_l2_normalize(matrix[keep]), dtype=np.float32)
+        self.names = dict(names)
+        self.index = index
+        self.store_mtime = None  # store version this gallery was loaded from
+        self._checked_at = time.monotonic()
+
+        # Group the rows by student: starts[j] is the first row of student_ids[j]
+        if len(self.ids) > 1:
+            self._starts = np.concatenate(([0], np.flatnonzero(self.ids[1:] != self.ids[:-1]) + 1))
+        else:
+            self._starts = np.arange(len(self.ids))
+        self.student_ids = self.ids[self._starts]
+        self._one_row_each = len(self.student_ids) == len(self.ids)
+        rows_each = np.diff(np.append(self._starts, len(self.ids)))
+        self._most_rows = int(rows_each.max()) if len(self.ids) else 0
+        self._owner = None if self._one_row_each else np.repeat(np.arange(len(self._starts)), rows_each)
+        self._threshold_pairs = thresholds  # turned into a dict on first use
+        self._thresholds = None
+
+    @classmethod
+    def from_embeddings(cls, embeddings):
+        """Build a gallery from the dict returned by `train.load_embeddings`."""
+        names = {student_id: data['name'] for student_id, data in embeddings.items()}
+        thresholds = [(student_id, data.get('threshold')) for student_id, data in embeddings.items()]
+        ids, matrix = [], []
+        for student_id, data in embeddings.items():
+            for vector in data.get('prototypes') or [data['embedding']]:
+                ids.append(student_id)
+                matrix.append(vector)
+        if not ids:
+            return cls([], names, np.zeros((0, 0), dtype=np.float32))
+        return cls(ids, names, matrix, thresholds=thresholds)
+
+    @classmethod
+    def from_store(cls, store):
+        """Wrap a memory-mapped `embedding_store.EmbeddingStore` without copying it."""
+        return cls(store.ids, zip(store.ids, store.names), store.matrix, normalized=True,
+                   thresholds=zip(store.ids, store.thresholds))
+
+    @classmethod
+    def load(cls):
+        """Load the trained gallery, or return None if no embeddings exist yet."""
+        store_mtime = _store_mtime()
+        store = load_store()
+        if store is not None:
+            gallery = cls.from_store(store)
+        else:
+            embeddings = load_embeddings()
+            if embeddings is None:
+                return None
+            gallery = cls.from_embeddings(embeddings)
+        if len(gallery):
+            gallery.index = load_index(gallery.ids, gallery.dim)
+        gallery.store_mtime = store_mtime
+        return gallery
+
+    def reload_if_changed(self, interval=RELOAD_INTERVAL):
+        """
+        The gallery to use from now on: a freshly loaded one if the store has
+        been rewritten (by training or an enrollment) since this one was
+        loaded, otherwise this one. The file is checked at most every
+        `interval` seconds, so this is cheap enough to call per batch.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < interval:
+            return self
+        self._checked_at = now
+        if _store_mtime() == self.store_mtime:
+            return self
+        gallery = Gallery.load()
+        if gallery is None or len(gallery) == 0:
+            return self
+        print(f"Embeddings changed on disk; reloaded {len(gallery)} students.")
+        return gallery
+
+    def __len__(self):
+        """Number of students (rows may be more, with several prototypes each)."""
+        return len(self.student_ids)
+
+    @property
+    def dim(self):
+        return self.matrix.shape[1]
+
+    def name(self, student_id):
+        return self.names.get(student_id)
+
+    def thresholds(self, student_ids, threshold, max_shift):
+        """
+        The distance each match in `student_ids` must be under: the student's
+        own threshold, kept within `max_shift` of the global `threshold`, or
+        `threshold` itself for students without one (and for None).
+        """
+        if self._thresholds is None:
+            self._thresholds = {student_id: float(own) for student_id, own
+                                in (self._threshold_pairs or ()) if own is not None}
+            self._threshold_pairs = None
+        low, high = threshold - max_shift, threshold + max_shift
+        return np.array([min(max(self._thresholds.get(student_id, threshold), low), high)
+                         for student_id in student_ids], dtype=np.float32)
+
+    def search(self, probes, k=1):
+        """
+        Return the `k` nearest students for each probe by cosine distance.
+
+        `probes` is a (B x D) array or a single D-vector. The result is a pair
+        of (B x k) arrays: student IDs and distances, closest first. Probes
+        with zero norm get distance inf and ID None.
+        """
+        probes = np.asarray(probes, dtype=np.float32)
+        if probes.ndim == 1:
+            probes = probes[np.newaxis, :]
+        batch = probes.shape[0]
+        k = min(k, len(self))
+        if k == 0:
+            return (np.empty((batch, 0), dtype=object),
+                    np.empty((batch, 0), dtype=np.float32))
+
+        probe_norms = np.linalg.norm(probes, axis=1)
+        valid = probe_norms > 0
+        probe_norms[~valid] = 1.0
+        probes = probes / probe_norms[:, np.newaxis]
+        if self.index is not None:
+            return self._search_index(probes, valid, k)
+        similarities = probes @ self.matrix.T
+
+        if not self._one_row_each and k == 1:
+            # The nearest row is the nearest student's best prototype
+            best = np.argmax(similarities, axis=1)[:, np.newaxis]
+            top = self._owner[best]
+            distances = 1.0 - np.take_along_axis(similarities, best, axis=1)
+        else:
+            if not self._one_row_each:
+                # Best prototype of every student: (B x rows) -> (B x students)
+                similarities = np.maximum.reduceat(similarities, self._starts, axis=1)
+            if k < len(self):
+                top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(len(self)), (batch, k))
+            top_sims = np.take_along_axis(similarities, top, axis=1)
+            order = np.argsort(-top_sims, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            distances = 1.0 - np.take_along_axis(top_sims, order, axis=1)
+
+        ids = self.student_ids[top]
+        distances[~valid] = np.inf
+        ids[~valid] = None
+        return ids, distances
+
+    def _search_index(self, probes, valid, k):
+        """Per-probe search through the attached ANN index."""
+        ids = np.full((len(probes), k), None, dtype=object)
+        distances = np.full((len(probes), k), np.inf, dtype=np.float32)
+        # With prototypes, ask for extra rows so k distinct students remain
+        rows_wanted = k * self._most_rows
+        for i in np.flatnonzero(valid):
+            rows, similarities = self.index.search(self.matrix, probes[i], rows_wanted)
+            if not self._one_row_each:
+                # Rows come best first, so a student's first row is their best prototype
+                _, first = np.unique(self.ids[rows].astype(str), return_index=True)
+                first = np.sort(first)[:k]
+                rows, similarities = rows[first], similarities[first]
+            ids[i, :len(rows)] = self.ids[rows]
+            distances[i, :len(rows)] = 1.0 - similarities
+        return ids, distances
+
+    def best_match(self, probe):
+        """Return `(student_id, distance)` for the single closest student."""
+        ids, distances = self.search(probe, k=1)
+        if ids.shape[1] == 0:
+            return None, float('inf')
+        return ids[0, 0], float(distances[0, 0])
@@ -0,0 +1,129 @@
+"""
+Live attendance feed for the dashboard.
+
+Instead of every open browser polling the database, one poller thread per
+dashboard process tails the attendance table by id and fans new marks out to
+in-memory subscriber queues; the /api/stream endpoint turns a subscription
+into Server-Sent Events. The poller checks PRAGMA data_version first, so
+while nothing is being written it does not query any table at all.
+
+Marks written by recognizers in other processes show up within
+`poll_interval` seconds. A subscriber that stops reading is disconnected
+once its queue fills up; the browser's EventSource reconnects and gets a
+fresh snapshot.
+"""
+import os
+import queue
+import threading
+
+from database import get_attendance_since, get_last_attendance_id, open_connection
+
+POLL_INTERVAL = float(os.getenv("ATTENDANCE_FEED_POLL", "0.5"))
+SUBSCRIBER_QUEUE_SIZE = 256
+FETCH_LIMIT = 500
+
+
+def mark_event(record):
+    """JSON-ready dict for an (id, student_id, date, time, status, name) row."""
+    return {'id': record[0], 'student_id': record[1], 'date': record[2],
+            'time': record[3], 'status': record[4], 'name': record[5]}
+
+
+class Subscription:
+    """One client's queue of (event, data) pairs."""
+
+    def __init__(self, feed, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.feed = feed
+        self.queue = queue.Queue(maxsize)
+        self.closed = False
+
+    def get(self, timeout=None):
+        """Next (event, data) pair; raises queue.Empty after `timeout` seconds."""
+        return self.queue.get(timeout=timeout)
+
+    def close(self):
+        self.feed.unsubscribe(self)
+
+
+class AttendanceFeed:
+    """Single database poller publishing 'mark' and 'stats' events to subscribers."""
+
+    def __init__(self, stats_service=None, poll_interval=POLL_INTERVAL):
+        self.stats_service = stats_service
+        self.poll_interval = poll_interval
+        self.counters = {'polls': 0, 'queries': 0, 'events': 0, 'deliveries': 0, 'overflows': 0}
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+
+    def _ensure_started(self):
+        # Started lazily by the first subscriber, and again after a fork
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="attendance-feed", daemon=True)
+            self._thread.start()
+
+    def subscribe(self, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        subscription = Subscription(self, maxsize)
+        with self._lock:
+            self._ensure_started()
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.closed = True
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, event, data):
+        """Queue an event for every subscriber without ever blocking on one."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        self.counters['events'] += 1
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait((event, data))
+                self.counters['deliveries'] += 1
+            except queue.Full:
+                self.counters['overflows'] += 1
+                self.unsubscribe(subscription)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        conn = open_connection()
+        last_id = get_last_attendance_id(conn)
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        while not self._stop.wait(self.poll_interval):
+            self.counters['polls'] += 1
+            try:
+                current = conn.execute("PRAGMA data_version").fetchone()[0]
+                if current == version:
+                    continue
+                version = current
+                published = False
+                while True:
+                    self.counters['queries'] += 1
+                    rows = get_attendance_since(last_id, FETCH_LIMIT, conn)
+                    for record in rows:
+                        self.publish('mark', mark_event(record))
+                        last_id = record[0]
+                        published = True
+                    if len(rows) < FETCH_LIMIT:
+                        break
+                if published and self.stats_service is not None:
+                    self.publish('stats', self.stats_service.get()[0])
+            except Exception as e:
+                print(f"Error polling attendance: {e}")
+        conn.close()
@@ -0,0 +1,84 @@
+"""
+Keeps the Facenet model resident for the life of the process.
+
+The expensive part of the first recognition is not matching but getting
+TensorFlow ready: importing TensorFlow and DeepFace, building Facenet and
+its weights, and the first forward pass (which traces the graph and sets up
+the CPU kernels). warm_up() does all three on a background thread, so the
+GUI can start it at launch and "Mark Attendance" finds the model ready.
+Later sessions in the same process reuse the same model through
+embedder.get_model().
+"""
+import time
+import threading
+
+import numpy as np
+
+from embedder import TARGET_SIZE, get_model
+
+_lock = threading.Lock()
+_thread = None
+_ready = threading.Event()
+_error = None
+timings = {}  # phase -> seconds, filled in by the warm-up
+
+
+def _warm_up():
+    global _error
+    try:
+        start = time.perf_counter()
+        import tensorflow  # noqa: F401
+        from deepface import DeepFace  # noqa: F401
+        timings['import'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        model = get_model()
+        timings['build'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        model(np.zeros((1,) + TARGET_SIZE + (3,), dtype=np.float32), training=False)
+        timings['first_inference'] = time.perf_counter() - start
+    except Exception as e:
+        _error = e
+        print(f"Error loading the face model: {e}")
+    finally:
+        _ready.set()
+
+
+def warm_up(background=True):
+    """Start loading the model (once per process). Returns immediately if `background`."""
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_warm_up, name="model-warm-up", daemon=True)
+            _thread.start()
+    if not background:
+        _ready.wait()
+
+
+def is_ready():
+    return _ready.is_set() and _error is None
+
+
+def finished():
+    """True once the warm-up has ended, successfully or not."""
+    return _ready.is_set()
+
+
+def wait(timeout=None):
+    """Block until the warm-up has finished; returns the model, or None on failure."""
+    warm_up()
+    if not _ready.wait(timeout) or _error is not None:
+        return None
+    return get_model()
+
+
+def status():
+    """One-line state for display, e.g. in the GUI's status bar."""
+    if _thread is None:
+        return "Face model not loaded"
+    if not _ready.is_set():
+        return "Loading face model..."
+    if _error is not None:
+        return f"Face model failed to load: {_error}"
+    return f"Face model ready (loaded in {sum(timings.values()):.1f}s)"
@@ -0,0 +1,289 @@
+"""
+Staged recognition pipeline: capture -> detect -> embed -> record.
+
+Each stage runs in its own thread (the embed stage in a small pool of
+threads; TensorFlow releases the GIL during inference), connected by bounded
+queues. Frame and embedding queues drop their *oldest* item when full, so a
+slow embedding call never makes capture fall behind: stale frames are thrown
+away and latency stays flat under load. Attendance marks are never dropped;
+the record queue is unbounded, but it only ever sees one item per visit.
+
+The display is fed through a one-slot queue and drawn by the caller on the
+main thread, because OpenCV's HighGUI is not thread-safe.
+"""
+import os
+import time
+import queue
+import threading
+import collections
+
+QUEUE_SIZE = int(os.getenv("ATTENDANCE_QUEUE_SIZE", "4"))
+EMBED_WORKERS = int(os.getenv("ATTENDANCE_EMBED_WORKERS", "2"))
+
+
+class DropOldestQueue:
+    """Bounded FIFO whose put() never blocks: when full, the oldest item goes."""
+
+    def __init__(self, maxsize, on_drop=None):
+        self.maxsize = maxsize
+        self.on_drop = on_drop
+        self.dropped = 0
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        dropped = None
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                dropped = self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+        if dropped is not None and self.on_drop is not None:
+            self.on_drop(dropped)
+
+    def get(self, timeout=None):
+        """Return the oldest item, raising queue.Empty after `timeout` seconds."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                raise queue.Empty
+            return self._items.popleft()
+
+    def qsize(self):
+        return len(self._items)
+
+
+class StageStats:
+    """Thread-safe count and timing of the work one stage has done."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent = collections.deque(maxlen=window)  # for percentiles
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            self._recent.append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            recent = sorted(self._recent)
+            return {
+                'processed': self.count,
+                'avg_ms': self.total * 1000 / self.count if self.count else 0.0,
+                'p50_ms': recent[len(recent) // 2] * 1000 if recent else 0.0,
+                'p99_ms': recent[min(len(recent) - 1, int(len(recent) * 0.99))] * 1000 if recent else 0.0,
+                'max_ms': self.max * 1000,
+            }
+
+
+class RecognitionPipeline:
+    """
+    Runs one video source through the four stages. The recognition logic is
+    passed in as callables so the pipeline stays independent of how faces
+    are detected, identified and recorded:
+
+    detect(frame)          -> list of (x, y, w, h) boxes
+    identify(face_rois)    -> list of (student_id, student_name, distance)
+    record(id, name)       -> "marked", "already" or "cooldown"
+    annotate(frame, tracks) draws boxes and labels onto the frame
+
+    With embed_workers=0 the pipeline starts no embedding threads of its own;
+    an external scheduler (see recognition_server.py) takes jobs from
+    `embed_jobs` and hands answers back through `complete_job`.
+
+    When the source runs out (a video file), queued frames and embedding jobs
+    are still finished before the pipeline stops.
+    """
+
+    def __init__(self, capture, detect, identify, record, tracker, annotate=None,
+                 embed_workers=EMBED_WORKERS, queue_size=QUEUE_SIZE, display=True):
+        self.capture = capture
+        self.detect = detect
+        self.identify = identify
+        self.record = record
+        self.tracker = tracker
+        self.annotate = annotate
+        self.embed_workers = max(0, embed_workers)
+        self.display_enabled = display
+
+        self.frames = DropOldestQueue(queue_size)
+        self.embed_jobs = DropOldestQueue(queue_size, on_drop=self._release_job)
+        self.results = queue.Queue()
+        self.records = queue.Queue()
+        self.display = DropOldestQueue(1)
+
+        self.stage_stats = {name: StageStats() for name in ("capture", "detect", "embed", "record")}
+        self.latency = StageStats()  # capture -> identity assigned
+        self.faces_embedded = 0
+        self._outstanding = 0  # embed jobs submitted but not yet applied
+        self._outstanding_lock = threading.Lock()
+        self._capture_done = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    @property
+    def running(self):
+        return not self._stop.is_set()
+
+    def start(self):
+        targets = [("capture", self._capture_loop), ("detect", self._detect_loop),
+                   ("record", self._record_loop)]
+        targets += [(f"embed-{i}", self._embed_loop) for i in range(self.embed_workers)]
+        for name, target in targets:
+            thread = threading.Thread(target=target, name=f"pipeline-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5.0):
+        """Stop all stages; marks already queued for the DB are still written."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._drain_records()
+
+    def stats(self):
+        """Per-stage timings plus current queue depths and drop counts."""
+        stats = {name: s.snapshot() for name, s in self.stage_stats.items()}
+        for name, q in (("frames", self.frames), ("embed_jobs", self.embed_jobs),
+                        ("display", self.display)):
+            stats[name + "_queue"] = {'depth': q.qsize(), 'maxsize': q.maxsize, 'dropped': q.dropped}
+        stats["records_queue"] = {'depth': self.records.qsize()}
+        stats["latency"] = self.latency.snapshot()
+        return stats
+
+    def format_stats(self):
+        stats = self.stats()
+        stages = " | ".join(
+            f"{name} {stats[name]['processed']} @ {stats[name]['avg_ms']:.1f}ms"
+            for name in ("capture", "detect", "embed", "record")
+        )
+        queues = " | ".join(
+            f"{name} {stats[name + '_queue']['depth']}/{stats[name + '_queue']['maxsize']}"
+            f" (dropped {stats[name + '_queue']['dropped']})"
+            for name in ("frames", "embed_jobs")
+        )
+        return f"{stages}\nqueues: {queues} | records {stats['records_queue']['depth']}"
+
+    # --- stages -------------------------------------------------------------
+
+    def _capture_loop(self):
+        frame_index = 0
+        while self.running:
+            start = time.perf_counter()
+            ret, frame = self.capture.read()
+            if not ret:
+                self._capture_done.set()
+                break
+            frame_index += 1
+            self.stage_stats["capture"].record(time.perf_counter() - start)
+            self.frames.put((frame_index, time.perf_counter(), frame))
+
+    def _detect_loop(self):
+        while self.running:
+            try:
+                frame_index, captured_at, frame = self.frames.get(timeout=0.1)
+            except queue.Empty:
+                self._apply_results()
+                if self._capture_done.is_set() and self._outstanding == 0:
+                    self._stop.set()  # source exhausted and all work finished
+                continue
+            start = time.perf_counter()
+            self._apply_results()
+            tracks = self.tracker.update(self.detect(frame), frame_index)
+
+            pending = [t for t in tracks
+                       if not t.in_flight and self.tracker.needs_embedding(t, frame_index)]
+            if pending:
+                for track in pending:
+                    track.in_flight = True
+                # Copies, not views: the embed workers read them while this
+                # thread draws the annotations onto `frame`
+                rois = [frame[y:y+h, x:x+w].copy() for (x, y, w, h) in (t.box for t in pending)]
+                with self._outstanding_lock:
+                    self._outstanding += 1
+                self.embed_jobs.put((frame_index, captured_at, pending, rois))
+
+            for track in tracks:
+                if track.identified and not track.marked:
+                    track.marked = True
+                    self.records.put(track)
+
+            if self.display_enabled:
+                if self.annotate is not None:
+                    self.annotate(frame, tracks)
+                self.display.put(frame)
+            self.stage_stats["detect"].record(time.perf_counter() - start)
+
+    def _embed_loop(self):
+        while self.running:
+            try:
+                job = self.embed_jobs.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            start = time.perf_counter()
+            try:
+                identities = self.identify(job[3])
+            except Exception as e:
+                print(f"Recognition error: {e}")
+                identities = [(None, None, float('inf'))] * len(job[2])
+            self.complete_job(job, identities, time.perf_counter() - start)
+
+    def complete_job(self, job, identities, seconds):
+        """Hand back the identities for an embed job; safe from any thread."""
+        self.stage_stats["embed"].record(seconds)
+        self.results.put((job, identities))
+
+    def _record_loop(self):
+        while self.running or not self.records.empty():
+            try:
+                track = self.records.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self._record_track(track)
+
+    # --- helpers ------------------------------------------------------------
+
+    def _record_track(self, track):
+        start = time.perf_counter()
+        status = self.record(track.student_id, track.student_name)
+        if status == "cooldown":
+            track.marked = False  # try again on a later frame
+        else:
+            track.status = status
+        self.stage_stats["record"].record(time.perf_counter() - start)
+
+    def _drain_records(self):
+        while True:
+            try:
+                track = self.records.get_nowait()
+            except queue.Empty:
+                return
+            self._record_track(track)
+
+    def _release_job(self, job):
+        # A dropped job's tracks must be allowed to embed again
+        for track in job[2]:
+            track.in_flight = False
+        with self._outstanding_lock:
+            self._outstanding -= 1
+
+    def _apply_results(self):
+        """Hand finished embeddings back to the tracker (detect thread only)."""
+        while True:
+            try:
+                (frame_index, captured_at, tracks, _), identities = self.results.get_nowait()
+            except queue.Empty:
+                return
+            for track, (student_id, student_name, distance) in zip(tracks, identities):
+                track.in_flight = False
+                self.tracker.assign(track, student_id, student_name, distance, frame_index)
+            self.faces_embedded += len(tracks)
+            with self._outstanding_lock:
+                self._outstanding -= 1
+            self.latency.record(time.perf_counter() - captured_at)
@@ -0,0 +1,71 @@
+"""
+Several prototype embeddings per student instead of one average.
+
+A student's training images are clustered (spherical k-means, cosine
+similarity) into up to PROTOTYPES unit vectors, so looks that differ a lot -
+with and without glasses, a new hairstyle - each keep their own prototype
+rather than being averaged into a vector that is close to neither. A probe
+is matched against a student's nearest prototype (see Gallery.search).
+
+Each student also gets a threshold from their own spread: every image is
+held out in turn, the rest are clustered, and the distance from the held-out
+image to its nearest prototype is measured. A student whose images vary a
+lot is allowed a looser match than one whose images are all alike. The
+recognizer keeps these within a band around the global threshold (see
+Gallery.thresholds).
+"""
+import os
+
+import numpy as np
+
+from ann_index import _spherical_kmeans
+
+PROTOTYPES = int(os.getenv("ATTENDANCE_PROTOTYPES", "3"))
+IMAGES_PER_PROTOTYPE = 3  # fewer images than this per cluster just fit noise
+MIN_IMAGES_FOR_THRESHOLD = 4
+SPREAD_PERCENTILE = 90
+THRESHOLD_MARGIN = float(os.getenv("ATTENDANCE_THRESHOLD_MARGIN", "0.05"))
+KMEANS_ITERATIONS = 10
+
+
+def _unit_rows(vectors):
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1)
+    matrix = matrix[norms > 0] / norms[norms > 0, np.newaxis]
+    return matrix
+
+
+def cluster(matrix, k=PROTOTYPES):
+    """Up to `k` unit prototypes for the unit rows of `matrix` (just their mean if there are few)."""
+    k = max(1, min(k, len(matrix) // IMAGES_PER_PROTOTYPE))
+    if k == 1:
+        mean = matrix.mean(axis=0)
+        return (mean / max(float(np.linalg.norm(mean)), 1e-12))[np.newaxis, :].astype(np.float32)
+    return _spherical_kmeans(matrix, k, KMEANS_ITERATIONS, seed=0)
+
+
+def spread_threshold(matrix, k=PROTOTYPES):
+    """
+    Cosine distance under which this student's own unseen images are
+    expected to fall (leave-one-out), or None with too few images to tell.
+    """
+    if len(matrix) < MIN_IMAGES_FOR_THRESHOLD:
+        return None
+    held_out = []
+    for i in range(len(matrix)):
+        rest = np.delete(matrix, i, axis=0)
+        held_out.append(1.0 - float((cluster(rest, k) @ matrix[i]).max()))
+    return float(np.percentile(held_out, SPREAD_PERCENTILE)) + THRESHOLD_MARGIN
+
+
+def build_prototypes(vectors, k=PROTOTYPES):
+    """
+    Cluster one student's image embeddings. Returns (prototypes, threshold):
+    a list of unit vectors and the student's threshold (None if unknown).
+    The images should come in a stable order (training sorts them by path),
+    so the same images always give the same prototypes.
+    """
+    matrix = _unit_rows(vectors)
+    if len(matrix) == 0:
+        return [], None
+    return cluster(matrix, k).tolist(), spread_threshold(matrix, k)
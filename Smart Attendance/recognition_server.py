@@ -0,0 +1,301 @@
+"""
+Headless recognition service that drives many video streams from one process.
+
+Every source (a device index, an RTSP/HTTP URL or a video file) gets its own
+capture/detect/record pipeline, but all of them share a single Facenet model
+and a single gallery. Embedding work is pulled from the streams by a shared
+scheduler that takes one job per stream per round, so a busy doorway cannot
+starve a quiet one, and it packs faces from several cameras into one batched
+forward pass.
+
+Usage:
+    python recognition_server.py 0 1 rtsp://door-2/stream lecture.mp4
+    python recognition_server.py clip1.mp4 clip2.mp4 --dry-run --stats-every 5
+"""
+import os
+import time
+import queue
+import argparse
+import threading
+
+from gallery import Gallery
+from attendance_sink import AttendanceSink
+from embedder import get_model
+from tracker import FaceTracker
+from detector import create_detector
+from pipeline import RecognitionPipeline, QUEUE_SIZE
+from recognize import THRESHOLD, _require_opencv, _record_attendance, identify_faces
+
+BATCH_SIZE = int(os.getenv("ATTENDANCE_SERVER_BATCH", "16"))
+RECOGNITION_COOLDOWN = 5  # Seconds between recognitions for same student
+
+
+def parse_source(text):
+    """Device indices are given as plain integers; anything else is a path/URL."""
+    return int(text) if text.isdigit() else text
+
+
+class PacedCapture:
+    """
+    Wraps a capture of a video file so frames come out at the file's own
+    frame rate, the way a live camera would deliver them.
+    """
+
+    def __init__(self, capture, fps):
+        self.capture = capture
+        self.interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self._next = None
+
+    def read(self):
+        now = time.perf_counter()
+        if self._next is None:
+            self._next = now
+        elif self._next > now:
+            time.sleep(self._next - now)
+        self._next += self.interval
+        return self.capture.read()
+
+    def release(self):
+        self.capture.release()
+
+
+class EmbedScheduler:
+    """
+    Shared embedding stage for all streams. Each round it visits the streams
+    in turn, starting one past where the previous round started, and takes at
+    most one job from each until `batch_size` faces are collected.
+    """
+
+    def __init__(self, gallery, pipelines, batch_size=BATCH_SIZE, workers=1, threshold=THRESHOLD):
+        self.gallery = gallery
+        self.pipelines = pipelines
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+        self.threshold = threshold
+        self.batches = 0
+        self.faces = 0
+        self._next = 0
+        self._gather_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"embed-scheduler-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _gather(self):
+        jobs = []
+        faces = 0
+        with self._gather_lock:
+            count = len(self.pipelines)
+            start = self._next
+            self._next = (self._next + 1) % max(count, 1)
+            progress = True
+            while progress and faces < self.batch_size:
+                progress = False
+                for k in range(count):
+                    pipeline = self.pipelines[(start + k) % count]
+                    try:
+                        job = pipeline.embed_jobs.get(timeout=0)
+                    except queue.Empty:
+                        continue
+                    jobs.append((pipeline, job))
+                    faces += len(job[3])
+                    progress = True
+                    if faces >= self.batch_size:
+                        break
+        return jobs
+
+    def _identify(self, face_rois):
+        # Students enrolled while the server runs become recognizable within seconds
+        gallery = self.gallery = self.gallery.reload_if_changed()
+        return [
+            (student_id, gallery.name(student_id) if student_id else None, distance)
+            for student_id, distance in identify_faces(gallery, face_rois, self.threshold)
+        ]
+
+    def _loop(self):
+        while not self._stop.is_set():
+            jobs = self._gather()
+            if not jobs:
+                time.sleep(0.002)
+                continue
+            rois = [roi for _, job in jobs for roi in job[3]]
+            start = time.perf_counter()
+            try:
+                identities = self._identify(rois)
+            except Exception as e:
+                print(f"Recognition error: {e}")
+                identities = [(None, None, float('inf'))] * len(rois)
+            elapsed = time.perf_counter() - start
+            self.batches += 1
+            self.faces += len(rois)
+
+            offset = 0
+            for pipeline, job in jobs:
+                size = len(job[3])
+                pipeline.complete_job(job, identities[offset:offset + size], elapsed)
+                offset += size
+
+
+class RecognitionServer:
+    """Runs one pipeline per source around a shared model, gallery and scheduler."""
+
+    def __init__(self, sources, gallery, batch_size=BATCH_SIZE, embed_workers=1,
+                 realtime=True, dry_run=False, queue_size=QUEUE_SIZE):
+        self.sources = sources
+        self.gallery = gallery
+        self.realtime = realtime
+        self.dry_run = dry_run
+        self.queue_size = queue_size
+        self.streams = []  # (source, capture, pipeline)
+        self.scheduler = EmbedScheduler(gallery, [], batch_size=batch_size, workers=embed_workers)
+        self.recognized_today = set()
+        self.last_recognition_time = {}
+        self._record_lock = threading.Lock()
+        self.sink = None if dry_run else AttendanceSink()
+        self.started_at = None
+
+    def _record(self, student_id, student_name):
+        if self.dry_run:
+            return "marked"
+        # One cooldown table for all cameras, so a student walking past two doors
+        # is only written once
+        with self._record_lock:
+            return _record_attendance(student_id, student_name, self.last_recognition_time,
+                                      self.recognized_today, RECOGNITION_COOLDOWN, mark=self.sink.mark)
+
+    def _open(self, cv2, source):
+        capture = cv2.VideoCapture(source)
+        if not capture.isOpened():
+            print(f"Error: Could not open video source {source!r}; skipping it.")
+            return None
+        if self.realtime and isinstance(source, str) and os.path.isfile(source):
+            capture = PacedCapture(capture, capture.get(cv2.CAP_PROP_FPS))
+        return capture
+
+    def start(self):
+        cv2 = _require_opencv()
+        if cv2 is None:
+            return False
+        get_model()  # build the one shared model before any stream starts
+
+        for source in self.sources:
+            capture = self._open(cv2, source)
+            if capture is None:
+                continue
+            # Detectors keep per-stream state (and cascades are not thread-safe),
+            # so each stream gets its own
+            detect = create_detector()
+            pipeline = RecognitionPipeline(capture, detect, None, self._record, FaceTracker(),
+                                           embed_workers=0, queue_size=self.queue_size, display=False)
+            self.streams.append((source, capture, pipeline))
+
+        if not self.streams:
+            print("Error: None of the video sources could be opened.")
+            return False
+        self.scheduler.pipelines = [pipeline for _, _, pipeline in self.streams]
+        if self.sink is not None:
+            self.sink.start()
+        self.started_at = time.perf_counter()
+        self.scheduler.start()
+        for _, _, pipeline in self.streams:
+            pipeline.start()
+        return True
+
+    @property
+    def running(self):
+        return any(pipeline.running for _, _, pipeline in self.streams)
+
+    def stop(self):
+        for _, _, pipeline in self.streams:
+            pipeline.stop()
+        self.scheduler.stop()
+        if self.sink is not None:
+            self.sink.close()
+        for _, capture, _ in self.streams:
+            capture.release()
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        streams = []
+        for source, _, pipeline in self.streams:
+            stats = pipeline.stats()
+            streams.append({
+                'source': source,
+                'frames': stats['capture']['processed'],
+                'faces': pipeline.faces_embedded,
+                'frames_dropped': stats['frames_queue']['dropped'],
+                'jobs_dropped': stats['embed_jobs_queue']['dropped'],
+                'latency_p50_ms': stats['latency']['p50_ms'],
+                'latency_p99_ms': stats['latency']['p99_ms'],
+            })
+        return {
+            'elapsed_s': elapsed,
+            'faces_per_sec': self.scheduler.faces / elapsed if elapsed else 0.0,
+            'avg_batch': self.scheduler.faces / self.scheduler.batches if self.scheduler.batches else 0.0,
+            'writes': self.sink.stats() if self.sink is not None else None,
+            'streams': streams,
+        }
+
+    def format_stats(self):
+        stats = self.stats()
+        lines = [f"{stats['elapsed_s']:.0f}s: {stats['faces_per_sec']:.1f} faces/sec overall, "
+                 f"avg batch {stats['avg_batch']:.1f} faces"]
+        if stats['writes'] is not None:
+            w = stats['writes']
+            lines.append(f"  attendance: {w['queued']} queued, {w['flushed']} written, "
+                         f"{w['deduplicated']} deduplicated, {w['pending']} pending")
+        for s in stats['streams']:
+            lines.append(f"  {str(s['source']):<30} {s['frames']:>6} frames {s['faces']:>5} faces "
+                         f"latency p50 {s['latency_p50_ms']:.0f}ms p99 {s['latency_p99_ms']:.0f}ms "
+                         f"dropped {s['frames_dropped']} frames / {s['jobs_dropped']} jobs")
+        return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help="device indices, stream URLs or video files")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="max faces per forward pass")
+    parser.add_argument("--embed-workers", type=int, default=1, help="scheduler threads running the model")
+    parser.add_argument("--stats-every", type=float, default=10.0, help="seconds between stats reports")
+    parser.add_argument("--no-realtime", action="store_true",
+                        help="read video files as fast as possible instead of at their frame rate")
+    parser.add_argument("--dry-run", action="store_true", help="recognize but do not write attendance")
+    args = parser.parse_args()
+
+    gallery = Gallery.load()
+    if gallery is None or len(gallery) == 0:
+        print("Error: No embeddings found. Run train.py before starting the recognition server.")
+        return
+    print(f"Loaded embeddings for {len(gallery)} students.")
+
+    server = RecognitionServer([parse_source(s) for s in args.sources], gallery,
+                               batch_size=args.batch_size, embed_workers=args.embed_workers,
+                               realtime=not args.no_realtime, dry_run=args.dry_run)
+    if not server.start():
+        return
+    print(f"Serving {len(server.streams)} streams. Press Ctrl+C to stop.")
+    last_report = time.perf_counter()
+    try:
+        while server.running:
+            time.sleep(0.2)
+            if time.perf_counter() - last_report >= args.stats_every:
+                print(server.format_stats())
+                last_report = time.perf_counter()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    print(server.format_stats())
+
+
+if __name__ == "__main__":
+    main()
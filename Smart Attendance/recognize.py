@@ -1,10 +1,20 @@
 import os
+import queue
 import datetime
-import numpy as np
-from database import mark_attendance, get_student
-from train import load_embeddings
+from database import mark_attendance, get_all_students
+from attendance_sink import AttendanceSink
+from gallery import Gallery
+from dataset_gallery import load_dataset_gallery
+from embedder import embed_faces
+import model_manager
+from tracker import FaceTracker
+from detector import create_detector
+from pipeline import RecognitionPipeline
 
 THRESHOLD = float(os.getenv("ATTENDANCE_THRESHOLD", "0.35"))
+# How far a student's own threshold (from their training spread) may move
+# away from THRESHOLD; 0 uses THRESHOLD for everyone
+THRESHOLD_RANGE = float(os.getenv("ATTENDANCE_THRESHOLD_RANGE", "0.1"))
 
 def _require_opencv():
     try:
@@ -22,20 +32,83 @@ def _require_deepface():
         print("Error: The 'deepface' package is not installed. Install with 'pip install deepface'.")
         return None
 
-def _cosine_distance(a: np.ndarray, b: np.ndarray) -> float:
-    """Return cosine distance between two vectors."""
-    a_norm = np.linalg.norm(a)
-    b_norm = np.linalg.norm(b)
-    if a_norm == 0 or b_norm == 0:
-        return float("inf")
-    return 1.0 - float(np.dot(a, b) / (a_norm * b_norm))
+def crop_faces(frame, faces):
+    """Cut every detected (x, y, w, h) box out of the frame."""
+    return [frame[y:y+h, x:x+w] for (x, y, w, h) in faces]
 
 
-def recognize_faces():
+def identify_faces(gallery, face_rois, threshold=THRESHOLD):
+    """
+    Embed all face crops in one batched forward pass and match them against
+    the gallery together. Returns one `(student_id, distance)` per crop;
+    student_id is None when the closest match is above the threshold
+    (`threshold`, or the student's own within THRESHOLD_RANGE of it).
+    """
+    if len(face_rois) == 0:
+        return []
+    ids, distances = gallery.search(embed_faces(face_rois), k=1)
+    limits = gallery.thresholds(ids[:, 0], threshold, THRESHOLD_RANGE)
+    matches = []
+    for student_id, distance, limit in zip(ids[:, 0], distances[:, 0], limits):
+        distance = float(distance)
+        matches.append((student_id if student_id is not None and distance < limit else None, distance))
+    return matches
+
+
+def _record_attendance(student_id, student_name, last_recognition_time, recognized_today,
+                       recognition_cooldown, mark=mark_attendance):
+    """
+    Mark attendance for a recognized student unless they are still in their
+    cooldown window. Returns "cooldown", "marked" or "already". `mark` is
+    database.mark_attendance or an AttendanceSink's mark.
+    """
+    now = datetime.datetime.now()
+    if student_id in last_recognition_time:
+        time_diff = (now - last_recognition_time[student_id]).total_seconds()
+        if time_diff < recognition_cooldown:
+            return "cooldown"
+
+    date = now.strftime("%Y-%m-%d")
+    time = now.strftime("%H:%M:%S")
+    if mark(student_id, date, time):
+        recognized_today.add(student_id)
+        last_recognition_time[student_id] = now
+        print(f"✓ Attendance marked: {student_name} ({student_id}) at {time}")
+        return "marked"
+    return "already"
+
+
+def annotate_tracks(cv2, frame, tracks):
+    """Draw each tracked face's box and its current recognition label."""
+    for track in tracks:
+        x, y, w, h = track.box
+        cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
+        if track.last_embedded is None:
+            continue
+        if not track.identified:
+            cv2.putText(frame, "Unknown", (x, y-10),
+                      cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        elif track.status == "marked":
+            cv2.putText(frame, f"Recognized: {track.student_name}", (x, y-10),
+                      cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        elif track.status == "already":
+            cv2.putText(frame, f"Already marked: {track.student_name}", (x, y-10),
+                      cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
+
+
+def recognize_faces(show=None, cancel=None):
+    """
+    Run a live recognition session on the default camera until 'q' is pressed.
+
+    With `show`, annotated frames are passed to show(frame) (e.g. a Tk
+    VideoPanel) instead of an OpenCV window, and the session runs until
+    `cancel` (a threading.Event) is set. Returns the number of students
+    recognized today, or None if the session could not start.
+    """
     cv2 = _require_opencv()
     DeepFace = _require_deepface()
     if cv2 is None or DeepFace is None:
-        return
+        return None
 
     dataset_path = "dataset"
     recognized_today = set()  # Track already recognized students today
@@ -43,145 +116,84 @@ def recognize_faces():
     recognition_cooldown = 5  # Seconds between recognitions for same student
     
     # Try to load pre-generated embeddings first
-    embeddings = load_embeddings()
-    use_embeddings = embeddings is not None
+    gallery = Gallery.load()
     
-    if not use_embeddings:
-        print("No embeddings found. Using DeepFace.find (slower).")
-        print("Run train.py to generate embeddings for faster recognition.")
-    else:
-        print(f"Loaded embeddings for {len(embeddings)} students.")
+    if gallery is None or len(gallery) == 0:
+        print("No trained embeddings found. Matching against the dataset images instead.")
+        print("Run train.py to generate embeddings for faster start-up.")
+        students = {student[2]: student[1] for student in get_all_students()}
+        gallery = load_dataset_gallery(students, dataset_path)
+        if gallery is None:
+            print(f"Error: No images of enrolled students found in {dataset_path}/. Enroll students first.")
+            return None
+    print(f"Loaded embeddings for {len(gallery)} students.")
+    # Build the model while the camera opens (a no-op if it is already resident)
+    model_manager.warm_up()
     
     cap = cv2.VideoCapture(0)
     if not cap.isOpened():
         print("Error: Could not access the camera. Please check that a webcam is connected and free.")
-        return
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        return None
+    # Downscaled detection, searching only near known faces between full scans
+    detect = create_detector()
+    print(f"Face detector: {detect.name}")
+
+    def identify(face_rois):
+        nonlocal gallery
+        # Pick up students enrolled (or retrained) since the session started
+        gallery = gallery.reload_if_changed()
+        identities = []
+        for student_id, distance in identify_faces(gallery, face_rois, THRESHOLD):
+            print(f"Candidate {student_id} distance={distance:.3f}")
+            identities.append((student_id, gallery.name(student_id) if student_id else None, distance))
+        return identities
+
+    def record(student_id, student_name):
+        return _record_attendance(student_id, student_name, last_recognition_time,
+                                  recognized_today, recognition_cooldown, mark=sink.mark)
+
+    process_every_n_frames = 5  # Retry cadence for faces that are not identified yet
+    # Each face is embedded until it is identified, then only re-verified occasionally
+    tracker = FaceTracker(retry_every=process_every_n_frames)
+    # Capture, detection, embedding and DB writes each run in their own stage
+    pipeline = RecognitionPipeline(cap, detect, identify, record, tracker,
+                                   annotate=lambda frame, tracks: annotate_tracks(cv2, frame, tracks))
     
+    # Marks are deduplicated in memory and written in batches off the record stage
+    sink = AttendanceSink().start()
+
     print("Starting real-time recognition. Press 'q' to quit.")
     print("Face detection active...")
+    pipeline.start()
     
-    frame_count = 0
-    process_every_n_frames = 5  # Process every 5th frame for better performance
-    
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        frame_count += 1
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-        
-        # Draw rectangles around detected faces
-        for (x, y, w, h) in faces:
-            cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
-        
-        # Process recognition every N frames
-        if frame_count % process_every_n_frames == 0 and len(faces) > 0:
+    try:
+        while pipeline.running and not (cancel is not None and cancel.is_set()):
             try:
-                # Crop face region
-                x, y, w, h = faces[0]
-                face_roi = frame[y:y+h, x:x+w]
-                
-                if use_embeddings:
-                    # Use pre-generated embeddings for faster recognition
-                    current_embedding = DeepFace.represent(
-                        img_path=face_roi,
-                        model_name='Facenet',
-                        enforce_detection=False
-                    )
-                    
-                    if current_embedding:
-                        current_emb = np.array(current_embedding[0]['embedding'])
-                        best_match = None
-                        best_distance = float('inf')
-                        
-                        for student_id, data in embeddings.items():
-                            stored_emb = np.array(data['embedding'])
-                            # Calculate cosine distance (scale-invariant)
-                            distance = _cosine_distance(current_emb, stored_emb)
-                            
-                            if distance < best_distance:
-                                best_distance = distance
-                                best_match = student_id
-                        print(f"Candidate {best_match} distance={best_distance:.3f}")
-                        # Threshold for recognition (adjust as needed)
-                        threshold = THRESHOLD
-                        if best_match and best_distance < threshold:
-                            student_id = best_match
-                            student_name = embeddings[best_match]['name']
-                            
-                            # Check cooldown
-                            now = datetime.datetime.now()
-                            if student_id in last_recognition_time:
-                                time_diff = (now - last_recognition_time[student_id]).total_seconds()
-                                if time_diff < recognition_cooldown:
-                                    continue
-                            
-                            # Mark attendance
-                            date = now.strftime("%Y-%m-%d")
-                            time = now.strftime("%H:%M:%S")
-                            
-                            if mark_attendance(student_id, date, time):
-                                recognized_today.add(student_id)
-                                last_recognition_time[student_id] = now
-                                print(f"✓ Attendance marked: {student_name} ({student_id}) at {time}")
-                                cv2.putText(frame, f"Recognized: {student_name}", (x, y-10),
-                                          cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                            else:
-                                cv2.putText(frame, f"Already marked: {student_name}", (x, y-10),
-                                          cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
-                        else:
-                            cv2.putText(frame, "Unknown", (x, y-10),
-                                      cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                else:
-                    # Fallback to DeepFace.find
-                    result = DeepFace.find(
-                        img_path=face_roi,
-                        db_path=dataset_path,
-                        enforce_detection=False,
-                        silent=True
-                    )
-                    
-                    if result and len(result) > 0 and len(result[0]) > 0:
-                        identity_path = result[0].iloc[0]['identity']
-                        student_id = os.path.basename(os.path.dirname(identity_path))
-                        
-                        # Check cooldown
-                        now = datetime.datetime.now()
-                        if student_id in last_recognition_time:
-                            time_diff = (now - last_recognition_time[student_id]).total_seconds()
-                            if time_diff < recognition_cooldown:
-                                continue
-                        
-                        student = get_student(student_id)
-                        if student:
-                            student_name = student[1]
-                            date = now.strftime("%Y-%m-%d")
-                            time = now.strftime("%H:%M:%S")
-                            
-                            if mark_attendance(student_id, date, time):
-                                recognized_today.add(student_id)
-                                last_recognition_time[student_id] = now
-                                print(f"✓ Attendance marked: {student_name} ({student_id}) at {time}")
-                                cv2.putText(frame, f"Recognized: {student_name}", (x, y-10),
-                                          cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                            else:
-                                cv2.putText(frame, f"Already marked: {student_name}", (x, y-10),
-                                          cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
-                        else:
-                            cv2.putText(frame, "Unknown", (x, y-10),
-                                      cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-            except Exception as e:
-                # Silently continue on recognition errors
-                pass
-        
-        cv2.imshow("Face Recognition - Press 'q' to quit", frame)
-        
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
-    
-    cap.release()
-    cv2.destroyAllWindows()
+                frame = pipeline.display.get(timeout=0.5)
+            except queue.Empty:
+                if show is None:
+                    cv2.waitKey(1)  # keep the window responsive while waiting
+                continue
+            if show is not None:
+                show(frame)
+                continue
+            cv2.imshow("Face Recognition - Press 'q' to quit", frame)
+            
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    finally:
+        pipeline.stop()
+        sink.close()
+        cap.release()
+        if show is None:
+            cv2.destroyAllWindows()
+
+    stats = tracker.stats()
     print(f"\nRecognition session ended. Total recognized today: {len(recognized_today)}")
+    print(f"Tracked {stats['tracks']} faces with {stats['embedding_calls']} embedding calls "
+          f"({stats['embeddings_per_track']:.1f} per face)")
+    print(pipeline.format_stats())
+    writes = sink.stats()
+    print(f"Attendance writes: {writes['queued']} queued, {writes['flushed']} written in "
+          f"{writes['flushes']} transactions, {writes['deduplicated']} duplicates skipped in memory")
+    return len(recognized_today)
@@ -0,0 +1,72 @@
+"""
+Cached dashboard statistics.
+
+Wall displays poll /api/stats constantly, so the counts are kept in memory
+and recomputed only when they can have changed: when another connection has
+committed to the database (attendance marked by a recognizer, a student
+enrolled), when the day changes, or at the latest after `ttl` seconds.
+
+Changes are detected with PRAGMA data_version on a connection the service
+keeps for itself. The pragma reads no tables; its value changes whenever any
+other connection, in this process or another one, commits a write.
+"""
+import os
+import json
+import time
+import hashlib
+import datetime
+import threading
+
+from database import count_stats, open_connection
+
+STATS_TTL = float(os.getenv("ATTENDANCE_STATS_TTL", "30"))
+
+
+class StatsService:
+    """Thread-safe cache in front of database.count_stats()."""
+
+    def __init__(self, ttl=STATS_TTL, clock=datetime.datetime.now):
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._stats = None
+        self._etag = None
+        self._version = None
+        self._computed_at = 0.0
+
+    def _connection(self):
+        # Like database.get_connection(), never reuse a connection across a fork
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = open_connection(check_same_thread=False)
+            self._pid = os.getpid()
+            self._stats = None
+        return self._conn
+
+    def invalidate(self):
+        """Drop the cached counts; the next call recomputes them."""
+        with self._lock:
+            self._stats = None
+
+    def get(self):
+        """Return (stats dict, ETag) for today."""
+        today = self.clock().strftime("%Y-%m-%d")
+        with self._lock:
+            conn = self._connection()
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if (self._stats is not None and version == self._version
+                    and self._stats['today_date'] == today
+                    and time.monotonic() - self._computed_at < self.ttl):
+                self.hits += 1
+                return self._stats, self._etag
+            self.misses += 1
+            stats = count_stats(today, conn)
+            self._stats = stats
+            # Derived from the content, so every worker process agrees on it
+            self._etag = hashlib.sha1(json.dumps(stats, sort_keys=True).encode()).hexdigest()[:20]
+            self._version = version
+            self._computed_at = time.monotonic()
+            return stats, self._etag
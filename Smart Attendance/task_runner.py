@@ -0,0 +1,121 @@
+"""
+Background tasks for the desktop app, off the Tk main loop.
+
+Tk is not thread-safe: only the thread running mainloop() may touch
+widgets. TaskRunner runs each long job (enrollment, training, recognition)
+on a worker thread, and everything the job wants to tell the UI - progress
+reports, its result, an exception - goes through one thread-safe queue that
+the Tk thread drains every `poll_ms` with root.after(). Callbacks therefore
+always run on the Tk thread and may update widgets freely.
+
+    task = runner.submit(lambda task: generate_embeddings(progress=task.report, cancel=task.cancel_event),
+                         on_progress=show_progress, on_done=finished, on_error=failed)
+    ...
+    task.cancel()  # e.g. from a Cancel button
+
+Cancellation is cooperative: the job is handed the task and is expected to
+check `task.cancel_event` (or pass it on) and return early.
+"""
+import time
+import queue
+import threading
+import traceback
+
+POLL_MS = 100
+
+
+class Task:
+    """One background job; `report()` and `cancel()` may be called from any thread."""
+
+    def __init__(self, runner, name, on_progress, on_done, on_error):
+        self.name = name
+        self.cancel_event = threading.Event()
+        self.done = False
+        self.thread = None
+        self._runner = runner
+        self._on_progress = on_progress
+        self._on_done = on_done
+        self._on_error = on_error
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def report(self, value):
+        """Send a progress value to `on_progress` on the Tk thread."""
+        if self._on_progress is not None:
+            self._runner._events.put((self._on_progress, (value,)))
+
+
+class TaskRunner:
+    """Runs jobs on worker threads and delivers their callbacks on the Tk thread."""
+
+    def __init__(self, root, poll_ms=POLL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.tasks = []  # running tasks
+        self._events = queue.Queue()
+        self._polling = False
+
+    @property
+    def busy(self):
+        return bool(self.tasks)
+
+    def submit(self, job, name="task", on_progress=None, on_done=None, on_error=None):
+        """
+        Run `job(task)` on a new worker thread. On the Tk thread afterwards,
+        `on_done(result, task)` gets the return value, or `on_error(exc, task)`
+        the exception it raised.
+        """
+        task = Task(self, name, on_progress, on_done, on_error)
+        self.tasks.append(task)
+        task.thread = threading.Thread(target=self._run, args=(job, task), name=f"task-{name}", daemon=True)
+        task.thread.start()
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+        return task
+
+    def cancel_all(self):
+        for task in self.tasks:
+            task.cancel()
+
+    def shutdown(self, timeout=5.0):
+        """Cancel every task and wait up to `timeout` seconds for them to stop; no callbacks run."""
+        self.cancel_all()
+        deadline = time.monotonic() + timeout
+        for task in list(self.tasks):
+            task.thread.join(max(0.0, deadline - time.monotonic()))
+
+    def _run(self, job, task):
+        try:
+            result = job(task)
+        except Exception as e:
+            traceback.print_exc()
+            self._events.put((self._finish, (task, task._on_error, e)))
+        else:
+            self._events.put((self._finish, (task, task._on_done, result)))
+
+    def _finish(self, task, callback, value):
+        task.done = True
+        self.tasks.remove(task)
+        if callback is not None:
+            callback(value, task)
+
+    def _poll(self):
+        while True:
+            try:
+                callback, args = self._events.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception:
+                traceback.print_exc()  # a broken callback must not stop the polling
+        if self.tasks or not self._events.empty():
+            self.root.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
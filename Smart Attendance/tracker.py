@@ -0,0 +1,160 @@
+"""
+Lightweight IoU/centroid tracking over face detector boxes.
+
+Each face gets a track ID that follows it from frame to frame. A track is
+embedded until it is identified, then its identity is reused for the rest of
+the visit and only re-verified every `reverify_every` frames, so one person
+standing in the doorway costs a handful of embedding calls instead of one
+every few frames.
+"""
+import os
+import itertools
+
+IOU_THRESHOLD = float(os.getenv("ATTENDANCE_TRACK_IOU", "0.3"))
+MAX_MISSED_FRAMES = int(os.getenv("ATTENDANCE_TRACK_MAX_MISSED", "10"))
+REVERIFY_EVERY = int(os.getenv("ATTENDANCE_TRACK_REVERIFY", "150"))
+
+
+def iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes."""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    inter_w = min(ax + aw, bx + bw) - max(ax, bx)
+    inter_h = min(ay + ah, by + bh) - max(ay, by)
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    return inter / float(aw * ah + bw * bh - inter)
+
+
+def _centroid_distance(a, b):
+    """Centre-to-centre distance relative to the size of box `a`."""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    dx = (ax + aw / 2) - (bx + bw / 2)
+    dy = (ay + ah / 2) - (by + bh / 2)
+    return (dx * dx + dy * dy) ** 0.5 / max(aw, ah, 1)
+
+
+class Track:
+    """One face followed across frames."""
+
+    def __init__(self, track_id, box, frame_index):
+        self.track_id = track_id
+        self.box = tuple(int(v) for v in box)
+        self.first_frame = frame_index
+        self.last_seen = frame_index
+        self.missed = 0
+        self.student_id = None
+        self.student_name = None
+        self.distance = float("inf")
+        self.last_embedded = None  # frame index of the last embedding
+        self.embed_count = 0
+        self.in_flight = False  # queued for embedding but no result yet
+        self.marked = False  # attendance already handled for this visit
+        self.status = None  # "marked" or "already" once handled
+
+    @property
+    def identified(self):
+        return self.student_id is not None
+
+
+class FaceTracker:
+    """
+    Associates detector boxes with existing tracks, greedily by IoU and then
+    by centroid distance for fast-moving faces whose boxes no longer overlap.
+    """
+
+    def __init__(self, iou_threshold=IOU_THRESHOLD, max_missed=MAX_MISSED_FRAMES,
+                 reverify_every=REVERIFY_EVERY, retry_every=5):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.reverify_every = reverify_every
+        self.retry_every = retry_every  # embed cadence for not-yet-identified tracks
+        self.tracks = {}
+        # Totals for tracks that have left the frame, for stats()
+        self._finished = {'tracks': 0, 'identified_tracks': 0, 'embedding_calls': 0}
+        self._ids = itertools.count(1)
+
+    def update(self, boxes, frame_index):
+        """
+        Feed this frame's detections. Returns the track for each box, in the
+        same order as `boxes`.
+        """
+        boxes = [tuple(int(v) for v in box) for box in boxes]
+        assigned = [None] * len(boxes)
+        free_tracks = set(self.tracks)
+
+        pairs = sorted(
+            ((iou(track.box, box), track_id, i)
+             for track_id, track in self.tracks.items()
+             for i, box in enumerate(boxes)),
+            reverse=True,
+        )
+        for overlap, track_id, i in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if track_id in free_tracks and assigned[i] is None:
+                assigned[i] = track_id
+                free_tracks.discard(track_id)
+
+        # Boxes that did not overlap anything: try the nearest free track
+        for i, box in enumerate(boxes):
+            if assigned[i] is not None or not free_tracks:
+                continue
+            nearest = min(free_tracks, key=lambda t: _centroid_distance(self.tracks[t].box, box))
+            if _centroid_distance(self.tracks[nearest].box, box) < 0.5:
+                assigned[i] = nearest
+                free_tracks.discard(nearest)
+
+        result = []
+        for i, box in enumerate(boxes):
+            if assigned[i] is None:
+                track = Track(next(self._ids), box, frame_index)
+                self.tracks[track.track_id] = track
+            else:
+                track = self.tracks[assigned[i]]
+                track.box = box
+                track.last_seen = frame_index
+                track.missed = 0
+            result.append(track)
+
+        for track_id in free_tracks:
+            track = self.tracks[track_id]
+            track.missed += 1
+            if track.missed > self.max_missed:
+                del self.tracks[track_id]
+                self._finished['tracks'] += 1
+                self._finished['identified_tracks'] += int(track.identified)
+                self._finished['embedding_calls'] += track.embed_count
+        return result
+
+    def needs_embedding(self, track, frame_index):
+        """True if this track should go through the embedding model now."""
+        if track.last_embedded is None:
+            return True
+        interval = self.reverify_every if track.identified else self.retry_every
+        return frame_index - track.last_embedded >= interval
+
+    def assign(self, track, student_id, student_name, distance, frame_index):
+        """Record the result of embedding a track."""
+        track.last_embedded = frame_index
+        track.embed_count += 1
+        if student_id is not None and student_id != track.student_id:
+            # A new or changed identity must be handled (marked) again
+            track.marked = False
+            track.status = None
+        track.student_id = student_id
+        track.student_name = student_name
+        track.distance = distance
+
+    def stats(self):
+        live = self.tracks.values()
+        tracks = self._finished['tracks'] + len(live)
+        embeds = self._finished['embedding_calls'] + sum(track.embed_count for track in live)
+        return {
+            'tracks': tracks,
+            'identified_tracks': self._finished['identified_tracks'] + sum(1 for t in live if t.identified),
+            'embedding_calls': embeds,
+            'embeddings_per_track': embeds / tracks if tracks else 0.0,
+        }
@@ -1,15 +1,81 @@
 import os
+import argparse
+import hashlib
 import pickle
+import collections
 from database import get_all_students
+from embedder import MODEL_NAME, DEFAULT_BATCH_SIZE, DEFAULT_WORKERS, embed_image_files
+from embedding_store import STORE_FILE, LEGACY_PICKLE_FILE, StoreError, open_store, save_store
+from prototypes import build_prototypes
 import numpy as np
 
-def generate_embeddings():
+MAX_IMAGES_PER_STUDENT = 10  # limit to first 10 images for speed
+MANIFEST_FILE = "models/manifest.pkl"
+MANIFEST_VERSION = 1
+
+def _file_hash(path):
+    """SHA-1 of the file contents, used to spot re-saved but identical images."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest():
+    """
+    Load the per-image manifest: image path -> mtime, size, content hash and
+    embedding. Returns an empty manifest if none exists or it was written by
+    a different model or format version.
+    """
+    if os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE, 'rb') as f:
+            manifest = pickle.load(f)
+        if manifest.get('version') == MANIFEST_VERSION and manifest.get('model_name') == MODEL_NAME:
+            return manifest
+        print("Embedding manifest is from another model/version; re-embedding everything.")
+    return {'version': MANIFEST_VERSION, 'model_name': MODEL_NAME, 'images': {}}
+
+def save_manifest(manifest):
+    os.makedirs(os.path.dirname(MANIFEST_FILE), exist_ok=True)
+    with open(MANIFEST_FILE, 'wb') as f:
+        pickle.dump(manifest, f)
+
+def _reuse_entry(entry, image_path, stat):
+    """
+    Return the manifest entry for `image_path` if its embedding is still valid.
+    Unchanged mtime and size are trusted; otherwise the content hash decides.
+    """
+    if entry is None:
+        return None
+    if entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+        return entry
+    if entry['size'] == stat.st_size and entry['hash'] == _file_hash(image_path):
+        return dict(entry, mtime=stat.st_mtime)
+    return None
+
+def generate_embeddings(incremental=True, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE,
+                        progress=None, cancel=None):
     """
     Generate embeddings for all enrolled students and store them for quick lookup.
     This improves recognition speed significantly.
+
+    In incremental mode (the default) only images that are new or changed since
+    the last run are embedded; everything else is reused from the manifest in
+    `models/`, and students who were deleted are dropped from the store.
+    Pass incremental=False to re-embed every image from scratch.
+
+    Images are embedded in batches of `batch_size` across `workers` processes
+    (see embedder.py).
+
+    `progress`, if given, is called after every batch with a dict of
+    images_done/images_total, students_done/students_total, the last student
+    finished, images/sec and the ETA in seconds. Setting `cancel` (a
+    threading.Event) stops embedding: the images finished so far are kept in
+    the manifest for the next run, the store is left untouched and False is
+    returned.
     """
     try:
-        from deepface import DeepFace
+        from deepface import DeepFace  # noqa: F401
     except ImportError:
         print("Error: The 'deepface' package is not installed. Install with 'pip install deepface'.")
         return False
@@ -25,9 +91,14 @@ def generate_embeddings():
         print("No students enrolled yet!")
         return False
     
-    print("Generating embeddings for all enrolled students...")
-    print("This may take a few minutes...")
-    
+    old_manifest = load_manifest() if incremental else None
+    old_images = old_manifest['images'] if old_manifest else {}
+    manifest = {'version': MANIFEST_VERSION, 'model_name': MODEL_NAME, 'images': {}}
+
+    # Work out which images still have a valid embedding and which need one
+    student_images = {}
+    pending = []
+    image_owner = {}  # pending image path -> student_id
     for student in students:
         student_id = student[2]  # student_id is at index 2
         student_name = student[1]  # name is at index 1
@@ -38,56 +109,185 @@ def generate_embeddings():
             continue
         
         # Get all images for this student
-        image_files = [f for f in os.listdir(student_folder) if f.endswith(('.jpg', '.jpeg', '.png'))]
+        image_files = sorted(f for f in os.listdir(student_folder) if f.endswith(('.jpg', '.jpeg', '.png')))
         
         if not image_files:
             print(f"Warning: No valid images found for {student_name} ({student_id})")
             continue
         
-        # Generate embeddings for multiple images and average them
-        student_embeddings = []
-        for image_file in image_files[:10]:  # limit to first 10 images for speed
-            image_path = os.path.join(student_folder, image_file)
-            try:
-                embedding = DeepFace.represent(
-                    img_path=image_path,
-                    model_name='Facenet',
-                    enforce_detection=False
-                )
-                if embedding:
-                    student_embeddings.append(embedding[0]['embedding'])
-            except Exception as e:
-                print(f"✗ Error processing {student_name} ({student_id}) - {image_file}: {str(e)}")
-                continue
-        
-        if student_embeddings:
-            mean_embedding = np.mean(student_embeddings, axis=0).tolist()
-            embeddings[student_id] = {
-                'name': student_name,
-                'embedding': mean_embedding,
-                'images_used': len(student_embeddings)
+        image_paths = [os.path.join(student_folder, f) for f in image_files[:MAX_IMAGES_PER_STUDENT]]
+        student_images[student_id] = (student_name, image_paths)
+        for image_path in image_paths:
+            stat = os.stat(image_path)
+            entry = _reuse_entry(old_images.get(image_path), image_path, stat)
+            if entry is not None:
+                manifest['images'][image_path] = entry
+            else:
+                pending.append((image_path, stat))
+                image_owner[image_path] = student_id
+
+    reused = len(manifest['images'])
+    if pending:
+        print(f"Embedding {len(pending)} new or changed images ({reused} unchanged)...")
+        print("This may take a few minutes...")
+    else:
+        print(f"All {reused} images are up to date; nothing to embed.")
+
+    remaining = collections.Counter(image_owner.values())
+    finished = []
+
+    def report(paths, done, total, elapsed):
+        for path in paths:
+            student_id = image_owner[path]
+            remaining[student_id] -= 1
+            if remaining[student_id] == 0:
+                finished.append(student_images[student_id][0])
+        rate = done / max(elapsed, 1e-9)
+        progress({
+            'images_done': done,
+            'images_total': total,
+            'students_done': len(finished),
+            'students_total': len(remaining),
+            'student': finished[-1] if finished else None,
+            'images_per_sec': rate,
+            'eta': (total - done) / rate if rate else None,
+        })
+
+    new_embeddings = embed_image_files([image_path for image_path, _ in pending],
+                                       workers=workers, batch_size=batch_size,
+                                       progress=report if progress is not None else None, cancel=cancel)
+    for image_path, stat in pending:
+        if new_embeddings.get(image_path) is not None:
+            manifest['images'][image_path] = {
+                'mtime': stat.st_mtime,
+                'size': stat.st_size,
+                'hash': _file_hash(image_path),
+                'embedding': new_embeddings[image_path],
             }
-            print(f"✓ Generated embedding for {student_name} ({student_id}) using {len(student_embeddings)} images")
+
+    if cancel is not None and cancel.is_set():
+        save_manifest(manifest)
+        print("Training cancelled; finished images will be reused next time.")
+        return False
+
+    # Cluster each student's image embeddings into prototypes for the store
+    for student_id, (student_name, image_paths) in student_images.items():
+        student_embeddings = [manifest['images'][p]['embedding'] for p in image_paths if p in manifest['images']]
+        if student_embeddings:
+            embeddings[student_id] = _student_entry(student_name, student_embeddings)
+            print(f"✓ Generated {len(embeddings[student_id]['prototypes'])} prototypes for {student_name} "
+                  f"({student_id}) using {len(student_embeddings)} images")
         else:
             print(f"✗ No embeddings generated for {student_name} ({student_id}). Check image quality.")
+
+    dropped = {os.path.basename(os.path.dirname(p)) for p in old_images} - set(student_images)
+    if dropped:
+        print(f"Dropped {len(dropped)} students who are no longer enrolled.")
     
     # Save embeddings to file
-    embeddings_file = os.path.join(models_path, 'embeddings.pkl')
-    with open(embeddings_file, 'wb') as f:
-        pickle.dump(embeddings, f)
+    save_manifest(manifest)
+    embeddings_file = save_store(embeddings, MODEL_NAME, STORE_FILE)
     
     print(f"\n✓ Embeddings generated and saved to {embeddings_file}")
     print(f"Total students processed: {len(embeddings)}")
+    build_ann_index(embeddings)
     return True
 
+def add_student_embeddings(student_id, student_name, image_embeddings):
+    """
+    Add a newly enrolled student whose images were already embedded at
+    capture time (`image_embeddings`: image path -> embedding), without a
+    training run. The images go into the manifest, so the next train.py run
+    does not embed them again, and the student's prototypes are written
+    into the store next to everyone else's, where running recognizers pick
+    it up (see Gallery.reload_if_changed). Returns the number of images used.
+
+    With no trained store yet, a store holding only this student would hide
+    everyone else from the recognizer, so a full incremental training run
+    builds it instead (this student's images are reused from the manifest).
+    """
+    manifest = load_manifest()
+    for image_path, embedding in image_embeddings.items():
+        stat = os.stat(image_path)
+        manifest['images'][image_path] = {
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'hash': _file_hash(image_path),
+            'embedding': list(embedding),
+        }
+    # Cluster the same images, in the same order, as a training run would, so retraining gives the same prototypes
+    chosen = sorted(image_embeddings)[:MAX_IMAGES_PER_STUDENT]
+    save_manifest(manifest)
+    embeddings = load_embeddings()
+    if not embeddings:
+        print("No trained embeddings yet; embedding every enrolled student...")
+        generate_embeddings()
+        return len(chosen)
+    embeddings[student_id] = _student_entry(student_name, [image_embeddings[p] for p in chosen])
+    save_store(embeddings, MODEL_NAME, STORE_FILE)
+    build_ann_index(embeddings)
+    print(f"✓ Added {student_name} ({student_id}) to the gallery using {len(chosen)} images")
+    return len(chosen)
+
+def _student_entry(student_name, student_embeddings):
+    """One student's store entry from their image embeddings (in path order)."""
+    prototypes, threshold = build_prototypes(student_embeddings)
+    return {
+        'name': student_name,
+        'embedding': np.mean(student_embeddings, axis=0).tolist(),
+        'images_used': len(student_embeddings),
+        'prototypes': prototypes,
+        'threshold': threshold,
+    }
+
+def build_ann_index(embeddings):
+    """
+    Build the approximate nearest-neighbour index next to the embeddings.
+    Small galleries are matched by brute force, so any old index is removed.
+    """
+    from gallery import Gallery
+    from ann_index import MIN_GALLERY_SIZE, build_index, save_index, remove_index
+
+    gallery = Gallery.from_embeddings(embeddings)
+    if len(gallery) < MIN_GALLERY_SIZE:
+        remove_index()
+        return None
+    index = build_index(gallery.matrix)
+    save_index(index, gallery.ids)
+    print(f"✓ Built {index.kind} ANN index over {len(gallery)} students")
+    return index
+
+def load_store():
+    """Memory-map the embedding store, or return None if there is no usable one."""
+    if not os.path.exists(STORE_FILE):
+        return None
+    try:
+        return open_store(STORE_FILE)
+    except StoreError as e:
+        print(f"Warning: {e}")
+        return None
+
 def load_embeddings():
-    """Load pre-generated embeddings from file."""
-    embeddings_file = "models/embeddings.pkl"
-    if os.path.exists(embeddings_file):
-        with open(embeddings_file, 'rb') as f:
+    """
+    Load pre-generated embeddings from file. Falls back to the legacy pickle
+    (migrate it with 'python embedding_store.py --migrate').
+    """
+    store = load_store()
+    if store is not None:
+        return store.to_embeddings()
+    if os.path.exists(LEGACY_PICKLE_FILE):
+        with open(LEGACY_PICKLE_FILE, 'rb') as f:
             return pickle.load(f)
     return None
 
 if __name__ == "__main__":
-    generate_embeddings()
+    parser = argparse.ArgumentParser(description="Generate face embeddings for enrolled students.")
+    parser.add_argument("--full", action="store_true",
+                        help="re-embed every image instead of only new or changed ones")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"embedding worker processes (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"images per forward pass (default: {DEFAULT_BATCH_SIZE})")
+    args = parser.parse_args()
+    generate_embeddings(incremental=not args.full, workers=args.workers, batch_size=args.batch_size)
 
@@ -0,0 +1,57 @@
+"""
+Live camera view inside a Tk window, instead of a separate cv2.imshow window.
+
+Capture and recognition run on background threads (see task_runner.py), so
+show() only stores the newest frame; the Tk thread picks it up every
+`refresh_ms` and draws it. Frames that arrive faster than that are skipped,
+so the view never lags behind the camera. Frames are handed to Tk as PPM
+data, which tk.PhotoImage reads natively (no Pillow needed).
+"""
+import threading
+import tkinter as tk
+
+REFRESH_MS = 30
+
+
+class VideoPanel(tk.Label):
+    """A Label that shows the latest BGR frame passed to show()."""
+
+    def __init__(self, master, width=640, refresh_ms=REFRESH_MS, **options):
+        options.setdefault("bg", "black")
+        super().__init__(master, **options)
+        self.display_width = width
+        self.refresh_ms = refresh_ms
+        self._frame = None
+        self._lock = threading.Lock()
+        self._image = None  # keep a reference, or Tk drops the picture
+        self._closed = False
+        self.after(self.refresh_ms, self._refresh)
+
+    def show(self, frame):
+        """Queue a frame for display; safe to call from any thread."""
+        with self._lock:
+            self._frame = frame
+
+    def close(self):
+        self._closed = True
+
+    def _refresh(self):
+        if self._closed or not self.winfo_exists():
+            return
+        with self._lock:
+            frame, self._frame = self._frame, None
+        if frame is not None:
+            self._draw(frame)
+        self.after(self.refresh_ms, self._refresh)
+
+    def _draw(self, frame):
+        import cv2
+        height, width = frame.shape[:2]
+        if width != self.display_width:
+            scale = self.display_width / width
+            frame = cv2.resize(frame, (self.display_width, round(height * scale)), interpolation=cv2.INTER_AREA)
+            height, width = frame.shape[:2]
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        header = f"P6 {width} {height} 255 ".encode()
+        self._image = tk.PhotoImage(master=self, data=header + rgb.tobytes(), format="PPM")
+        self.configure(image=self._image)
@@ -0,0 +1,101 @@
+"""
+Production entry point for the web dashboard.
+
+Runs dashboard.app under gunicorn (several worker processes, each with a
+thread pool) where it is available, or under waitress (one process, a
+thread pool; also works on Windows):
+
+    python wsgi.py
+    python wsgi.py --workers 4 --threads 32 --port 8000
+    python wsgi.py --server waitress
+
+gunicorn can also be started directly; use the threaded worker so live
+/api/stream connections do not each occupy a whole process:
+
+    gunicorn --preload -k gthread -w 4 --threads 32 -b 0.0.0.0:8000 wsgi:app
+
+Every open dashboard page keeps one request thread busy with its event
+stream, so size workers x threads for the number of screens plus headroom.
+
+The schema is migrated once, before any worker starts, and no database
+connection is left open across the fork: every worker thread opens its own
+connection on first use (see database.get_connection).
+"""
+import os
+import argparse
+import importlib.util
+
+from database import create_tables, close_connection
+from dashboard import app
+
+HOST = os.getenv("DASHBOARD_HOST", "0.0.0.0")
+PORT = int(os.getenv("DASHBOARD_PORT", "8000"))
+WORKERS = int(os.getenv("DASHBOARD_WORKERS", str(min(2 * (os.cpu_count() or 1) + 1, 8))))
+THREADS = int(os.getenv("DASHBOARD_THREADS", "32"))
+
+create_tables()
+close_connection()
+
+
+def run_gunicorn(host, port, workers, threads):
+    from gunicorn.app.base import BaseApplication
+
+    class DashboardApplication(BaseApplication):
+        def load_config(self):
+            options = {
+                'bind': f"{host}:{port}",
+                'workers': workers,
+                'threads': threads,
+                'worker_class': 'gthread',
+                'preload_app': True,
+                'accesslog': None,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    DashboardApplication().run()
+
+
+def run_waitress(host, port, threads):
+    from waitress import serve
+    serve(app, host=host, port=port, threads=threads, connection_limit=max(100, threads * 4))
+
+
+def _installed(name):
+    return importlib.util.find_spec(name) is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, help=f"processes, gunicorn only (default {WORKERS})")
+    parser.add_argument("--threads", type=int, default=THREADS, help="request threads per process")
+    parser.add_argument("--server", choices=("auto", "gunicorn", "waitress"), default="auto")
+    args = parser.parse_args()
+
+    server = args.server
+    if server == "auto":
+        # gunicorn needs fork(), so it is not an option on Windows
+        server = "gunicorn" if os.name != "nt" and _installed("gunicorn") else "waitress"
+    if not _installed(server):
+        print(f"Error: {server} is not installed. Install with 'pip install {server}'.")
+        return
+
+    if server == "gunicorn":
+        workers = args.workers or WORKERS
+        print(f"Serving the dashboard with gunicorn on {args.host}:{args.port}: "
+              f"{workers} workers x {args.threads} threads")
+        run_gunicorn(args.host, args.port, workers, args.threads)
+    else:
+        if args.workers and args.workers > 1:
+            print("Note: waitress runs a single process; --workers is ignored.")
+        print(f"Serving the dashboard with waitress on {args.host}:{args.port}: {args.threads} threads")
+        run_waitress(args.host, args.port, args.threads)
+
+
+if __name__ == "__main__":
+    main()